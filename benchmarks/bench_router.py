@@ -0,0 +1,184 @@
+"""
+Benchmark the compiled query router against the original per-pattern router.
+
+The original router is kept here as the oracle: the compiled router must
+make the same decision and extract the same tool input for every query of
+a labelled set and of a randomly generated set.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_router --queries 20000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from typing import List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qna_rag_agent.src.agents.router import (
+    QueryRouter, AI_RELATED_PATTERNS, SYSTEM_PATTERNS, AI_TERMS, TOOL_PATTERNS,
+    TOOL_INPUT_PATTERNS, MATH_PATTERN, DEFINITION_PATTERN
+)
+
+# (query, expected route: "rag", "mixed" or a tool name)
+LABELLED_QUERIES = [
+    ("What is RAGent AI?", "rag"),
+    ("What is the history of RAGent AI?", "rag"),
+    ("What products does RAGent AI offer?", "rag"),
+    ("Can you describe RAGent Search in more detail?", "rag"),
+    ("What makes RAGent Assistant unique?", "rag"),
+    ("How many employees does the company have?", "rag"),
+    ("Where is the headquarters?", "rag"),
+    ("Explain the architecture of this system", "rag"),
+    ("How routing works in this system", "rag"),
+    ("Define agentic routing", "rag"),
+    ("Define retrieval augmented generation", "rag"),
+    ("What is the meaning of hallucination in AI?", "rag"),
+    ("What does RAG mean?", "rag"),
+    ("define token", "rag"),
+    ("define 'embedding'", "rag"),
+    ("Define quantization", "rag"),
+    ("What is machine learning?", "rag"),
+    ("Tell me about neural networks", "rag"),
+    ("Does it support multilingual queries?", "rag"),
+    ("What is the pricing of the Enterprise tier?", "rag"),
+    ("Calculate 25 * 16", "calculator"),
+    ("What is the square root of 50?", "mixed"),  # Seven words: treated as a mixed query
+    ("How old am I if I was born in 1990?", "calculator"),
+    ("what is 2+2", "calculator"),
+    ("compute 3 ^ 4", "calculator"),
+    ("Evaluate (12 + 4) / 2", "calculator"),
+    ("sqrt(81)", "calculator"),
+    ("find the value of 7*6", "calculator"),
+    ("solve 10 - 3", "calculator"),
+    ("Define serendipity", "dictionary"),
+    ("What does ephemeral mean?", "dictionary"),
+    ("definition of ubiquitous", "dictionary"),
+    ("meaning of quixotic", "dictionary"),
+    ("What is RAGent AI and what is the square root of 50?", "mixed"),
+    ("How many employees does RAGent AI have and calculate 25 * 16", "mixed"),
+    ("Define RAG and what is 15 + 27?", "mixed"),
+    ("Define serendipity and define RAG and tell me what is 15 + 27?", "mixed"),
+    ("Tell me about RAGent Search and compute 2 + 3 * 4 please", "mixed"),
+    ("Hello there", "rag"),
+    ("", "rag"),
+]
+
+FRAGMENTS = [
+    "what is", "what does", "mean", "define", "definition of", "meaning of", "calculate", "compute",
+    "square root of", "sqrt", "born in", "how old", "in ai", "in AI", "ragent", "company", "the system",
+    "routing", "rag", "llm", "token", "agent", "bias", "serendipity", "apple", "and", "please", "?",
+    "25", "16", "*", "+", "2+2", "3 ^ 4", "1990", "(", ")", "'", '"', "\n", "employees", "product",
+    "machine learning", "fine-tuning", "tool use", "how", "works", "in this system", "of", "the",
+]
+
+class LegacyRouter:
+    """The original router: one ``re.search`` per pattern and AI term."""
+    
+    def route(self, query: str) -> Optional[str]:
+        if re.search(MATH_PATTERN, query.lower()) and len(query.split()) > 6:
+            return "mixed"
+        return self.tool_for(query)
+    
+    def tool_for(self, query: str) -> Optional[str]:
+        query_lower = query.lower()
+        for pattern in AI_RELATED_PATTERNS:
+            if re.search(pattern, query_lower):
+                return None
+        for term in AI_TERMS:
+            pattern = r'\bdefine\s+["\']?' + re.escape(term) + r'["\']?\b'
+            if re.search(pattern, query_lower):
+                return None
+        for pattern in SYSTEM_PATTERNS:
+            if re.search(pattern, query_lower):
+                return None
+        for tool_name, pattern in TOOL_PATTERNS.items():
+            if re.search(pattern, query_lower):
+                return tool_name
+        return None
+    
+    def tool_input(self, query: str, tool_name: str) -> str:
+        query_lower = query.lower()
+        for pattern in TOOL_INPUT_PATTERNS.get(tool_name, []):
+            match = re.search(pattern, query_lower)
+            if match:
+                return match.group(1).strip()
+        return query
+    
+    def math_expressions(self, query: str) -> List[str]:
+        return [match.group(0) for match in re.finditer(MATH_PATTERN, query.lower())]
+    
+    def definition_words(self, query: str) -> List[str]:
+        words = []
+        for match in re.finditer(DEFINITION_PATTERN, query.lower()):
+            word = match.group(1) or match.group(2)
+            if word not in words and self.tool_for(f"define {word}") == "dictionary":
+                words.append(word)
+        return words
+
+def describe(router, query: str) -> tuple:
+    """
+    Everything the orchestrator asks a router about a query.
+    """
+    route = router.route(query)
+    if route == "mixed":
+        return route, router.math_expressions(query), router.definition_words(query)
+    if route is not None:
+        return route, router.tool_input(query, route)
+    return (route,)
+
+def random_query(rng: random.Random) -> str:
+    """
+    Join random fragments so that routing patterns overlap and compete.
+    """
+    return " ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 14)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled query router")
+    parser.add_argument("--queries", type=int, default=20000, help="Number of random queries")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the queries")
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    legacy = LegacyRouter()
+    compiled = QueryRouter()
+    
+    # The labelled set checks the oracle itself, then both routers are compared
+    mislabelled = [
+        (query, label) for query, label in LABELLED_QUERIES
+        if (legacy.route(query) or "rag") != label
+    ]
+    for query, label in mislabelled:
+        print(f"Oracle disagrees with label {label!r}: {query!r}")
+    
+    queries = [query for query, _ in LABELLED_QUERIES] + [random_query(rng) for _ in range(args.queries)]
+    mismatched = [query for query in queries if describe(legacy, query) != describe(compiled, query)]
+    for query in mismatched[:10]:
+        print(f"Mismatch: {query!r}: {describe(legacy, query)} != {describe(compiled, query)}")
+    
+    routes = {}
+    for query in queries:
+        route = compiled.route(query) or "rag"
+        routes[route] = routes.get(route, 0) + 1
+    print(f"Queries: {len(queries)} ({len(LABELLED_QUERIES)} labelled), routes: {routes}")
+    
+    seconds = {}
+    for name, router in (("legacy", legacy), ("compiled", compiled)):
+        start = time.perf_counter()
+        for query in queries:
+            router.route(query)
+        seconds[name] = time.perf_counter() - start
+        print(f"{name:<10} {seconds[name]:.3f}s  {len(queries) / seconds[name]:.0f} queries/s")
+    
+    print(f"Speedup: {seconds['legacy'] / seconds['compiled']:.2f}x")
+    print(f"Identical decisions: {not mismatched and not mislabelled} "
+          f"({len(mismatched)} mismatches, {len(mislabelled)} mislabelled)")
+    if mismatched or mislabelled:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark the offset text splitter against LangChain's RecursiveCharacterTextSplitter.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_splitter --megabytes 20
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from qna_rag_agent.src.utils.text_splitter import OffsetTextSplitter, DEFAULT_SEPARATORS
+
+WORDS = (
+    "retrieval augmented generation model vector index query answer document chunk "
+    "embedding latency throughput RAGent Search Assistant Analytics Connect company "
+    "customer support pricing plan enterprise token context window hallucination"
+).split()
+
+def synthetic_document(rng: random.Random, num_chars: int) -> str:
+    """
+    Generate a document of paragraphs, lines and sentences with punctuation.
+    
+    Some paragraphs contain long unbroken runs so that every level of the
+    separator hierarchy is exercised.
+    """
+    parts = []
+    size = 0
+    while size < num_chars:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+        if rng.random() < 0.1:
+            sentence = sentence.replace(" ", ",")
+        if rng.random() < 0.01:
+            sentence = "x" * rng.randint(500, 3000)
+        sentence += rng.choice([". ", "! ", "? ", ".\n", "\n\n", "\n"])
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the offset text splitter")
+    parser.add_argument("--megabytes", type=float, default=20, help="Size of the synthetic corpus")
+    parser.add_argument("--doc_chars", type=int, default=200000, help="Characters per synthetic document")
+    parser.add_argument("--chunk_size", type=int, default=500, help="Size of document chunks")
+    parser.add_argument("--chunk_overlap", type=int, default=50, help="Overlap between document chunks")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the corpus")
+    args = parser.parse_args()
+    
+    # LangChain warns about every oversized chunk
+    logging.disable(logging.WARNING)
+    
+    rng = random.Random(args.seed)
+    num_docs = max(1, int(args.megabytes * 1e6 / args.doc_chars))
+    corpus = [synthetic_document(rng, args.doc_chars) for _ in range(num_docs)]
+    megabytes = sum(len(doc.encode("utf-8")) for doc in corpus) / 1e6
+    print(f"Synthetic corpus: {num_docs} documents, {megabytes:.1f} MB")
+    
+    splitters = {
+        "langchain": RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            length_function=len,
+            separators=DEFAULT_SEPARATORS
+        ),
+        "offsets": OffsetTextSplitter(
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            separators=DEFAULT_SEPARATORS
+        ),
+    }
+    
+    outputs = {}
+    seconds = {}
+    for name, splitter in splitters.items():
+        start = time.perf_counter()
+        outputs[name] = [splitter.split_text(doc) for doc in corpus]
+        seconds[name] = time.perf_counter() - start
+        num_chunks = sum(len(chunks) for chunks in outputs[name])
+        print(f"{name:<10} {seconds[name]:.2f}s  {megabytes / seconds[name]:.1f} MB/s  "
+              f"{num_chunks / seconds[name]:.0f} chunks/s  ({num_chunks} chunks)")
+    
+    # Offsets alone, without materializing the chunk strings
+    start = time.perf_counter()
+    for doc in corpus:
+        splitters["offsets"].split_offsets(doc)
+    offsets_seconds = time.perf_counter() - start
+    print(f"{'offsets*':<10} {offsets_seconds:.2f}s  {megabytes / offsets_seconds:.1f} MB/s  (spans only)")
+    
+    mismatched = sum(a != b for a, b in zip(outputs["langchain"], outputs["offsets"]))
+    print(f"Speedup: {seconds['langchain'] / seconds['offsets']:.2f}x")
+    print(f"Identical output: {mismatched == 0} ({mismatched} of {num_docs} documents differ)")
+    if mismatched:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Reproducible end-to-end benchmark suite on synthetic corpora.
+
+For every corpus size it measures chunking throughput, ``create_index`` time
+and memory, ``retrieve`` latency and end-to-end ``process_query`` throughput
+against the simulated LLM backend, plus the router throughput once. The
+results are written as JSON so runs can be diffed across releases.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_suite --sizes 1000 10000 100000 --output bench_results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Dict, Any
+
+import numpy as np
+import sklearn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import SyntheticCorpus
+from qna_rag_agent.src.utils.document_loader import DocumentLoader
+from qna_rag_agent.src.utils.vector_store import VectorStore
+from qna_rag_agent.src.utils.llm_service import LLMService
+from qna_rag_agent.src.utils.llm_backends import SimulatedBackend
+from qna_rag_agent.src.utils.context_packer import ContextPacker
+from qna_rag_agent.src.agents.router import QueryRouter
+from qna_rag_agent.src.agents.agent_orchestrator import AgentOrchestrator
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    """
+    Summarize per-call durations.
+    
+    Args:
+        seconds: Duration of each call in seconds
+        
+    Returns:
+        Calls per second and the mean, p50, p99 and max latency in milliseconds
+    """
+    ms = np.array(seconds) * 1000
+    return {
+        "calls": len(ms),
+        "per_s": round(len(ms) / max(ms.sum() / 1000, 1e-9), 2),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4)
+    }
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident memory of this process so far, in megabytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+def index_bytes(vector_store: VectorStore) -> int:
+    """
+    Size of the arrays of a TF-IDF index: term counts, weights and chunk store.
+    """
+    size = vector_store.documents.memory_bytes()
+    for matrix in (vector_store.term_counts, vector_store.document_embeddings):
+        size += matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return size
+
+def revision() -> str:
+    """
+    Git revision of the benchmarked tree, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_router(corpus: SyntheticCorpus, num_queries: int) -> Dict[str, Any]:
+    """
+    Measure how many queries per second the router classifies.
+    """
+    router = QueryRouter()
+    queries = corpus.queries(num_queries)
+    start = time.perf_counter()
+    for query in queries:
+        router.route(query)
+    seconds = time.perf_counter() - start
+    return {"queries": num_queries, "per_s": round(num_queries / seconds, 1)}
+
+def bench_corpus(corpus: SyntheticCorpus, num_chunks: int, corpus_dir: str, args) -> Dict[str, Any]:
+    """
+    Generate one corpus and run the chunking, index, retrieval and end-to-end stages.
+    
+    Args:
+        corpus: Corpus generator
+        num_chunks: Target number of chunks
+        corpus_dir: Directory to write the corpus to
+        args: Parsed command line arguments
+        
+    Returns:
+        Results of every stage
+    """
+    start = time.perf_counter()
+    written = corpus.write(corpus_dir, num_chunks, args.chunk_size, args.chunk_overlap)
+    result = {
+        "target_chunks": num_chunks,
+        "files": written["files"],
+        "megabytes": round(written["bytes"] / 1e6, 2),
+        "generation_s": round(time.perf_counter() - start, 3)
+    }
+    
+    # Chunking: the streaming loader used by the CLI
+    loader = DocumentLoader(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    with contextlib.redirect_stdout(io.StringIO()):
+        documents = [doc for batch in loader.stream_documents(corpus_dir, max_workers=args.ingest_workers)
+                     for doc in batch]
+    stats = loader.last_stats
+    result["chunks"] = len(documents)
+    result["chunking"] = {
+        "seconds": round(stats["seconds"], 3),
+        "mb_per_s": round(stats["mb_per_s"], 2),
+        "chunks_per_s": round(stats["chunks_per_s"], 1)
+    }
+    
+    # Index build; the retrieval cache is off so every query is scored
+    vector_store = VectorStore(retrieval_cache_size=0)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        vector_store.create_index(documents)
+    result["index"] = {
+        "seconds": round(time.perf_counter() - start, 3),
+        "index_mb": round(index_bytes(vector_store) / 1e6, 2),
+        "vocabulary": vector_store.term_counts.shape[1],
+        "peak_rss_mb": peak_rss_mb()
+    }
+    del documents
+    
+    # Retrieval latency of single queries
+    queries = corpus.queries(args.queries, kinds=("rag",), seed=num_chunks)
+    for query in queries[:10]:
+        vector_store.retrieve(query)
+    seconds = []
+    for query in queries:
+        start = time.perf_counter()
+        vector_store.retrieve(query)
+        seconds.append(time.perf_counter() - start)
+    result["retrieval"] = latency_summary(seconds)
+    
+    # End to end: routing, tools, retrieval, context packing and the simulated LLM
+    backend = SimulatedBackend(
+        latency_ms=args.llm_latency_ms,
+        latency_distribution="constant",
+        tokens_per_second=args.llm_tokens_per_second
+    )
+    agent = AgentOrchestrator(
+        vector_store=vector_store,
+        llm_service=LLMService(backend=backend, context_packer=ContextPacker())
+    )
+    seconds = []
+    routes = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for query in corpus.queries(args.e2e_queries, seed=num_chunks + 1):
+            start = time.perf_counter()
+            answer = agent.process_query(query)
+            seconds.append(time.perf_counter() - start)
+            route = answer["tool_used"] or "rag"
+            routes[route] = routes.get(route, 0) + 1
+    result["end_to_end"] = {**latency_summary(seconds), "llm_calls": backend.stats()["calls"], "routes": routes}
+    agent.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite on synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Corpus sizes in chunks (up to 1000000)")
+    parser.add_argument("--chunk_size", type=int, default=500, help="Size of document chunks")
+    parser.add_argument("--chunk_overlap", type=int, default=50, help="Overlap between document chunks")
+    parser.add_argument("--ingest_workers", type=int, default=None, help="Processes used to chunk documents (default: number of CPUs)")
+    parser.add_argument("--queries", type=int, default=500, help="Queries timed against retrieve")
+    parser.add_argument("--e2e_queries", type=int, default=200, help="Queries timed through process_query")
+    parser.add_argument("--router_queries", type=int, default=20000, help="Queries timed through the router")
+    parser.add_argument("--llm_latency_ms", type=float, default=0.0, help="Time to first token of the simulated LLM")
+    parser.add_argument("--llm_tokens_per_second", type=float, default=0.0, help="Generation speed of the simulated LLM (0 is instant)")
+    parser.add_argument("--corpus_dir", type=str, default=None, help="Directory to keep the generated corpora in (default: a temporary directory)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the corpora and queries")
+    parser.add_argument("--output", type=str, default="bench_results.json", help="JSON file the results are written to")
+    args = parser.parse_args()
+    
+    corpus = SyntheticCorpus(seed=args.seed)
+    report = {
+        "revision": revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "scikit_learn": sklearn.__version__
+        },
+        "parameters": vars(args),
+        "router": bench_router(corpus, args.router_queries),
+        "corpora": []
+    }
+    print(f"router      {report['router']['per_s']:.0f} queries/s")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = args.corpus_dir or temp_dir
+        for num_chunks in sorted(args.sizes):
+            result = bench_corpus(corpus, num_chunks, os.path.join(root, f"chunks_{num_chunks}"), args)
+            report["corpora"].append(result)
+            print(f"{result['chunks']:>8} chunks ({result['megabytes']:.1f} MB): "
+                  f"chunking {result['chunking']['mb_per_s']:.1f} MB/s, "
+                  f"index {result['index']['seconds']:.2f}s {result['index']['index_mb']:.1f} MB, "
+                  f"retrieve p50 {result['retrieval']['p50_ms']:.2f} ms p99 {result['retrieval']['p99_ms']:.2f} ms, "
+                  f"process_query {result['end_to_end']['per_s']:.1f}/s")
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Load-test the agent orchestrator offline against the simulated LLM backend.
+
+For every concurrency level, ``--requests`` questions are sent by that many
+concurrent clients (threads calling ``process_query``, or asyncio tasks
+awaiting ``aprocess_query`` with ``--mode async``). Throughput, latency
+percentiles, errors and the peak number of concurrent LLM calls are
+reported per level and written as JSON.
+
+``--server_rpm`` and ``--server_concurrency`` make the simulated backend
+throttle like a hosted API (429 errors beyond its limits); ``--scheduler``
+puts an ``LLMScheduler`` in front of it to pace, limit and retry requests,
+so both sides of a rate limit can be tested offline:
+
+    python -m benchmarks.load_test --concurrency 64 --server_rpm 1200 --scheduler --rpm 1100
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --concurrency 1 4 16 64 --requests 400 --latency_ms 300
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import SyntheticCorpus
+from qna_rag_agent.src.utils.document_loader import DocumentLoader
+from qna_rag_agent.src.utils.vector_store import VectorStore
+from qna_rag_agent.src.utils.llm_service import LLMService
+from qna_rag_agent.src.utils.llm_backends import SimulatedBackend
+from qna_rag_agent.src.utils.llm_scheduler import LLMScheduler
+from qna_rag_agent.src.utils.context_packer import ContextPacker
+from qna_rag_agent.src.agents.agent_orchestrator import AgentOrchestrator
+
+# RAG, calculator and mixed sample questions about the bundled documents
+# (dictionary questions call a web API and are left out)
+SAMPLE_QUERIES = [
+    "What is RAGent AI?",
+    "What products does RAGent AI offer?",
+    "Can you describe RAGent Search in more detail?",
+    "What makes RAGent Assistant unique?",
+    "What is the pricing of the Enterprise tier?",
+    "Calculate 25 * 16",
+    "What is RAGent AI and what is the square root of 50?",
+    "How many employees does RAGent AI have and calculate 25 * 16"
+]
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict[str, Any]:
+    """
+    Summarize one load level.
+    
+    Args:
+        latencies: Duration of every request in seconds (failed ones included)
+        errors: Number of failed requests
+        seconds: Wall-clock duration of the level
+        
+    Returns:
+        Throughput, error rate and latency percentiles in milliseconds
+    """
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "error_rate": round(errors / max(len(ms), 1), 4),
+        "seconds": round(seconds, 3),
+        "per_s": round(len(ms) / seconds, 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2)
+    }
+
+def run_threads(agent: AgentOrchestrator, queries: List[str], concurrency: int) -> Dict[str, Any]:
+    """
+    Send the queries from ``concurrency`` threads calling ``process_query``.
+    """
+    def timed(query: str) -> tuple:
+        start = time.perf_counter()
+        try:
+            agent.process_query(query)
+            failed = False
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="client") as executor:
+        outcomes = list(executor.map(timed, queries))
+    seconds = time.perf_counter() - start
+    return summarize([latency for latency, _ in outcomes], sum(failed for _, failed in outcomes), seconds)
+
+async def run_async(agent: AgentOrchestrator, queries: List[str], concurrency: int) -> Dict[str, Any]:
+    """
+    Send the queries from ``concurrency`` asyncio tasks awaiting ``aprocess_query``.
+    
+    The agent is closed on the same event loop afterwards.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def timed(query: str) -> tuple:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await agent.aprocess_query(query)
+                failed = False
+            except Exception:
+                failed = True
+            return time.perf_counter() - start, failed
+    
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(timed(query) for query in queries))
+    seconds = time.perf_counter() - start
+    await agent.aclose()
+    return summarize([latency for latency, _ in outcomes], sum(failed for _, failed in outcomes), seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the orchestrator with a simulated LLM")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64], help="Numbers of concurrent clients to test")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per concurrency level")
+    parser.add_argument("--mode", type=str, default="thread", choices=["thread", "async"], help="Clients are threads (process_query) or asyncio tasks (aprocess_query)")
+    parser.add_argument("--chunks", type=int, default=None, help="Index a synthetic corpus of this many chunks instead of the bundled documents")
+    parser.add_argument("--latency_ms", type=float, default=300.0, help="Time to first token of the simulated LLM (median for lognormal)")
+    parser.add_argument("--latency_distribution", type=str, default="lognormal", choices=["constant", "lognormal", "exponential"], help="Distribution of the time to first token")
+    parser.add_argument("--latency_sigma", type=float, default=0.5, help="Standard deviation of the log latency for lognormal")
+    parser.add_argument("--tokens_per_second", type=float, default=100.0, help="Generation speed of the simulated LLM (0 is instant)")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--server_rpm", type=float, default=None, help="Requests per minute the simulated LLM accepts before throttling with 429")
+    parser.add_argument("--server_burst", type=float, default=None, help="Requests the simulated LLM accepts at once under --server_rpm (default: one second's worth)")
+    parser.add_argument("--server_concurrency", type=int, default=None, help="Concurrent requests the simulated LLM accepts before throttling with 429")
+    parser.add_argument("--scheduler", action="store_true", help="Send LLM requests through an LLMScheduler (rate limits, adaptive concurrency, retries)")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute the scheduler paces to")
+    parser.add_argument("--burst", type=float, default=None, help="Requests the scheduler starts at once under --rpm (default: one minute's worth)")
+    parser.add_argument("--tpm", type=float, default=None, help="Tokens per minute the scheduler paces to")
+    parser.add_argument("--deadline", type=float, default=60.0, help="Seconds a scheduled LLM request may take in total")
+    parser.add_argument("--max_retries", type=int, default=3, help="Retries per scheduled LLM request")
+    parser.add_argument("--max_concurrency", type=int, default=32, help="Highest concurrency limit of the scheduler")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the latencies, errors and synthetic corpus")
+    parser.add_argument("--output", type=str, default="load_results.json", help="JSON file the results are written to")
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as temp_dir:
+        if args.chunks:
+            corpus = SyntheticCorpus(seed=args.seed)
+            data_dir = temp_dir
+            corpus.write(data_dir, args.chunks)
+            queries = corpus.queries(args.requests, seed=args.seed)
+        else:
+            data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "qna_rag_agent", "data")
+            queries = [SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)] for i in range(args.requests)]
+        documents = DocumentLoader(chunk_size=500, chunk_overlap=50).load_and_split_documents(data_dir)
+        vector_store = VectorStore()
+        vector_store.create_index(documents)
+    
+    report = {"parameters": vars(args), "levels": []}
+    for concurrency in args.concurrency:
+        # A fresh backend per level, so every level sees the same latency draws
+        backend = SimulatedBackend(
+            latency_ms=args.latency_ms,
+            latency_distribution=args.latency_distribution,
+            latency_sigma=args.latency_sigma,
+            tokens_per_second=args.tokens_per_second,
+            error_rate=args.error_rate,
+            requests_per_minute=args.server_rpm,
+            burst=args.server_burst,
+            max_concurrency=args.server_concurrency,
+            seed=args.seed
+        )
+        scheduler = None
+        if args.scheduler:
+            scheduler = LLMScheduler(
+                backend,
+                requests_per_minute=args.rpm,
+                tokens_per_minute=args.tpm,
+                request_burst=args.burst,
+                deadline=args.deadline,
+                max_retries=args.max_retries,
+                max_concurrency=args.max_concurrency,
+                seed=args.seed
+            )
+        agent = AgentOrchestrator(
+            vector_store=vector_store,
+            llm_service=LLMService(backend=scheduler or backend, context_packer=ContextPacker())
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            if args.mode == "async":
+                result = asyncio.run(run_async(agent, queries, concurrency))
+            else:
+                result = run_threads(agent, queries, concurrency)
+        agent.close()
+        
+        result = {"concurrency": concurrency, **result, "backend": backend.stats()}
+        if scheduler is not None:
+            result["scheduler"] = scheduler.stats()
+        report["levels"].append(result)
+        print(f"concurrency {concurrency:>4}: {result['per_s']:8.1f} req/s  "
+              f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  "
+              f"errors {result['errors']}  throttled {result['backend']['throttled']}  "
+              f"LLM calls in flight <= {result['backend']['max_in_flight']}")
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Synthetic corpora and queries for the benchmarks.
+
+Documents imitate the files in ``qna_rag_agent/data``: FAQs ("Q: ... A: ..."),
+glossaries ("**Term**: ...") and product specifications (headings and
+bullet lists). Words are drawn from a Zipf distribution over a fixed
+vocabulary, so term frequencies and posting list lengths look like natural
+text, and everything is reproducible from the seed.
+"""
+import os
+from typing import List, Dict, Any, Iterator
+
+import numpy as np
+
+DOMAIN_WORDS = (
+    "retrieval augmented generation model vector index query answer document chunk "
+    "embedding latency throughput search assistant analytics connect company customer "
+    "support pricing plan enterprise token context window hallucination accuracy "
+    "pipeline integration security compliance dashboard knowledge workflow agent "
+    "deployment cloud api storage cache ranking relevance semantic keyword"
+).split()
+
+PRODUCTS = ["Search", "Assistant", "Analytics", "Connect", "Studio", "Guard", "Index", "Flow"]
+
+SYLLABLES = [
+    "ka", "ri", "to", "ven", "lu", "mo", "sar", "pel", "dri", "quo", "zen", "fa",
+    "bel", "tor", "nim", "os", "tra", "li", "gor", "ux", "plen", "ca", "shi", "ver"
+]
+
+# Average chunk length as a fraction of chunk_size minus the overlap, used to
+# size a corpus (chunks end at paragraph breaks, so most are not full)
+CHUNK_FILL = 0.67
+
+class SyntheticCorpus:
+    def __init__(self, seed: int = 0, vocabulary_size: int = 20000, zipf_exponent: float = 1.07):
+        """
+        Initialize the generator.
+        
+        Args:
+            seed: Random seed; the same seed always yields the same corpus and queries
+            vocabulary_size: Number of distinct words (domain words plus pseudo-words)
+            zipf_exponent: Exponent of the word frequency distribution
+        """
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        
+        # Domain words are the most frequent, followed by pronounceable pseudo-words
+        words = list(DOMAIN_WORDS)
+        seen = set(words)
+        while len(words) < vocabulary_size:
+            word = "".join(rng.choice(SYLLABLES, size=rng.integers(2, 5)))
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+        self.vocabulary = np.array(words, dtype=object)
+        
+        weights = 1.0 / np.arange(1, vocabulary_size + 1) ** zipf_exponent
+        self.cdf = np.cumsum(weights / weights.sum())
+    
+    def write(self, directory: str, num_chunks: int, chunk_size: int = 500, chunk_overlap: int = 50,
+              chunks_per_file: int = 1000) -> Dict[str, Any]:
+        """
+        Write a corpus of about ``num_chunks`` chunks as text files.
+        
+        Args:
+            directory: Directory to write the files to (created if missing)
+            num_chunks: Approximate number of chunks the corpus splits into
+            chunk_size: Chunk size the corpus will be split with
+            chunk_overlap: Chunk overlap the corpus will be split with
+            chunks_per_file: Approximate number of chunks per file
+            
+        Returns:
+            Number of files and bytes written
+        """
+        os.makedirs(directory, exist_ok=True)
+        rng = np.random.default_rng([self.seed, num_chunks])
+        chars_per_chunk = (chunk_size - chunk_overlap) * CHUNK_FILL
+        total_chars = int(num_chunks * chars_per_chunk)
+        file_chars = int(chunks_per_file * chars_per_chunk)
+        styles = [self._faq, self._glossary, self._specification]
+        
+        stats = {"files": 0, "bytes": 0}
+        while stats["bytes"] < total_chars:
+            style = styles[stats["files"] % len(styles)]
+            text = "".join(self._take(style(rng), min(file_chars, total_chars - stats["bytes"])))
+            path = os.path.join(directory, f"{style.__name__.strip('_')}_{stats['files']:05d}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            stats["files"] += 1
+            stats["bytes"] += len(text.encode("utf-8"))
+        return stats
+    
+    def queries(self, num_queries: int, kinds: tuple = ("rag", "calculator", "mixed"), seed: int = 0) -> List[str]:
+        """
+        Generate questions about the corpus.
+        
+        ``rag`` questions ask about frequent corpus terms and products,
+        ``calculator`` questions are arithmetic, and ``mixed`` questions
+        combine both. Dictionary questions are left out because the
+        dictionary tool calls a web API.
+        
+        Args:
+            num_queries: Number of questions
+            kinds: Kinds of questions to draw from, in equal proportions
+            seed: Random seed of the question set
+            
+        Returns:
+            The questions
+        """
+        rng = np.random.default_rng([self.seed, seed, 1])
+        queries = []
+        for i in range(num_queries):
+            kind = kinds[i % len(kinds)]
+            terms = self._words(rng, 3, top=2000)
+            product = rng.choice(PRODUCTS)
+            a, b = rng.integers(2, 1000, size=2)
+            if kind == "rag":
+                template = rng.integers(3)
+                if template == 0:
+                    queries.append(f"What is {terms[0]} {terms[1]}?")
+                elif template == 1:
+                    queries.append(f"How does RAGent {product} handle {terms[0]} and {terms[1]}?")
+                else:
+                    queries.append(f"Tell me about {terms[0]} {terms[1]} {terms[2]}")
+            elif kind == "calculator":
+                queries.append(f"Calculate {a} {rng.choice(['+', '-', '*', '/'])} {b}")
+            else:
+                queries.append(f"How does RAGent {product} support {terms[0]} and what is {a} + {b}?")
+        return queries
+    
+    def _words(self, rng: np.random.Generator, count: int, top: int = None) -> np.ndarray:
+        """
+        Draw words from the Zipf distribution (optionally only the ``top`` most frequent).
+        """
+        cdf = self.cdf if top is None else self.cdf[:top] / self.cdf[top - 1]
+        return self.vocabulary[np.searchsorted(cdf, rng.random(count))]
+    
+    def _sentences(self, rng: np.random.Generator, count: int) -> str:
+        """
+        Generate sentences of 6 to 24 words.
+        """
+        lengths = rng.integers(6, 25, size=count)
+        words = self._words(rng, int(lengths.sum()))
+        sentences = []
+        start = 0
+        for length in lengths:
+            sentences.append(" ".join(words[start:start + length]).capitalize() + ".")
+            start += length
+        return " ".join(sentences)
+    
+    def _title(self, rng: np.random.Generator, count: int) -> str:
+        return " ".join(word.capitalize() for word in self._words(rng, count, top=2000))
+    
+    def _faq(self, rng: np.random.Generator) -> Iterator[str]:
+        while True:
+            terms = self._words(rng, 3, top=2000)
+            yield f"Q: What is the {terms[0]} {terms[1]} of RAGent {rng.choice(PRODUCTS)}?\n"
+            yield f"A: {self._sentences(rng, rng.integers(2, 6))}\n\n"
+    
+    def _glossary(self, rng: np.random.Generator) -> Iterator[str]:
+        yield f"# {self._title(rng, 2).upper()} GLOSSARY: KEY TERMS AND CONCEPTS\n\n"
+        while True:
+            yield f"## {self._title(rng, 3)}\n\n"
+            for _ in range(rng.integers(3, 8)):
+                yield f"**{self._title(rng, 2)}**: {self._sentences(rng, rng.integers(1, 4))}\n\n"
+    
+    def _specification(self, rng: np.random.Generator) -> Iterator[str]:
+        yield f"# RAGent {rng.choice(PRODUCTS)} - Product Specifications\n\n"
+        while True:
+            yield f"## {self._title(rng, 2)}\n{self._sentences(rng, rng.integers(2, 5))}\n\n"
+            yield "## Key Features\n"
+            for _ in range(rng.integers(3, 7)):
+                yield f"- {self._sentences(rng, 1)}\n"
+            yield "\n"
+    
+    @staticmethod
+    def _take(pieces: Iterator[str], num_chars: int) -> Iterator[str]:
+        """
+        Take pieces until at least ``num_chars`` characters have been produced.
+        """
+        size = 0
+        for piece in pieces:
+            yield piece
+            size += len(piece)
+            if size >= num_chars:
+                return
@@ -5,6 +5,7 @@ import os
 import sys
 from qna_rag_agent.src.utils.document_loader import DocumentLoader
 from qna_rag_agent.src.utils.vector_store import VectorStore
+from qna_rag_agent.src.utils.chunk_store import estimate_dict_storage_bytes
 
 def main():
     # Set up paths
@@ -39,6 +40,13 @@ def main():
     # Create index
     vector_store.create_index(documents)
     
+    # Compare the columnar chunk store with the plain list of chunk dicts
+    num_chunks = max(len(documents), 1)
+    dict_bytes = estimate_dict_storage_bytes(documents)
+    columnar_bytes = vector_store.documents.memory_bytes()
+    print(f"Chunk storage: {dict_bytes / num_chunks:.0f} bytes/chunk as dicts, "
+          f"{columnar_bytes / num_chunks:.0f} bytes/chunk columnar")
+    
     # Test queries
     test_queries = [
         "What is RAGent AI?",
@@ -55,6 +63,17 @@ def main():
             print(f"\nResult {i+1} (score: {result['score']:.4f}):")
             print(f"Source: {result['metadata']['source']}")
             print(f"Content: {result['content'][:150]}...")
+    
+    # Compare the dense LSA + IVF search against the exact sparse search
+    print("\n\nDense index recall/latency trade-off:")
+    vector_store.enable_dense_index(n_components=64)
+    report = vector_store.evaluate_dense_index(test_queries, top_k=3)
+    for row in report:
+        nprobe = row["nprobe"] if row["nprobe"] is not None else "-"
+        print(f"{row['mode']:<13} nprobe={nprobe:<3} "
+              f"recall@3 vs sparse={row['recall_vs_sparse']:.2f} "
+              f"vs dense exact={row['recall_vs_dense_exact']:.2f} "
+              f"{row['ms_per_query']:.3f} ms/query")
 
 if __name__ == "__main__":
     main()
@@ -1,246 +1,525 @@
 """
 Agent orchestrator for routing queries to the appropriate tools or RAG pipeline.
 """
-import re
-from typing import Dict, Any, List, Optional
+import asyncio
+import contextvars
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterator
 from ..utils.vector_store import VectorStore
 from ..utils.llm_service import LLMService
+from ..utils.tracing import tracer
 from .tools import CalculatorTool, DictionaryTool
+from .router import QueryRouter
 
 class AgentOrchestrator:
-    def __init__(self, vector_store: VectorStore, llm_service: LLMService):
+    def __init__(self, vector_store: VectorStore, llm_service: LLMService,
+                 speculative_retrieval: bool = False):
         """
         Initialize the agent orchestrator.
         
         Args:
             vector_store: Vector store for retrieving relevant documents
             llm_service: LLM service for generating answers
+            speculative_retrieval: Start retrieval as soon as a query arrives,
+                in parallel with routing, and discard it if a tool answers
+                the query on its own
         """
         self.vector_store = vector_store
         self.llm_service = llm_service
+        self.speculative_retrieval = speculative_retrieval
         self.tools = {
             "calculator": CalculatorTool(),
             "dictionary": DictionaryTool()
         }
         
-        # Patterns for routing to specific tools
-        self.patterns = {
-            "calculator": r"\b(calculate|compute|evaluate|solve|find the value of|math|age|born in|how old|years old|square root|sqrt|\d+\s*\+|\d+\s*\-|\d+\s*\*|\d+\s*\/|\d+\s*\^)\b|\b(what is\s+[\d\+\-\*\/\(\)]+)\b",
-            "dictionary": r"\b(define|definition of|meaning of|what does .* mean)\b(?!.*\bin AI\b|.*\bin artificial intelligence\b)"
-        }
+        # Compiled router deciding between the tools, RAG and mixed processing
+        self.router = QueryRouter()
+        
+        # Runs the sub-tasks of a query (and speculative retrievals) concurrently
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="subtask")
+        
+        # Outcomes of speculative retrievals: used by the RAG path, or wasted on a
+        # tool-only query (cancelled ones were discarded before they started)
+        self._speculation_lock = threading.Lock()
+        self._speculation_counts = {"used": 0, "wasted": 0, "cancelled": 0}
     
-    def _should_use_tool(self, query: str) -> Optional[str]:
+    def process_query(self, query: str) -> Dict[str, Any]:
         """
-        Determine if a query should be routed to a specific tool.
+        Process a user query through the agent workflow.
         
         Args:
             query: The user's question
             
         Returns:
-            Name of the tool to use, or None for RAG
-        """
-        query_lower = query.lower()
-        
-        # Check for AI-related queries that should always use RAG
-        ai_related_patterns = [
-            r'\b(ai|artificial intelligence|machine learning|neural network|llm|large language model)\b',
-            r'\bhallucination\b',
-            r'\brag\b',
-            r'\bretrieval augmented generation\b',
-            r'\bwhat\s+is\s+the\s+meaning\s+of\s+\w+\s+in\s+ai\b',
-            r'\bwhat\s+does\s+\w+\s+mean\s+in\s+ai\b',
-            r'\bdefine\s+["\']?\w+\s+in\s+ai["\']?\b'
-        ]
-        
-        for pattern in ai_related_patterns:
-            if re.search(pattern, query_lower):
-                return None  # Use RAG for AI-related queries
-        
-        # Special case for system-specific terminology and concepts
-        system_terms = [
-            r'\b(ragent|rag agent|company|product|headquarter|employee|technology)\b',
-            r'\b(agentic|routing|workflow|pipeline|architecture|vector store|llm service)\b',
-            r'\b(this system|the system|our system)\b',
-            r'\bhow\s+\w+\s+works\s+in\s+this\s+system\b',
-            r'\bdefine\s+["\']?\w+\s+routing["\']?\b',  # Handle 'define X routing' patterns
-        ]
+            Dictionary containing the processing results
+        """
+        for event in self._run(query, stream=False):
+            pass
+        return event["result"]
+    
+    def process_query_stream(self, query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Process a user query and yield progress events as they happen.
         
-        # Check for AI terminology definitions that should be handled by RAG
-        ai_terms = [
-            'artificial intelligence', 'machine learning', 'deep learning', 'neural network',
-            'transformer', 'llm', 'large language model', 'retrieval augmented generation', 'rag',
-            'vector database', 'embedding', 'fine-tuning', 'prompt engineering', 'attention mechanism',
-            'tokenization', 'nlp', 'natural language processing', 'generative ai', 'hallucination',
-            'ai alignment', 'bias', 'explainable ai', 'ai safety', 'responsible ai', 'ai governance',
-            'multimodal ai', 'diffusion model', 'foundation model', 'agent', 'agentic workflow',
-            'agentic routing', 'tool use', 'in-context learning', 'parameter-efficient fine-tuning',
-            'quantization', 'perplexity', 'context window', 'token'
-        ]
+        Events are dictionaries with a ``type`` key:
         
-        # If the query is asking for a definition of an AI term, use RAG
-        for term in ai_terms:
-            pattern = r'\bdefine\s+["\']?' + re.escape(term) + r'["\']?\b'
-            if re.search(pattern, query_lower):
-                return None  # Use RAG for AI term definitions
+        - ``route``: the routing ``decision``, ``tool_used`` and ``tool_input``
+        - ``tool``: the ``tool_output`` of the calculator or dictionary tool
+        - ``retrieval``: the ``retrieved_context`` chunks
+        - ``token``: a piece of the answer ``text``
+        - ``done``: the complete ``result``, as returned by ``process_query``
         
-        for pattern in system_terms:
-            if re.search(pattern, query_lower):
-                return None  # Use RAG for system-related queries
+        Args:
+            query: The user's question
+            
+        Yields:
+            Progress events, ending with ``done``
+        """
+        return self._run(query, stream=True)
+    
+    def _run(self, query: str, stream: bool) -> Iterator[Dict[str, Any]]:
+        """
+        Run the agent workflow, yielding progress events.
         
-        # Check for tool patterns
-        for tool_name, pattern in self.patterns.items():
-            if re.search(pattern, query_lower):
-                return tool_name
+        The result of the ``done`` event includes the time to the first
+        answer token (``ttft_ms``) and the total time (``total_ms``).
         
-        return None
+        Args:
+            query: The user's question
+            stream: Stream answer tokens from the LLM instead of waiting for
+                the whole answer
+            
+        Yields:
+            Progress events, ending with ``done``
+        """
+        with tracer.trace() as spans:
+            start = time.perf_counter()
+            speculation = self._speculate(query) if self.speculative_retrieval else None
+            result = self._route(query)
+            result["trace"] = spans
+            yield {"type": "route", **{key: result[key] for key in ("decision", "tool_used", "tool_input")}}
+            
+            # Run the tools and retrieval (all sub-tasks of mixed queries at once)
+            subtasks = result["subtasks"]
+            futures = self._resolve_speculation(result, speculation)
+            pending = [i for i, future in enumerate(futures) if future is None]
+            for i in pending[:-1]:
+                futures[i] = self.executor.submit(contextvars.copy_context().run, self._run_subtask, subtasks[i])
+            outputs = [None] * len(subtasks)
+            if pending:
+                # The last sub-task runs in this thread
+                outputs[pending[-1]] = self._run_subtask(subtasks[pending[-1]])
+            for i, future in enumerate(futures):
+                if future is not None:
+                    outputs[i] = future.result()
+            self._collect_outputs(result, subtasks, outputs)
+            
+            if result["tool_output"] is not None:
+                yield {"type": "tool", "tool_output": result["tool_output"]}
+            
+            if result["tool_used"] in (None, "mixed"):
+                yield {"type": "retrieval", "retrieved_context": result["retrieved_context"]}
+                
+                context = self._llm_context(result)
+                index_version = getattr(self.vector_store, "index_version", None)
+                if stream:
+                    pieces = self.llm_service.generate_answer_stream(query, context, index_version=index_version)
+                else:
+                    pieces = [self.llm_service.generate_answer(query, context, index_version=index_version)]
+            else:
+                pieces = [result["tool_output"]]
+            
+            answer = []
+            ttft_ms = None
+            for piece in pieces:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                answer.append(piece)
+                yield {"type": "token", "text": piece}
+            result["answer"] = "".join(answer)
+            result["ttft_ms"] = ttft_ms if ttft_ms is not None else (time.perf_counter() - start) * 1000
+            result["total_ms"] = (time.perf_counter() - start) * 1000
+            tracer.record("query", result["total_ms"], route=result["tool_used"] or "rag")
+            
+            yield {"type": "done", "result": result}
     
-    def _extract_tool_input(self, query: str, tool_name: str) -> str:
+    async def aprocess_query(self, query: str) -> Dict[str, Any]:
         """
-        Extract the relevant input for a tool from the query.
+        Process a user query without blocking the event loop.
+        
+        The dictionary lookup and the LLM call are awaited natively, and the
+        CPU-bound retrieval runs in the loop's default executor, so many
+        questions can be in flight in one process while waiting on the LLM.
         
         Args:
             query: The user's question
-            tool_name: Name of the tool to use
             
         Returns:
-            Extracted input for the tool
-        """
-        query_lower = query.lower()
-        
-        if tool_name == "calculator":
-            # Try to extract a mathematical expression
-            # Look for patterns like "calculate 2+2" or "what is 5*3"
-            patterns = [
-                r"calculate\s+(.*)",
-                r"compute\s+(.*)",
-                r"evaluate\s+(.*)",
-                r"solve\s+(.*)",
-                r"what is\s+(.*)",
-                r"find the value of\s+(.*)"
-            ]
+            Dictionary containing the processing results
+        """
+        with tracer.trace() as spans:
+            start = time.perf_counter()
+            speculation = self._speculate(query) if self.speculative_retrieval else None
+            result = self._route(query)
+            result["trace"] = spans
             
-            for pattern in patterns:
-                match = re.search(pattern, query_lower)
-                if match:
-                    return match.group(1).strip()
-            
-            # If no pattern matches, just use the query as is
-            return query
-        
-        elif tool_name == "dictionary":
-            # Try to extract a word to define
-            # Look for patterns like "define apple" or "what does apple mean"
-            patterns = [
-                r"define\s+(.*)",
-                r"definition of\s+(.*)",
-                r"meaning of\s+(.*)",
-                r"what does\s+(.*?)\s+mean"
-            ]
+            # Run the tools and retrieval (all sub-tasks of mixed queries at once)
+            futures = self._resolve_speculation(result, speculation)
+            outputs = await asyncio.gather(*(
+                self._arun_subtask(subtask) if future is None else asyncio.wrap_future(future)
+                for subtask, future in zip(result["subtasks"], futures)
+            ))
+            self._collect_outputs(result, result["subtasks"], outputs)
             
-            for pattern in patterns:
-                match = re.search(pattern, query_lower)
-                if match:
-                    return match.group(1).strip()
+            if result["tool_used"] in (None, "mixed"):
+                result["answer"] = await self.llm_service.agenerate_answer(
+                    query, self._llm_context(result),
+                    index_version=getattr(self.vector_store, "index_version", None)
+                )
+            else:
+                result["answer"] = result["tool_output"]
+            
+            result["ttft_ms"] = result["total_ms"] = (time.perf_counter() - start) * 1000
+            tracer.record("query", result["total_ms"], route=result["tool_used"] or "rag")
+        return result
+    
+    def process_batch(self, queries: List[str], max_concurrency: int = 8) -> List[Dict[str, Any]]:
+        """
+        Process many queries at once.
+        
+        All queries are routed first, the RAG-bound ones are retrieved in one
+        vectorized pass (``retrieve_many``, when the retriever has it), and the
+        tool and LLM calls are fanned out over a pool of ``max_concurrency``
+        threads. Repeated queries are processed once and every position gets
+        its own deep copy of the result. A query that fails does not affect the
+        others: its result has ``error`` set and no answer.
+        
+        Args:
+            queries: The user questions
+            max_concurrency: Maximum number of tool/LLM calls in flight
             
-            # If no pattern matches, just use the query as is
-            return query
+        Returns:
+            One result dictionary per query, in input order, each with an
+            ``error`` (None on success) and ``total_ms``
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        
+        start = time.perf_counter()
+        unique_queries = list(dict.fromkeys(queries))
+        results = []
+        for query in unique_queries:
+            with tracer.trace() as spans:
+                try:
+                    result = self._route(query)
+                    result["error"] = None
+                except Exception as e:
+                    result = {"query": query, "answer": None, "error": f"Error: {str(e)}"}
+            result["trace"] = spans
+            results.append(result)
+        
+        # Retrieve for every RAG-bound query in one pass
+        rag_results = [
+            result for result in results
+            if result["error"] is None and result["tool_used"] in (None, "mixed")
+        ]
+        rag_queries = [result["query"] for result in rag_results]
+        retrieval_start = time.perf_counter()
+        try:
+            with tracer.span("batch_retrieval", queries=len(rag_queries)):
+                if hasattr(self.vector_store, "retrieve_many"):
+                    rankings = self.vector_store.retrieve_many(rag_queries)
+                else:
+                    rankings = [self.vector_store.retrieve(query) for query in rag_queries]
+            for result, ranking in zip(rag_results, rankings):
+                result["retrieved_context"] = ranking
+        except Exception:
+            # Isolate the failing queries by retrieving one at a time
+            for result in rag_results:
+                try:
+                    result["retrieved_context"] = self.vector_store.retrieve(result["query"])
+                except Exception as e:
+                    result["error"] = f"Error: {str(e)}"
+        
+        # The batched retrieval is shared, so each query is charged all of it
+        for result in rag_results:
+            for subtask in result["subtasks"]:
+                if subtask["type"] == "rag":
+                    subtask["ms"] = (time.perf_counter() - retrieval_start) * 1000
+                    with tracer.trace(result["trace"]):
+                        tracer.record("retrieval", subtask["ms"], chunks=len(result.get("retrieved_context") or []), batch=True)
+        
+        retrieval_ms = (time.perf_counter() - start) * 1000
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch-query") as executor:
+            futures = [
+                executor.submit(self._finish_batch_query, result)
+                for result in results if result["error"] is None
+            ]
+            for future in futures:
+                future.result()
         
-        return query
+        # Routing and retrieval are shared by the batch and charged to every query
+        for result in results:
+            result["total_ms"] = retrieval_ms + result.pop("finish_ms", 0.0)
+            with tracer.trace(result["trace"]):
+                tracer.record("query", result["total_ms"], route=result.get("tool_used") or "rag", batch=True)
+        
+        results = dict(zip(unique_queries, results))
+        # Deep copies: repeated queries must not share their context, sub-task or trace lists
+        return [copy.deepcopy(results[query]) for query in queries]
     
-    def process_query(self, query: str) -> Dict[str, Any]:
+    def _finish_batch_query(self, result: Dict[str, Any]):
         """
-        Process a user query through the agent workflow.
+        Run the tool and LLM steps of a routed and retrieved batch query.
+        
+        Errors are recorded in the result instead of being raised.
+        
+        Args:
+            result: Result dictionary from ``process_batch``, updated in place
+        """
+        start = time.perf_counter()
+        try:
+            # Continue the query's trace in this worker thread
+            with tracer.trace(result["trace"]):
+                # Retrieval is done; run the tool sub-tasks in this worker thread
+                tool_subtasks = [subtask for subtask in result["subtasks"] if subtask["type"] != "rag"]
+                outputs = [self._run_subtask(subtask) for subtask in tool_subtasks]
+                self._collect_outputs(result, tool_subtasks, outputs)
+                
+                if result["tool_used"] in (None, "mixed"):
+                    result["answer"] = self.llm_service.generate_answer(
+                        result["query"], self._llm_context(result),
+                        index_version=getattr(self.vector_store, "index_version", None)
+                    )
+                else:
+                    result["answer"] = result["tool_output"]
+        except Exception as e:
+            result["error"] = f"Error: {str(e)}"
+        result["finish_ms"] = (time.perf_counter() - start) * 1000
+    
+    def _route(self, query: str) -> Dict[str, Any]:
+        """
+        Decide how to handle a query.
         
         Args:
             query: The user's question
             
         Returns:
-            Dictionary containing the processing results
+            Result dictionary with the decision, tool and tool input filled in
         """
         # Log the query
         print(f"Processing query: {query}")
         
+        result = {
+            "query": query,
+            "decision": "Used RAG pipeline",
+            "tool_used": None,
+            "tool_input": None,
+            "tool_output": None,
+            "retrieved_context": None,
+            "answer": None,
+            "subtasks": [{"type": "rag", "input": query}]
+        }
+        
         # Check for mixed queries (containing both tool-related and general knowledge questions)
-        import re
+        start = time.perf_counter()
+        route = self.router.route(query)
+        if route == "mixed":
+            result["decision"] = "Used mixed approach: calculator + RAG"
+            result["tool_used"] = "mixed"
+            # Decompose into every arithmetic expression and definition lookup, plus retrieval
+            tool_subtasks = [{"type": "calculator", "input": expression} for expression in self.router.math_expressions(query)]
+            tool_subtasks += [{"type": "dictionary", "input": word} for word in self.router.definition_words(query)]
+            result["tool_input"] = "; ".join(subtask["input"] for subtask in tool_subtasks)
+            result["subtasks"] = tool_subtasks + result["subtasks"]
+        elif route in self.tools:
+            # Standard single-intent processing
+            result["decision"] = f"Used {route} tool"
+            result["tool_used"] = route
+            # Extract tool input
+            result["tool_input"] = self.router.tool_input(query, route)
+            result["subtasks"] = [{"type": route, "input": result["tool_input"]}]
         
-        # Look for mathematical patterns, especially square root
-        math_pattern = r'(square root of \d+(\.\d+)?|sqrt\s*\(?\s*\d+(\.\d+)?\s*\)?|\d+\s*[\+\-\*\/\^]\s*\d+)'
-        math_match = re.search(math_pattern, query.lower())
+        tracer.record("routing", (time.perf_counter() - start) * 1000, subtasks=len(result["subtasks"]))
+        tracer.increment("queries", route=result["tool_used"] or "rag")
         
-        # If we have a mixed query with a math component
-        if math_match and len(query.split()) > 6:  # More than 6 words suggests a mixed query
-            # Extract the math part
-            math_part = math_match.group(0)
-            
-            # Process the math part with calculator tool
-            calculator_tool = self.tools["calculator"]
-            calc_result = calculator_tool.run(math_part)
-            
-            # Process the rest with RAG
-            # Retrieve relevant documents
-            retrieved_chunks = self.vector_store.retrieve(query)
-            
-            # Generate answer using LLM, including the calculation result
-            context_with_calc = retrieved_chunks + [{
-                "content": f"Calculation result: {math_part} = {calc_result['output']}",
-                "metadata": {"source": "calculator_tool", "chunk_id": 999}
-            }]
-            
-            answer = self.llm_service.generate_answer(query, context_with_calc)
-            
-            # Log the decision
+        # Log the decision
+        if result["tool_used"] == "mixed":
             print(f"Using mixed approach: calculator + RAG")
-            
-            return {
-                "query": query,
-                "decision": "Used mixed approach: calculator + RAG",
-                "tool_used": "mixed",
-                "tool_input": math_part,
-                "tool_output": calc_result["output"],
-                "retrieved_context": retrieved_chunks,
-                "answer": answer
-            }
+        elif result["tool_used"]:
+            print(f"Using tool: {result['tool_used']}")
+        else:
+            print(f"Using RAG pipeline")
         
-        # Standard single-intent processing
-        tool_name = self._should_use_tool(query)
+        return result
+    
+    def speculation_stats(self) -> Dict[str, Any]:
+        """
+        Report how speculative retrievals were used.
         
-        if tool_name and tool_name in self.tools:
-            # Extract tool input
-            tool_input = self._extract_tool_input(query, tool_name)
-            
-            # Use the appropriate tool
-            tool = self.tools[tool_name]
-            tool_result = tool.run(tool_input)
-            
-            # Log the decision
-            print(f"Using tool: {tool_name}")
-            
-            return {
-                "query": query,
-                "decision": f"Used {tool_name} tool",
-                "tool_used": tool_name,
-                "tool_input": tool_input,
-                "tool_output": tool_result["output"],
-                "retrieved_context": None,
-                "answer": tool_result["output"]
-            }
-        else:
-            # Use RAG pipeline
-            # Retrieve relevant documents
-            retrieved_chunks = self.vector_store.retrieve(query)
+        Returns:
+            Counts of ``used``, ``wasted`` and ``cancelled`` (wasted before
+            they started) speculations, and the ``wasted_rate``
+        """
+        with self._speculation_lock:
+            stats = dict(self._speculation_counts)
+        total = stats["used"] + stats["wasted"]
+        stats["wasted_rate"] = stats["wasted"] / total if total else 0.0
+        return stats
+    
+    def close(self):
+        """
+        Shut down the sub-task thread pool and close the tools' HTTP clients.
+        """
+        self.executor.shutdown()
+        for tool in self.tools.values():
+            if hasattr(tool, "close"):
+                tool.close()
+    
+    async def aclose(self):
+        """
+        Same as ``close``, from the event loop ``aprocess_query`` ran on.
+        """
+        for tool in self.tools.values():
+            if hasattr(tool, "aclose"):
+                await tool.aclose()
+        self.close()
+    
+    def _speculate(self, query: str) -> tuple:
+        """
+        Start retrieving for a query before it is routed.
+        
+        Args:
+            query: The user's question
             
-            # Generate answer using LLM
-            answer = self.llm_service.generate_answer(query, retrieved_chunks)
+        Returns:
+            The retrieval sub-task and the future of its output
+        """
+        subtask = {"type": "rag", "input": query}
+        return subtask, self.executor.submit(contextvars.copy_context().run, self._run_subtask, subtask)
+    
+    def _resolve_speculation(self, result: Dict[str, Any], speculation: Optional[tuple]) -> List[Any]:
+        """
+        Use a speculative retrieval for a routed query, or discard it.
+        
+        Args:
+            result: Routed result dictionary; its retrieval sub-task is
+                replaced by the speculative one
+            speculation: Return value of ``_speculate``, or None
             
-            # Log the decision
-            print(f"Using RAG pipeline")
+        Returns:
+            One future per sub-task: the speculative retrieval, or None for
+            sub-tasks that still have to run
+        """
+        futures = [None] * len(result["subtasks"])
+        if speculation is None:
+            return futures
+        
+        subtask, future = speculation
+        if result["subtasks"][-1]["type"] == "rag":
+            result["subtasks"][-1] = subtask
+            futures[-1] = future
+            outcome = "used"
+        else:
+            # A tool answers the query on its own
+            outcome = "cancelled" if future.cancel() else "wasted"
+        
+        with self._speculation_lock:
+            self._speculation_counts[outcome] += 1
+            if outcome == "cancelled":
+                self._speculation_counts["wasted"] += 1
+        return futures
+    
+    def _run_subtask(self, subtask: Dict[str, Any]) -> Any:
+        """
+        Run one sub-task and record its duration in ``ms``.
+        
+        Args:
+            subtask: Sub-task with a ``type`` (a tool name or ``rag``) and an ``input``
             
-            return {
-                "query": query,
-                "decision": "Used RAG pipeline",
-                "tool_used": None,
-                "tool_input": None,
-                "tool_output": None,
-                "retrieved_context": retrieved_chunks,
-                "answer": answer
-            }
+        Returns:
+            The tool output, or the retrieved chunks for ``rag``
+        """
+        start = time.perf_counter()
+        if subtask["type"] == "rag":
+            output = self.vector_store.retrieve(subtask["input"])
+        else:
+            output = self.tools[subtask["type"]].run(subtask["input"])["output"]
+        subtask["ms"] = (time.perf_counter() - start) * 1000
+        self._record_subtask(subtask, output)
+        return output
+    
+    async def _arun_subtask(self, subtask: Dict[str, Any]) -> Any:
+        """
+        Run one sub-task without blocking the event loop (see ``_run_subtask``).
+        """
+        start = time.perf_counter()
+        if subtask["type"] == "rag":
+            # Retrieval is CPU-bound: run it in the loop's default executor
+            loop = asyncio.get_running_loop()
+            output = await loop.run_in_executor(None, self.vector_store.retrieve, subtask["input"])
+        else:
+            output = (await self.tools[subtask["type"]].arun(subtask["input"]))["output"]
+        subtask["ms"] = (time.perf_counter() - start) * 1000
+        self._record_subtask(subtask, output)
+        return output
+    
+    def _record_subtask(self, subtask: Dict[str, Any], output: Any):
+        """
+        Record a finished sub-task as a ``retrieval`` or ``tool`` span.
+        """
+        if subtask["type"] == "rag":
+            tracer.record("retrieval", subtask["ms"], chunks=len(output))
+        else:
+            tracer.record("tool", subtask["ms"], tool=subtask["type"])
+    
+    def _collect_outputs(self, result: Dict[str, Any], subtasks: List[Dict[str, Any]], outputs: List[Any]):
+        """
+        Store sub-task outputs in the result.
+        
+        Tool sub-tasks keep their ``output``; the tool outputs are also joined
+        into ``tool_output`` and the retrieved chunks become ``retrieved_context``.
+        
+        Args:
+            result: Result dictionary, updated in place
+            subtasks: Sub-tasks that were run
+            outputs: Their outputs, in the same order
+        """
+        tool_outputs = []
+        for subtask, output in zip(subtasks, outputs):
+            if subtask["type"] == "rag":
+                result["retrieved_context"] = output
+            else:
+                subtask["output"] = output
+                tool_outputs.append(output)
+        if tool_outputs:
+            result["tool_output"] = "; ".join(tool_outputs)
+    
+    def _llm_context(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Build the LLM context: the retrieved chunks plus the results of any tool sub-tasks.
+        
+        The context is packed by the LLM service; the chunk and prompt token
+        counts before and after packing are stored in ``prompt_tokens``.
+        """
+        context = list(result["retrieved_context"])
+        
+        if result["tool_used"] == "mixed":
+            # Generate answer using LLM, including the calculation results and definitions
+            for subtask in result["subtasks"]:
+                if subtask["type"] == "calculator":
+                    context.append({
+                        "content": f"Calculation result: {subtask['input']} = {subtask['output']}",
+                        "metadata": {"source": "calculator_tool", "chunk_id": 999}
+                    })
+                elif subtask["type"] == "dictionary":
+                    context.append({
+                        "content": f"Definition of {subtask['input']}: {subtask['output']}",
+                        "metadata": {"source": "dictionary_tool", "chunk_id": 998}
+                    })
+        
+        context, result["prompt_tokens"] = self.llm_service.pack_context(result["query"], context)
+        return context
@@ -0,0 +1,206 @@
+"""
+Query router that decides between the tools, the RAG pipeline and mixed processing.
+"""
+import re
+from typing import Dict, List, Optional
+
+# Queries about AI concepts always use RAG
+AI_RELATED_PATTERNS = [
+    r'\b(ai|artificial intelligence|machine learning|neural network|llm|large language model)\b',
+    r'\bhallucination\b',
+    r'\brag\b',
+    r'\bretrieval augmented generation\b',
+    r'\bwhat\s+is\s+the\s+meaning\s+of\s+\w+\s+in\s+ai\b',
+    r'\bwhat\s+does\s+\w+\s+mean\s+in\s+ai\b',
+    r'\bdefine\s+["\']?\w+\s+in\s+ai["\']?\b'
+]
+
+# System-specific terminology and concepts
+SYSTEM_PATTERNS = [
+    r'\b(ragent|rag agent|company|product|headquarter|employee|technology)\b',
+    r'\b(agentic|routing|workflow|pipeline|architecture|vector store|llm service)\b',
+    r'\b(this system|the system|our system)\b',
+    r'\bhow\s+\w+\s+works\s+in\s+this\s+system\b',
+    r'\bdefine\s+["\']?\w+\s+routing["\']?\b',  # Handle 'define X routing' patterns
+]
+
+# AI terminology whose definitions are answered from the documents
+AI_TERMS = [
+    'artificial intelligence', 'machine learning', 'deep learning', 'neural network',
+    'transformer', 'llm', 'large language model', 'retrieval augmented generation', 'rag',
+    'vector database', 'embedding', 'fine-tuning', 'prompt engineering', 'attention mechanism',
+    'tokenization', 'nlp', 'natural language processing', 'generative ai', 'hallucination',
+    'ai alignment', 'bias', 'explainable ai', 'ai safety', 'responsible ai', 'ai governance',
+    'multimodal ai', 'diffusion model', 'foundation model', 'agent', 'agentic workflow',
+    'agentic routing', 'tool use', 'in-context learning', 'parameter-efficient fine-tuning',
+    'quantization', 'perplexity', 'context window', 'token'
+]
+
+# Patterns for routing to specific tools, in priority order
+TOOL_PATTERNS = {
+    "calculator": r"\b(calculate|compute|evaluate|solve|find the value of|math|age|born in|how old|years old|square root|sqrt|\d+\s*\+|\d+\s*\-|\d+\s*\*|\d+\s*\/|\d+\s*\^)\b|\b(what is\s+[\d\+\-\*\/\(\)]+)\b",
+    "dictionary": r"\b(define|definition of|meaning of|what does .* mean)\b(?!.*\bin AI\b|.*\bin artificial intelligence\b)"
+}
+
+# Patterns extracting the input of each tool, in priority order
+TOOL_INPUT_PATTERNS = {
+    "calculator": [
+        r"calculate\s+(.*)",
+        r"compute\s+(.*)",
+        r"evaluate\s+(.*)",
+        r"solve\s+(.*)",
+        r"what is\s+(.*)",
+        r"find the value of\s+(.*)"
+    ],
+    "dictionary": [
+        r"define\s+(.*)",
+        r"definition of\s+(.*)",
+        r"meaning of\s+(.*)",
+        r"what does\s+(.*?)\s+mean"
+    ]
+}
+
+# Sub-expressions of mixed queries: arithmetic (including chains like 2 + 3 * 4) and definitions
+MATH_PATTERN = r'(square root of \d+(\.\d+)?|sqrt\s*\(?\s*\d+(\.\d+)?\s*\)?|\d+(\.\d+)?(\s*[\+\-\*\/\^]\s*\d+(\.\d+)?)+)'
+DEFINITION_PATTERN = r'\b(?:define|definition of|meaning of)\s+["\']?([a-z][a-z\-]*)|\bwhat does\s+(?:the word\s+)?["\']?([a-z][a-z\-]*)["\']?\s+mean\b'
+
+def _lookahead(name: str, pattern: str) -> str:
+    """
+    Wrap a pattern in an always-succeeding lookahead that captures its first match.
+    
+    Chaining such lookaheads at the start of a regex evaluates every pattern
+    with ``re.search`` semantics in a single ``match`` call; a named group is
+    None when its pattern does not occur in the text.
+    """
+    return rf"(?=(?:[\s\S]*?(?P<{name}>{pattern}))?)"
+
+class QueryRouter:
+    def __init__(self, tool_patterns: Dict[str, str] = None):
+        """
+        Initialize the router and compile its patterns.
+        
+        The RAG patterns (AI-related queries, AI term definitions and system
+        terms) are combined into one alternation, and the mixed-query math
+        pattern, the RAG alternation and the tool patterns are chained as
+        lookaheads of a single regex, so a query is classified in one scan.
+        
+        Args:
+            tool_patterns: Mapping from tool name to routing pattern, in
+                priority order (default: ``TOOL_PATTERNS``)
+        """
+        self.tool_patterns = dict(tool_patterns or TOOL_PATTERNS)
+        self.tool_names = list(self.tool_patterns)
+        
+        ai_term_pattern = r'\bdefine\s+["\']?(?:' + "|".join(re.escape(term) for term in AI_TERMS) + r')["\']?\b'
+        rag_pattern = "|".join(f"(?:{pattern})" for pattern in AI_RELATED_PATTERNS + [ai_term_pattern] + SYSTEM_PATTERNS)
+        
+        self._scan = re.compile(
+            _lookahead("math", MATH_PATTERN)
+            + _lookahead("rag", rag_pattern)
+            + "".join(_lookahead(f"tool{i}", pattern) for i, pattern in enumerate(self.tool_patterns.values()))
+        )
+        self._input_scans = {
+            tool_name: re.compile("".join(
+                _lookahead(f"input{i}", pattern) for i, pattern in enumerate(patterns)
+            ))
+            for tool_name, patterns in TOOL_INPUT_PATTERNS.items()
+        }
+        self._math = re.compile(MATH_PATTERN)
+        self._definition = re.compile(DEFINITION_PATTERN)
+    
+    def route(self, query: str) -> Optional[str]:
+        """
+        Decide how to handle a query.
+        
+        Args:
+            query: The user's question
+            
+        Returns:
+            ``mixed`` for calculator + RAG, the name of a tool, or None for RAG
+        """
+        match = self._scan.match(query.lower())
+        
+        # If we have a mixed query with a math component
+        if match.group("math") is not None and len(query.split()) > 6:  # More than 6 words suggests a mixed query
+            return "mixed"
+        return self._tool_from_match(match)
+    
+    def tool_for(self, query: str) -> Optional[str]:
+        """
+        Determine if a query should be routed to a specific tool.
+        
+        Args:
+            query: The user's question
+            
+        Returns:
+            Name of the tool to use, or None for RAG
+        """
+        return self._tool_from_match(self._scan.match(query.lower()))
+    
+    def tool_input(self, query: str, tool_name: str) -> str:
+        """
+        Extract the relevant input for a tool from the query.
+        
+        Args:
+            query: The user's question
+            tool_name: Name of the tool to use
+            
+        Returns:
+            Extracted input for the tool (the query itself if no pattern matches)
+        """
+        scan = self._input_scans.get(tool_name)
+        if scan is None:
+            return query
+        
+        match = scan.match(query.lower())
+        for i in range(len(TOOL_INPUT_PATTERNS[tool_name])):
+            index = scan.groupindex[f"input{i}"]
+            if match.group(index) is not None:
+                # The pattern's own group follows the named group
+                return match.group(index + 1).strip()
+        
+        # If no pattern matches, just use the query as is
+        return query
+    
+    def math_expressions(self, query: str) -> List[str]:
+        """
+        Find every arithmetic expression of a query.
+        
+        Args:
+            query: The user's question
+            
+        Returns:
+            Expressions in query order
+        """
+        return [match.group(0) for match in self._math.finditer(query.lower())]
+    
+    def definition_words(self, query: str) -> List[str]:
+        """
+        Find the words a query asks to define.
+        
+        Words that would be routed to RAG on their own (AI and system terms)
+        are left out.
+        
+        Args:
+            query: The user's question
+            
+        Returns:
+            Words to look up in the dictionary, in query order
+        """
+        words = []
+        for match in self._definition.finditer(query.lower()):
+            word = match.group(1) or match.group(2)
+            if word not in words and self.tool_for(f"define {word}") == "dictionary":
+                words.append(word)
+        return words
+    
+    def _tool_from_match(self, match: re.Match) -> Optional[str]:
+        """
+        Pick the tool of a scanned query: RAG patterns win, then tools in priority order.
+        """
+        if match.group("rag") is not None:
+            return None
+        for i, tool_name in enumerate(self.tool_names):
+            if match.group(f"tool{i}") is not None:
+                return tool_name
+        return None
@@ -1,7 +1,9 @@
 """
 Tools for the agent to use when processing queries.
 """
+import asyncio
 import math
+import httpx
 import requests
 from typing import Dict, Any, List, Optional
 
@@ -113,6 +115,18 @@ class CalculatorTool:
                 "input": expression,
                 "output": f"Error: {str(e)}"
             }
+    
+    async def arun(self, expression: str) -> Dict[str, Any]:
+        """
+        Evaluate a mathematical expression (async variant of ``run``).
+        
+        Args:
+            expression: Mathematical expression to evaluate
+            
+        Returns:
+            Result of the calculation
+        """
+        return self.run(expression)
 
 
 class DictionaryTool:
@@ -122,6 +136,11 @@ class DictionaryTool:
         self.name = "dictionary"
         self.description = "Useful for looking up the definition of words"
         self.api_url = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+        self.timeout = 10.0
+        # Pooled client shared by the lookups of ``arun``, created on first
+        # use in the event loop it belongs to
+        self._client = None
+        self._client_loop = None
     
     def run(self, word: str) -> Dict[str, Any]:
         """
@@ -138,32 +157,106 @@ class DictionaryTool:
             word = word.strip().lower()
             
             # Make API request
-            response = requests.get(f"{self.api_url}{word}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Extract the first definition
-                if data and isinstance(data, list) and len(data) > 0:
-                    meanings = data[0].get("meanings", [])
-                    if meanings and len(meanings) > 0:
-                        definitions = meanings[0].get("definitions", [])
-                        if definitions and len(definitions) > 0:
-                            definition = definitions[0].get("definition", "No definition found")
-                            return {
-                                "tool": self.name,
-                                "input": word,
-                                "output": definition
-                            }
-            
+            response = requests.get(f"{self.api_url}{word}", timeout=self.timeout)
+            return self._parse_response(word, response)
+        except Exception as e:
             return {
                 "tool": self.name,
                 "input": word,
-                "output": "No definition found"
+                "output": f"Error: {str(e)}"
             }
+    
+    async def arun(self, word: str) -> Dict[str, Any]:
+        """
+        Look up the definition of a word without blocking the event loop.
+        
+        Args:
+            word: Word to look up
+            
+        Returns:
+            Definition of the word
+        """
+        try:
+            # Clean the word
+            word = word.strip().lower()
+            
+            # Make API request
+            response = await self._get_client().get(f"{self.api_url}{word}")
+            return self._parse_response(word, response)
         except Exception as e:
             return {
                 "tool": self.name,
                 "input": word,
                 "output": f"Error: {str(e)}"
             }
+    
+    async def aclose(self):
+        """
+        Close the HTTP client of ``arun`` from the event loop it was used in.
+        """
+        client = self._client
+        self._client = self._client_loop = None
+        if client is not None:
+            await client.aclose()
+    
+    def close(self):
+        """
+        Close the HTTP client of ``arun`` outside of an event loop.
+        
+        A client whose event loop has already been closed can no longer be
+        closed cleanly and is only dropped; close it with ``aclose`` before
+        the loop ends instead.
+        """
+        client, loop = self._client, self._client_loop
+        self._client = self._client_loop = None
+        if client is not None and not loop.is_closed():
+            loop.run_until_complete(client.aclose())
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the HTTP client of the running event loop, creating it on first use.
+        
+        Clients cannot be shared across event loops, so a new loop (e.g. of
+        another ``asyncio.run``) gets a new client.
+        
+        Returns:
+            Pooled async HTTP client
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+            self._client_loop = loop
+        return self._client
+    
+    def _parse_response(self, word: str, response: Any) -> Dict[str, Any]:
+        """
+        Extract the first definition from a dictionary API response.
+        
+        Args:
+            word: Word that was looked up
+            response: HTTP response (``requests`` or ``httpx``)
+            
+        Returns:
+            Definition of the word
+        """
+        if response.status_code == 200:
+            data = response.json()
+            
+            # Extract the first definition
+            if data and isinstance(data, list) and len(data) > 0:
+                meanings = data[0].get("meanings", [])
+                if meanings and len(meanings) > 0:
+                    definitions = meanings[0].get("definitions", [])
+                    if definitions and len(definitions) > 0:
+                        definition = definitions[0].get("definition", "No definition found")
+                        return {
+                            "tool": self.name,
+                            "input": word,
+                            "output": definition
+                        }
+        
+        return {
+            "tool": self.name,
+            "input": word,
+            "output": "No definition found"
+        }
@@ -2,26 +2,245 @@
 Main application for the RAG-powered multi-agent Q&A system.
 """
 import os
+import json
 import argparse
+from functools import partial
 from dotenv import load_dotenv
 from src.utils.document_loader import DocumentLoader
-from src.utils.vector_store import VectorStore
+from src.utils.vector_store import VectorStore, IndexVersionError
+from src.utils.bm25_store import BM25Store
+from src.utils.hybrid_retriever import HybridRetriever
+from src.utils.sharded_vector_store import ShardedVectorStore
+from src.utils.entity_index import load_entity_gazetteer
+from src.utils.ingestion_manifest import sync_index
 from src.utils.llm_service import LLMService
+from src.utils.llm_backends import GroqBackend, SimulatedBackend
+from src.utils.llm_scheduler import LLMScheduler
+from src.utils.cache import AnswerCache
+from src.utils.context_packer import ContextPacker
+from src.utils.tracing import tracer
 from src.agents.agent_orchestrator import AgentOrchestrator
 
+def build_retriever(args, data_dir: str, index_dir: str, entity_gazetteer):
+    """
+    Build (or load) the retrieval backend selected on the command line.
+    
+    Args:
+        args: Parsed command line arguments
+        data_dir: Directory containing documents
+        index_dir: Directory of the saved TF-IDF index, if any
+        entity_gazetteer: Product/company names used for score boosting
+        
+    Returns:
+        An object with a ``retrieve(query, top_k)`` method
+    """
+    tfidf_store = None
+    
+    # Initialize document loader
+    document_loader = DocumentLoader(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap
+    )
+    
+    if args.retriever in ("tfidf", "hybrid"):
+        if index_dir and os.path.exists(index_dir) and not args.rebuild_index:
+            # Map the saved index instead of re-chunking and refitting
+            print(f"Loading vector index from {index_dir}...")
+            try:
+                tfidf_store = VectorStore.load(index_dir, entity_gazetteer=entity_gazetteer)
+            except IndexVersionError as e:
+                # Written by another release: rebuilt below and saved over
+                print(f"{e}; rebuilding it")
+        
+        # Only new or changed files are re-split; chunks of deleted files are removed
+        tfidf_store, dirty = sync_index(
+            tfidf_store, document_loader, data_dir,
+            entity_gazetteer=entity_gazetteer,
+            max_workers=args.ingest_workers
+        )
+        
+        # A saved dense index is rebuilt if it has other dimensions or nprobe
+        if args.dense:
+            dense_index = tfidf_store.dense_index
+            if dense_index is None or (dense_index.n_components, dense_index.ivf.nprobe) != (args.dense_dims, args.nprobe):
+                tfidf_store.enable_dense_index(n_components=args.dense_dims, nprobe=args.nprobe)
+                dirty = True
+        
+        if index_dir and dirty:
+            tfidf_store.save(index_dir)
+        
+        # Without --dense it stays on disk but retrieval is sparse
+        if not args.dense and tfidf_store.dense_index is not None:
+            tfidf_store.disable_dense_index()
+        
+        if args.retriever == "tfidf":
+            return tfidf_store
+        documents = tfidf_store.active_documents()
+    else:
+        # Load and split documents in parallel, batch by batch
+        print(f"Loading documents from {data_dir}...")
+        batches = document_loader.stream_documents(data_dir, max_workers=args.ingest_workers)
+        documents = [doc for batch in batches for doc in batch]
+        print(f"Loaded {len(documents)} document chunks")
+    
+    if args.retriever == "sharded":
+        sharded_store = ShardedVectorStore(num_shards=args.num_shards, entity_gazetteer=entity_gazetteer)
+        sharded_store.create_index(documents)
+        return sharded_store
+    
+    bm25_store = BM25Store(entity_gazetteer=entity_gazetteer)
+    bm25_store.create_index(documents)
+    if args.retriever == "bm25":
+        return bm25_store
+    
+    # Run the lexical and the second scorers concurrently and fuse their rankings
+    legs = {
+        "tfidf": partial(tfidf_store.retrieve, dense=False),
+        "bm25": bm25_store.retrieve
+    }
+    if args.dense:
+        legs["lsa"] = partial(tfidf_store.retrieve, dense=True)
+    return HybridRetriever(legs)
+
+def run_batch(agent: AgentOrchestrator, input_path: str, output_path: str, max_concurrency: int):
+    """
+    Answer the questions of a JSONL file and write the answers to another.
+    
+    Each input line is a JSON object with a ``query`` field; its other fields
+    (e.g. an id) are copied to the output line, which adds the decision, the
+    tool used, the answer, the sources of the retrieved chunks and the error,
+    if the query failed. With tracing enabled, the spans of each query are
+    added as ``trace``.
+    
+    Args:
+        agent: Agent orchestrator
+        input_path: JSONL file with one question per line
+        output_path: JSONL file to write the answers to
+        max_concurrency: Maximum number of tool/LLM calls in flight
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    
+    results = agent.process_batch([record["query"] for record in records], max_concurrency=max_concurrency)
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for record, result in zip(records, results):
+            retrieved = result.get("retrieved_context") or []
+            f.write(json.dumps({
+                **record,
+                "decision": result.get("decision"),
+                "tool_used": result.get("tool_used"),
+                "tool_output": result.get("tool_output"),
+                "answer": result.get("answer"),
+                "sources": [chunk["metadata"]["source"] for chunk in retrieved],
+                "prompt_tokens": result.get("prompt_tokens"),
+                "error": result["error"],
+                "total_ms": round(result["total_ms"], 1),
+                **({"trace": result["trace"]} if tracer.enabled else {})
+            }) + "\n")
+    
+    failed = sum(result["error"] is not None for result in results)
+    print(f"Answered {len(results) - failed} of {len(results)} questions, wrote {output_path}")
+
+def run_cli(agent: AgentOrchestrator):
+    """
+    Answer questions typed at the prompt until the user types 'exit'.
+    
+    Typing 'metrics' prints the recorded metrics (with --trace).
+    
+    Args:
+        agent: Agent orchestrator
+    """
+    print("\nRAG-powered multi-agent Q&A system")
+    print("Type 'exit' to quit\n")
+    
+    while True:
+        # Get user query
+        query = input("Enter your question: ")
+        
+        if query.lower() == 'exit':
+            break
+        if query.lower() == 'metrics':
+            print(tracer.to_prometheus())
+            continue
+        
+        # Process query, printing each step as soon as it is available
+        answer_started = False
+        for event in agent.process_query_stream(query):
+            if event["type"] == "route":
+                print("\n" + "="*50)
+                print(f"Query: {query}")
+                print(f"Decision: {event['decision']}")
+                if event["tool_used"]:
+                    print(f"Tool: {event['tool_used']}")
+                    print(f"Tool Input: {event['tool_input']}")
+            elif event["type"] == "tool":
+                print(f"Tool Output: {event['tool_output']}")
+            elif event["type"] == "retrieval":
+                print("\nRetrieved Context:")
+                for i, chunk in enumerate(event['retrieved_context']):
+                    print(f"\nChunk {i+1} (from {chunk['metadata']['source']}):")
+                    print(f"Score: {chunk['score']:.4f}")
+                    print("-"*40)
+                    print(chunk['content'][:200] + "..." if len(chunk['content']) > 200 else chunk['content'])
+            elif event["type"] == "token":
+                if not answer_started:
+                    print("\nAnswer:")
+                    answer_started = True
+                print(event["text"], end="", flush=True)
+            elif event["type"] == "done":
+                result = event["result"]
+        
+        print(f"\n\nTime to first token: {result['ttft_ms']:.0f} ms (total {result['total_ms']:.0f} ms)")
+        if len(result["subtasks"]) > 1:
+            for subtask in result["subtasks"]:
+                print(f"  {subtask['type']}: {subtask['input']} ({subtask['ms']:.1f} ms)")
+        if "prompt_tokens" in result:
+            packing = result["prompt_tokens"]
+            print(f"Prompt tokens: {packing['tokens_before']} -> {packing['tokens_after']} "
+                  f"({packing['chunks_before']} -> {packing['chunks_after']} chunks)")
+        if tracer.enabled:
+            print("Stages: " + ", ".join(f"{span['name']} {span['ms']:.1f} ms" for span in result["trace"]))
+        print("="*50 + "\n")
+
 def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="RAG-powered multi-agent Q&A system")
     parser.add_argument("--data_dir", type=str, default="data", help="Directory containing documents")
     parser.add_argument("--chunk_size", type=int, default=500, help="Size of document chunks")
     parser.add_argument("--chunk_overlap", type=int, default=50, help="Overlap between document chunks")
+    parser.add_argument("--index_dir", type=str, default=None, help="Directory to load a saved index from (built and saved there if missing, updated when files in data_dir change)")
+    parser.add_argument("--ingest_workers", type=int, default=None, help="Processes used to chunk documents (default: number of CPUs)")
+    parser.add_argument("--rebuild_index", action="store_true", help="Rebuild the index even if a saved one exists")
+    parser.add_argument("--retriever", type=str, default="tfidf", choices=["tfidf", "bm25", "hybrid", "sharded"], help="Retrieval backend (hybrid fuses TF-IDF and BM25, plus LSA with --dense; sharded spreads TF-IDF over worker processes)")
+    parser.add_argument("--num_shards", type=int, default=None, help="Worker processes for the sharded retriever (default: number of CPUs)")
+    parser.add_argument("--dense", action="store_true", help="Search dense LSA vectors through an IVF index")
+    parser.add_argument("--dense_dims", type=int, default=256, help="Number of LSA dimensions for --dense")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists scanned per query for --dense")
+    parser.add_argument("--entity_config", type=str, default=None, help="JSON file with product/company names used for score boosting")
+    parser.add_argument("--answer_cache_size", type=int, default=1024, help="Answers cached in memory (0 disables the answer cache)")
+    parser.add_argument("--answer_cache_path", type=str, default=None, help="SQLite file for an on-disk answer cache shared across runs")
+    parser.add_argument("--answer_cache_ttl", type=float, default=None, help="Seconds after which cached answers expire")
+    parser.add_argument("--context_tokens", type=int, default=2048, help="Token budget of the retrieved context sent to the LLM, after merging overlapping chunks (0 disables packing)")
+    parser.add_argument("--speculative_retrieval", action="store_true", help="Start retrieval in parallel with routing and discard it for tool-only queries")
+    parser.add_argument("--batch_input", type=str, default=None, help="JSONL file of questions ({\"query\": ...} per line) to answer instead of the interactive CLI")
+    parser.add_argument("--batch_output", type=str, default="answers.jsonl", help="JSONL file the answers of --batch_input are written to")
+    parser.add_argument("--batch_concurrency", type=int, default=8, help="Maximum number of tool/LLM calls in flight for --batch_input")
+    parser.add_argument("--llm_backend", type=str, default="groq", choices=["groq", "simulated"], help="LLM behind the answers (simulated answers offline with model-like latency, for load tests)")
+    parser.add_argument("--llm_rpm", type=float, default=None, help="Requests per minute allowed by the LLM provider (requests are paced to stay under it)")
+    parser.add_argument("--llm_tpm", type=float, default=None, help="Tokens per minute allowed by the LLM provider (prompt plus answer tokens)")
+    parser.add_argument("--llm_deadline", type=float, default=60.0, help="Seconds an LLM request may take in total, including queueing and retries")
+    parser.add_argument("--llm_max_retries", type=int, default=3, help="Retries of throttled (429), 5xx and timed-out LLM requests")
+    parser.add_argument("--llm_max_concurrency", type=int, default=16, help="Highest number of concurrent LLM requests (the limit adapts below it when the provider throttles)")
+    parser.add_argument("--trace", action="store_true", help="Record per-stage latencies (ingestion, retrieval, LLM call, ...) and counters")
+    parser.add_argument("--metrics_output", type=str, default=None, help="File the metrics of --trace are written to on exit (JSON if it ends in .json, else Prometheus text format)")
     args = parser.parse_args()
     
     # Load environment variables
     load_dotenv()
     groq_api_key = os.getenv("GROQ_API_KEY")
     
-    if not groq_api_key:
+    if not groq_api_key and args.llm_backend == "groq":
         print("Error: GROQ_API_KEY not found in environment variables.")
         print("Please create a .env file with your Groq API key or set it as an environment variable.")
         exit(1)
@@ -31,67 +250,77 @@ def main():
     project_dir = os.path.dirname(script_dir)
     data_dir = os.path.join(project_dir, args.data_dir)
     
-    # Initialize document loader
-    document_loader = DocumentLoader(
-        chunk_size=args.chunk_size,
-        chunk_overlap=args.chunk_overlap
-    )
+    index_dir = os.path.join(project_dir, args.index_dir) if args.index_dir else None
+    entity_gazetteer = load_entity_gazetteer(args.entity_config) if args.entity_config else None
+    
+    # Enabled before the index is built so ingestion is measured too
+    tracer.enabled = args.trace or args.metrics_output is not None
     
-    # Load and split documents
-    print(f"Loading documents from {data_dir}...")
-    documents = document_loader.load_and_split_documents(data_dir)
-    print(f"Loaded {len(documents)} document chunks")
+    vector_store = build_retriever(args, data_dir, index_dir, entity_gazetteer)
     
-    # Initialize vector store
-    vector_store = VectorStore()
+    # Cache answers to repeated questions over the same chunks and index version
+    answer_cache = None
+    if args.answer_cache_size > 0:
+        answer_cache_path = os.path.join(project_dir, args.answer_cache_path) if args.answer_cache_path else None
+        answer_cache = AnswerCache(
+            max_entries=args.answer_cache_size,
+            ttl=args.answer_cache_ttl,
+            path=answer_cache_path
+        )
     
-    # Create index
-    print("Creating vector index...")
-    vector_store.create_index(documents)
+    # Pace, limit and retry LLM requests; the scheduler retries instead of the Groq client
+    if args.llm_backend == "simulated":
+        backend = SimulatedBackend()
+    else:
+        backend = GroqBackend(groq_api_key, model_name="llama3-8b-8192", max_retries=0)
+    llm_scheduler = LLMScheduler(
+        backend,
+        requests_per_minute=args.llm_rpm,
+        tokens_per_minute=args.llm_tpm,
+        deadline=args.llm_deadline,
+        max_retries=args.llm_max_retries,
+        max_concurrency=args.llm_max_concurrency
+    )
     
     # Initialize LLM service
-    llm_service = LLMService(groq_api_key=groq_api_key, model_name="llama3-8b-8192")
+    context_packer = ContextPacker(max_tokens=args.context_tokens) if args.context_tokens > 0 else None
+    llm_service = LLMService(
+        cache=answer_cache,
+        context_packer=context_packer,
+        backend=llm_scheduler
+    )
     
     # Initialize agent orchestrator
     agent = AgentOrchestrator(
         vector_store=vector_store,
-        llm_service=llm_service
+        llm_service=llm_service,
+        speculative_retrieval=args.speculative_retrieval
     )
     
-    # Interactive CLI
-    print("\nRAG-powered multi-agent Q&A system")
-    print("Type 'exit' to quit\n")
+    if args.batch_input:
+        run_batch(agent, args.batch_input, args.batch_output, args.batch_concurrency)
+    else:
+        run_cli(agent)
     
-    while True:
-        # Get user query
-        query = input("Enter your question: ")
-        
-        if query.lower() == 'exit':
-            break
-        
-        # Process query
-        result = agent.process_query(query)
-        
-        # Display results
-        print("\n" + "="*50)
-        print(f"Query: {result['query']}")
-        print(f"Decision: {result['decision']}")
-        
-        if result['tool_used']:
-            print(f"Tool: {result['tool_used']}")
-            print(f"Tool Input: {result['tool_input']}")
-            print(f"Tool Output: {result['tool_output']}")
-        else:
-            print("\nRetrieved Context:")
-            for i, chunk in enumerate(result['retrieved_context']):
-                print(f"\nChunk {i+1} (from {chunk['metadata']['source']}):")
-                print(f"Score: {chunk['score']:.4f}")
-                print("-"*40)
-                print(chunk['content'][:200] + "..." if len(chunk['content']) > 200 else chunk['content'])
-        
-        print("\nAnswer:")
-        print(result['answer'])
-        print("="*50 + "\n")
+    # Stop worker processes/threads of the sharded and hybrid retrievers
+    if hasattr(vector_store, "close"):
+        vector_store.close()
+    agent.close()
+    
+    if hasattr(vector_store, "latency_stats"):
+        print(f"Hybrid retrieval mean latencies (ms): {vector_store.latency_stats()}")
+    if args.speculative_retrieval:
+        print(f"Speculative retrieval: {agent.speculation_stats()}")
+    print(f"LLM scheduler: {llm_scheduler.stats()}")
+    if hasattr(vector_store, "retrieval_cache"):
+        print(f"Retrieval cache: {vector_store.retrieval_cache.stats()}")
+    if args.metrics_output:
+        with open(args.metrics_output, 'w', encoding='utf-8') as f:
+            f.write(tracer.to_json() if args.metrics_output.endswith(".json") else tracer.to_prometheus())
+        print(f"Wrote metrics to {args.metrics_output}")
+    if answer_cache is not None:
+        print(f"Answer cache: {answer_cache.stats()}")
+        answer_cache.close()
 
 if __name__ == "__main__":
     main()
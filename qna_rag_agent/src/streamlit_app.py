@@ -11,8 +11,16 @@ import os.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.utils.document_loader import DocumentLoader
-from src.utils.vector_store import VectorStore
+from src.utils.vector_store import VectorStore, IndexVersionError
+from src.utils.ingestion_manifest import sync_index
+from src.utils.bm25_store import BM25Store
+from src.utils.hybrid_retriever import HybridRetriever
 from src.utils.llm_service import LLMService
+from src.utils.llm_backends import GroqBackend
+from src.utils.llm_scheduler import LLMScheduler
+from src.utils.cache import AnswerCache
+from src.utils.context_packer import ContextPacker
+from src.utils.tracing import tracer
 from src.agents.agent_orchestrator import AgentOrchestrator
 
 # Load environment variables
@@ -37,33 +45,89 @@ if "initialized" not in st.session_state:
     st.session_state.agent = None
     st.session_state.documents = None
     st.session_state.history = []
+    st.session_state.retriever = None
 
-def initialize_system():
+# Retrieval backend selection
+RETRIEVERS = {"TF-IDF": "tfidf", "BM25": "bm25", "Hybrid (TF-IDF + BM25)": "hybrid"}
+retriever_label = st.sidebar.selectbox("Retriever", list(RETRIEVERS.keys()))
+retriever = RETRIEVERS[retriever_label]
+
+# Per-stage latency metrics (set RAG_TRACING=1 to record them), filled in at
+# the end of the run so they include the question just answered
+tracer.enabled = os.getenv("RAG_TRACING", "").lower() in ("1", "true", "yes")
+metrics_placeholder = st.sidebar.empty()
+
+def initialize_system(retriever: str = "tfidf"):
     """Initialize the RAG system and agent."""
+    # Stop the thread pools of the system being replaced (e.g. after a
+    # retriever switch), otherwise they outlive every rerun
+    previous = st.session_state.agent
+    if previous is not None:
+        if hasattr(previous.vector_store, "close"):
+            previous.vector_store.close()
+        previous.close()
+    
     with st.spinner("Initializing system..."):
         # Get absolute path to data directory
         script_dir = os.path.dirname(os.path.abspath(__file__))
         project_dir = os.path.dirname(script_dir)
         data_dir = os.path.join(project_dir, "data")
         
+        # Optional persisted index shared between app restarts and workers
+        index_dir = os.getenv("RAG_INDEX_DIR")
+        
+        vector_store = None
+        if index_dir and os.path.exists(index_dir):
+            try:
+                vector_store = VectorStore.load(index_dir)
+            except IndexVersionError:
+                # Written by another release: rebuilt below and saved over
+                vector_store = None
+        
         # Initialize document loader
         document_loader = DocumentLoader(
             chunk_size=500,
             chunk_overlap=50
         )
         
-        # Load and split documents
-        documents = document_loader.load_and_split_documents(data_dir)
-        st.session_state.documents = documents
+        # Only new or changed files are re-split; chunks of deleted files are removed
+        vector_store, changed = sync_index(vector_store, document_loader, data_dir)
+        documents = vector_store.active_documents()
+        
+        if index_dir and changed:
+            vector_store.save(index_dir)
         
-        # Initialize vector store
-        vector_store = VectorStore()
+        # A dense index built by the CLI (--dense) is kept on disk but not used here
+        if vector_store.dense_index is not None:
+            vector_store.disable_dense_index()
         
-        # Create index
-        vector_store.create_index(documents)
+        if retriever != "tfidf":
+            bm25_store = BM25Store()
+            bm25_store.create_index(vector_store.active_documents())
+            if retriever == "bm25":
+                vector_store = bm25_store
+            else:
+                # Run both scorers concurrently and fuse their rankings
+                vector_store = HybridRetriever({
+                    "tfidf": vector_store.retrieve,
+                    "bm25": bm25_store.retrieve
+                })
         
-        # Initialize LLM service
-        llm_service = LLMService(groq_api_key=groq_api_key, model_name="llama3-8b-8192")
+        st.session_state.documents = documents
+        
+        # Initialize LLM service; the scheduler paces requests to the
+        # provider's limits (RAG_LLM_RPM / RAG_LLM_TPM) and retries throttling
+        llm_rpm = os.getenv("RAG_LLM_RPM")
+        llm_tpm = os.getenv("RAG_LLM_TPM")
+        llm_service = LLMService(
+            backend=LLMScheduler(
+                GroqBackend(groq_api_key, model_name="llama3-8b-8192", max_retries=0),
+                requests_per_minute=float(llm_rpm) if llm_rpm else None,
+                tokens_per_minute=float(llm_tpm) if llm_tpm else None
+            ),
+            cache=AnswerCache(path=os.getenv("RAG_ANSWER_CACHE")),
+            context_packer=ContextPacker()
+        )
         
         # Initialize agent orchestrator
         agent = AgentOrchestrator(
@@ -72,6 +136,7 @@ def initialize_system():
         )
         
         st.session_state.agent = agent
+        st.session_state.retriever = retriever
         st.session_state.initialized = True
         
         st.success(f"System initialized with {len(documents)} document chunks")
@@ -85,49 +150,77 @@ This demo showcases a simple knowledge assistant that:
 3. Orchestrates the retrieval + generation steps with a basic agentic workflow
 """)
 
-# Initialize the system if not already done
-if not st.session_state.initialized:
-    initialize_system()
+# Initialize the system if not already done (or if the retriever changed)
+if not st.session_state.initialized or st.session_state.retriever != retriever:
+    initialize_system(retriever)
 
 # User input
 query = st.text_input("Ask a question:", placeholder="e.g., What is RAGent AI? or Calculate 25 * 16")
 
-if query:
-    with st.spinner("Processing your question..."):
-        # Process the query
-        result = st.session_state.agent.process_query(query)
+def render_processing(result: dict):
+    """Show the routing decision, tool details or retrieved context of a result."""
+    st.subheader("Query Processing")
+    st.info(f"**Decision**: {result['decision']}")
+    
+    if result['tool_used']:
+        st.subheader("Tool Details")
+        st.write(f"**Tool**: {result['tool_used']}")
+        st.write(f"**Tool Input**: {result['tool_input']}")
+        st.write(f"**Tool Output**: {result['tool_output']}")
+    if result['retrieved_context'] is not None:
+        # Per-scorer latencies of the hybrid retriever
+        latencies = getattr(st.session_state.agent.vector_store, "last_latencies", None)
+        if latencies:
+            st.caption("Retrieval latency: " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in latencies.items()))
         
-        # Add to history
-        st.session_state.history.append(result)
+        st.subheader("Retrieved Context")
+        for i, chunk in enumerate(result['retrieved_context']):
+            with st.expander(f"Chunk {i+1} (from {chunk['metadata']['source']})"):
+                st.write(f"**Score**: {chunk['score']:.4f}")
+                st.text(chunk['content'])
+    if result.get('trace'):
+        with st.expander("Trace"):
+            for span in result['trace']:
+                st.write(f"**{span['name']}**: {span['ms']:.1f} ms {span['attributes'] or ''}")
 
-# Display results
-if st.session_state.history:
-    result = st.session_state.history[-1]
-    
+if query or st.session_state.history:
     st.header("Results")
     
     # Create two columns
     col1, col2 = st.columns([1, 1])
     
-    with col1:
-        st.subheader("Query Processing")
-        st.info(f"**Decision**: {result['decision']}")
-        
-        if result['tool_used']:
-            st.subheader("Tool Details")
-            st.write(f"**Tool**: {result['tool_used']}")
-            st.write(f"**Tool Input**: {result['tool_input']}")
-            st.write(f"**Tool Output**: {result['tool_output']}")
-        else:
-            st.subheader("Retrieved Context")
-            for i, chunk in enumerate(result['retrieved_context']):
-                with st.expander(f"Chunk {i+1} (from {chunk['metadata']['source']})"):
-                    st.write(f"**Score**: {chunk['score']:.4f}")
-                    st.text(chunk['content'])
-    
     with col2:
         st.subheader("Answer")
-        st.success(result['answer'])
+        answer_placeholder = st.empty()
+        timing_placeholder = st.empty()
+    
+    if query:
+        # Render the answer as its tokens arrive
+        answer = ""
+        with st.spinner("Processing your question..."):
+            for event in st.session_state.agent.process_query_stream(query):
+                if event["type"] == "token":
+                    answer += event["text"]
+                    answer_placeholder.success(answer)
+                elif event["type"] == "done":
+                    result = event["result"]
+        
+        # Add to history
+        st.session_state.history.append(result)
+    
+    # Display results
+    result = st.session_state.history[-1]
+    answer_placeholder.success(result['answer'])
+    if "ttft_ms" in result:
+        timing = f"Time to first token: {result['ttft_ms']:.0f} ms (total {result['total_ms']:.0f} ms)"
+        if len(result.get("subtasks", [])) > 1:
+            timing += " | " + ", ".join(f"{subtask['type']} {subtask['ms']:.1f} ms" for subtask in result["subtasks"])
+        if "prompt_tokens" in result:
+            timing += f" | Prompt tokens: {result['prompt_tokens']['tokens_before']} -> {result['prompt_tokens']['tokens_after']}"
+        timing_placeholder.caption(timing)
+    
+    with col1:
+        render_processing(result)
 
 # History
 if len(st.session_state.history) > 1:
@@ -137,6 +230,12 @@ if len(st.session_state.history) > 1:
             st.write(f"**A{i+1}**: {item['answer']}")
             st.write("---")
 
+if tracer.enabled:
+    with metrics_placeholder.container():
+        with st.expander("Metrics"):
+            st.json(tracer.snapshot())
+            st.download_button("Download (Prometheus)", tracer.to_prometheus(), file_name="metrics.prom")
+
 # Footer
 st.markdown("---")
 st.markdown("RAG-Powered Multi-Agent Q&A System | Built with LangChain, Groq Llama3, and scikit-learn")
@@ -0,0 +1,63 @@
+"""
+Shared fixtures: the bundled documents, chunked like the CLI does, and an agent answering with a simulated model.
+"""
+import os
+import pytest
+from src.agents.agent_orchestrator import AgentOrchestrator
+from src.utils.document_loader import DocumentLoader
+from src.utils.llm_backends import SimulatedBackend
+from src.utils.llm_service import LLMService
+from src.utils.vector_store import VectorStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data")
+
+@pytest.fixture(scope="session")
+def documents():
+    return DocumentLoader(chunk_size=500, chunk_overlap=50).load_and_split_documents(DATA_DIR)
+
+@pytest.fixture(scope="session")
+def vector_store(documents):
+    store = VectorStore()
+    store.create_index(documents)
+    return store
+
+class OfflineDictionary:
+    """Dictionary tool answering without the network."""
+    
+    def run(self, word: str):
+        return {"tool": "dictionary", "input": word, "output": f"Definition of {word.strip().lower()}"}
+    
+    async def arun(self, word: str):
+        return self.run(word)
+
+@pytest.fixture
+def make_agent(vector_store):
+    """
+    Build agents over the bundled documents whose model is a ``SimulatedBackend`` answering at once.
+    
+    Keyword arguments are passed to ``AgentOrchestrator``, except ``backend``
+    and ``cache`` (an ``AnswerCache``, default: none), which go to the LLM
+    service.
+    """
+    agents = []
+    
+    def make(backend=None, cache=None, **kwargs):
+        if backend is None:
+            backend = SimulatedBackend(latency_ms=0, latency_distribution="constant", tokens_per_second=0)
+        agent = AgentOrchestrator(vector_store, LLMService(backend=backend, cache=cache), **kwargs)
+        agent.tools["dictionary"] = OfflineDictionary()
+        agents.append(agent)
+        return agent
+    
+    yield make
+    for agent in agents:
+        agent.close()
+
+def ranking(results):
+    """
+    Sources, chunk ids and rounded scores of retrieval results, for comparisons.
+    
+    Results that match no query term are left out: their order among each
+    other is arbitrary.
+    """
+    return [(r["metadata"]["source"], r["metadata"]["chunk_id"], round(r["score"], 6)) for r in results if r["score"] > 0]
@@ -0,0 +1,62 @@
+import asyncio
+import time
+import httpx
+from src.agents.tools import DictionaryTool
+from src.utils.llm_backends import SimulatedBackend
+
+QUERIES = [
+    "What is RAGent AI?",
+    "Calculate 25 * 16",
+    "Define serendipity",
+    "What is RAGent AI and what is the square root of 49?",
+    "Define serendipity and tell me what is 15 + 27?"
+]
+
+def summary(result):
+    context = [(c["metadata"]["source"], c["metadata"]["chunk_id"]) for c in result["retrieved_context"] or []]
+    return result["decision"], result["tool_input"], result["tool_output"], context, result["answer"]
+
+def test_matches_process_query(make_agent):
+    agent = make_agent()
+    for query in QUERIES:
+        assert summary(asyncio.run(agent.aprocess_query(query))) == summary(agent.process_query(query))
+
+def test_queries_overlap_while_waiting_on_the_model(make_agent):
+    backend = SimulatedBackend(latency_ms=100, latency_distribution="constant", tokens_per_second=0)
+    agent = make_agent(backend=backend)
+    
+    async def run_all():
+        return await asyncio.gather(*(agent.aprocess_query(f"What is RAGent AI? ({i})") for i in range(8)))
+    
+    start = time.perf_counter()
+    results = asyncio.run(run_all())
+    assert time.perf_counter() - start < 0.5
+    assert backend.stats()["max_in_flight"] == 8
+    assert [result["answer"] for result in results] == [
+        agent.process_query(f"What is RAGent AI? ({i})")["answer"] for i in range(8)
+    ]
+
+def test_dictionary_lookups_share_one_client(make_agent, monkeypatch):
+    clients = []
+    
+    def handler(request):
+        word = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json=[{"meanings": [{"definitions": [{"definition": f"Meaning of {word}"}]}]}])
+    
+    class MockClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.MockTransport(handler), **kwargs)
+            clients.append(self)
+    
+    monkeypatch.setattr("src.agents.tools.httpx.AsyncClient", MockClient)
+    agent = make_agent()
+    agent.tools["dictionary"] = DictionaryTool()
+    
+    async def run():
+        results = [await agent.aprocess_query(f"Define {word}") for word in ("serendipity", "ephemeral")]
+        await agent.aclose()
+        return results
+    
+    results = asyncio.run(run())
+    assert [result["tool_output"] for result in results] == ["Meaning of serendipity", "Meaning of ephemeral"]
+    assert len(clients) == 1 and clients[0].is_closed
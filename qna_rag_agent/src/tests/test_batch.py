@@ -0,0 +1,53 @@
+import pytest
+
+QUERIES = [
+    "What is RAGent AI?",
+    "Calculate 25 * 16",
+    "What products does RAGent AI offer?",
+    "What is RAGent AI and what is the square root of 49?",
+    "Define serendipity"
+]
+
+def summary(result):
+    context = [(c["metadata"]["source"], c["metadata"]["chunk_id"]) for c in result["retrieved_context"] or []]
+    return result["decision"], result["tool_output"], context, result["answer"]
+
+def test_matches_process_query(make_agent):
+    agent = make_agent()
+    results = agent.process_batch(QUERIES, max_concurrency=3)
+    assert [result["query"] for result in results] == QUERIES
+    assert all(result["error"] is None and result["total_ms"] > 0 for result in results)
+    assert [summary(result) for result in results] == [summary(agent.process_query(query)) for query in QUERIES]
+
+def test_repeated_queries_are_processed_once(make_agent):
+    agent = make_agent()
+    queries = ["What is RAGent AI?", "Calculate 25 * 16", "What is RAGent AI?", "What is RAGent AI?"]
+    results = agent.process_batch(queries)
+    assert agent.llm_service.backend.stats()["calls"] == 1
+    assert [result["query"] for result in results] == queries
+    assert results[0]["answer"] == results[2]["answer"] == results[3]["answer"]
+    # Every position has its own copy, down to the nested lists
+    results[0]["answer"] = None
+    results[0]["retrieved_context"][0]["metadata"]["source"] = "changed.txt"
+    results[0]["retrieved_context"].pop()
+    assert results[2]["answer"] is not None and results[2] is not results[3]
+    assert results[2]["retrieved_context"][0]["metadata"]["source"] != "changed.txt"
+    assert len(results[2]["retrieved_context"]) == len(results[0]["retrieved_context"]) + 1
+
+def test_failures_are_isolated(make_agent):
+    agent = make_agent()
+    generate = agent.llm_service.generate_answer
+    
+    def failing(query, context, index_version=None):
+        if "products" in query:
+            raise RuntimeError("model unavailable")
+        return generate(query, context, index_version=index_version)
+    
+    agent.llm_service.generate_answer = failing
+    results = agent.process_batch(QUERIES)
+    assert results[2]["error"] == "Error: model unavailable" and results[2]["answer"] is None
+    assert all(result["error"] is None for i, result in enumerate(results) if i != 2)
+
+def test_rejects_zero_concurrency(make_agent):
+    with pytest.raises(ValueError):
+        make_agent().process_batch(QUERIES, max_concurrency=0)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer
+from src.utils.bm25_store import BM25Store
+
+NO_ENTITIES = {"none": {"boost": 0.0, "names": ["Qqqq Zzzz"]}}
+
+QUERIES = [
+    "What is RAGent AI?",
+    "What products does RAGent AI offer?",
+    "vector database embedding",
+    "pricing of the enterprise tier"
+]
+
+def reference_scores(documents, query, k1=1.5, b=0.75):
+    """
+    BM25 of every chunk computed term by term, scaled so the best is 1.0.
+    """
+    vectorizer = CountVectorizer()
+    counts = vectorizer.fit_transform([doc["content"] for doc in documents]).toarray().astype(np.float64)
+    doc_len = counts.sum(axis=1)
+    doc_freq = (counts > 0).sum(axis=0)
+    idf = np.log(1.0 + (len(documents) - doc_freq + 0.5) / (doc_freq + 0.5))
+    
+    scores = np.zeros(len(documents))
+    for term in vectorizer.build_analyzer()(query):
+        if term not in vectorizer.vocabulary_:
+            continue
+        tf = counts[:, vectorizer.vocabulary_[term]]
+        idx = vectorizer.vocabulary_[term]
+        scores += idf[idx] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / doc_len.mean()))
+    return scores / scores.max()
+
+def test_scores_match_reference(documents):
+    store = BM25Store(entity_gazetteer=NO_ENTITIES)
+    store.create_index(documents)
+    for query in QUERIES:
+        expected = reference_scores(documents, query)
+        top = sorted(np.flatnonzero(expected), key=lambda i: (-expected[i], i))[:5]
+        results = store.retrieve(query)
+        assert [r["metadata"]["chunk_id"] for r in results] == [documents[i]["metadata"]["chunk_id"] for i in top]
+        assert [r["score"] for r in results] == pytest.approx([expected[i] for i in top], rel=1e-5)
+
+def test_unknown_terms_return_nothing(documents):
+    store = BM25Store(entity_gazetteer=NO_ENTITIES)
+    store.create_index(documents)
+    assert store.retrieve("qwertyuiop asdfghjkl") == []
+
+def test_entity_boost(documents):
+    store = BM25Store()
+    store.create_index(documents)
+    results = store.retrieve("What makes RAGent Assistant unique?")
+    assert "ragent assistant" in results[0]["content"].lower()
+    # Product (0.2) and company (0.3) boosts on top of the scaled lexical score
+    assert results[0]["score"] > 1.0
+
+def test_retrieve_before_index():
+    with pytest.raises(ValueError):
+        BM25Store().retrieve("anything")
+
+def test_index_version_depends_on_content_and_parameters(documents):
+    def version(docs, **params):
+        store = BM25Store(**params)
+        store.create_index(docs)
+        return store.index_version
+    
+    assert version(documents) == version(documents)
+    assert version(documents[:-1]) != version(documents)
+    assert version(documents, k1=1.2) != version(documents)
@@ -0,0 +1,115 @@
+import time
+from src.utils.cache import LRUCache, AnswerCache, normalize_query
+from src.utils.llm_backends import SimulatedBackend
+from src.utils.llm_service import LLMService
+
+CHUNKS = [
+    {"content": "RAGent AI was founded in 2020.", "metadata": {"source": "company.txt", "chunk_id": 0}, "score": 0.9},
+    {"content": "RAGent Search indexes documents.", "metadata": {"source": "products.txt", "chunk_id": 3}, "score": 0.5}
+]
+
+def simulated_service(cache):
+    backend = SimulatedBackend(latency_ms=0, latency_distribution="constant", tokens_per_second=0)
+    return LLMService(backend=backend, cache=cache), backend
+
+def test_normalize_query():
+    assert normalize_query("  What is\tRAGent   AI? ") == "what is ragent ai?"
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+def test_lru_byte_limit():
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "yyyy")
+    cache.put("c", "zzzz")
+    assert len(cache) == 2 and cache.total_bytes == 8
+    assert cache.get("a") is None
+    # Values larger than the limit on their own are not stored
+    cache.put("d", "x" * 11)
+    assert cache.get("d") is None and len(cache) == 2
+
+def test_lru_ttl():
+    cache = LRUCache(ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1 and len(cache) == 0
+
+def test_key_depends_on_query_chunks_model_and_version():
+    cache = AnswerCache()
+    key = cache.make_key("What is RAGent AI?", CHUNKS, "model", "v1")
+    assert cache.make_key("  what is ragent   AI? ", CHUNKS, "model", "v1") == key
+    # Only the identity of indexed chunks matters, not their scores
+    rescored = [dict(chunk, score=0.1) for chunk in CHUNKS]
+    assert cache.make_key("What is RAGent AI?", rescored, "model", "v1") == key
+    assert cache.make_key("What is RAGent AI?", CHUNKS[:1], "model", "v1") != key
+    assert cache.make_key("What is RAGent AI?", CHUNKS, "other", "v1") != key
+    assert cache.make_key("What is RAGent AI?", CHUNKS, "model", "v2") != key
+    calculation = {"content": "Calculation result: 2 + 2 = 4", "metadata": {"source": "calculator_tool", "chunk_id": 999}}
+    other = {"content": "Calculation result: 2 + 3 = 5", "metadata": {"source": "calculator_tool", "chunk_id": 999}}
+    assert cache.make_key("q", [calculation], "model", "v1") != cache.make_key("q", [other], "model", "v1")
+
+def test_other_index_versions_are_kept():
+    cache = AnswerCache()
+    old_key = cache.make_key("What is RAGent AI?", CHUNKS, "model", "v1")
+    new_key = cache.make_key("What is RAGent AI?", CHUNKS, "model", "v2")
+    cache.put(old_key, "v1", "old answer")
+    assert cache.get(new_key) is None
+    cache.put(new_key, "v2", "new answer")
+    # Processes on another index version do not drop each other's answers
+    assert cache.get(old_key) == "old answer" and cache.get(new_key) == "new answer"
+
+def test_disk_tier(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    cache = AnswerCache(path=path)
+    cache.put("key", "v1", "answer")
+    cache.close()
+    
+    cache = AnswerCache(path=path)
+    assert cache.get("key") == "answer"
+    assert cache.stats()["disk"]["hits"] == 1
+    # Promoted to memory: the next lookup does not reach the disk
+    assert cache.get("key") == "answer"
+    assert cache.stats()["disk"]["hits"] == 1
+    
+    other = AnswerCache(path=path)
+    other.put("other key", "v2", "other answer")
+    assert other.stats()["disk"]["entries"] == 2
+    other.close()
+    cache.close()
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = AnswerCache(max_entries=0, path=str(tmp_path / "answers.sqlite"), max_disk_entries=2)
+    cache.put("a", "v1", "A")
+    cache.put("b", "v1", "B")
+    time.sleep(0.01)
+    assert cache.get("a") == "A"
+    cache.put("c", "v1", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    cache.close()
+
+def test_service_answers_repeats_from_cache():
+    service, backend = simulated_service(AnswerCache())
+    answer = service.generate_answer("What is RAGent AI?", CHUNKS, index_version="v1")
+    assert service.generate_answer("what is  RAGent AI?", CHUNKS, index_version="v1") == answer
+    assert "".join(service.generate_answer_stream("What is RAGent AI?", CHUNKS, index_version="v1")) == answer
+    assert backend.stats()["calls"] == 1
+    
+    service.generate_answer("What is RAGent AI?", CHUNKS, index_version="v2")
+    assert backend.stats()["calls"] == 2
+
+def test_streamed_answer_is_cached():
+    service, backend = simulated_service(AnswerCache())
+    answer = "".join(service.generate_answer_stream("What is RAGent AI?", CHUNKS, index_version="v1"))
+    assert service.generate_answer("What is RAGent AI?", CHUNKS, index_version="v1") == answer
+    assert backend.stats()["calls"] == 1
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.utils import chunk_store
+from src.utils.chunk_store import ChunkStore, estimate_dict_storage_bytes
+
+def make_documents():
+    return [
+        {"content": "Plain ASCII chunk", "metadata": {"source": "a.txt", "chunk_id": 0}},
+        {"content": "Ünïcødé — chunk ✓", "metadata": {"source": "b.txt", "chunk_id": 1}},
+        {"content": "", "metadata": {"source": "a.txt", "chunk_id": 2}},
+        {"content": "Last chunk", "metadata": {"source": "c.txt", "chunk_id": 7}}
+    ]
+
+def test_round_trip_and_lookups():
+    documents = make_documents()
+    store = ChunkStore.from_documents(documents[:2])
+    store.extend(documents[2:])
+    
+    assert len(store) == 4
+    assert list(store) == documents
+    assert store[-1] == documents[-1]
+    assert store.contents() == [doc["content"] for doc in documents]
+    assert store.rows_for_source("a.txt").tolist() == [0, 2]
+    assert store.rows_for_source("missing.txt").tolist() == []
+    assert store.rows_for_chunk_ids([7, 1]).tolist() == [1, 3]
+    
+    # Materialized dicts are copies
+    store[0]["metadata"]["source"] = "changed"
+    assert store[0] == documents[0]
+
+def test_take_and_arrays():
+    documents = make_documents()
+    store = ChunkStore.from_documents(documents)
+    
+    taken = store.take(np.array([3, 1]))
+    assert list(taken) == [documents[3], documents[1]]
+    # Runs of consecutive rows are copied as one slice
+    taken = store.take(np.array([0, 1, 3]))
+    assert list(taken) == [documents[0], documents[1], documents[3]]
+    assert len(store.take(np.array([], dtype=np.int64))) == 0
+    
+    restored = ChunkStore.from_arrays(store.to_arrays(), store.sources)
+    assert list(restored) == documents
+    restored.extend([{"content": "new", "metadata": {"source": "d.txt", "chunk_id": 8}}])
+    assert restored[4]["metadata"] == {"source": "d.txt", "chunk_id": 8}
+
+def test_smaller_than_dicts(documents):
+    store = ChunkStore.from_documents(documents)
+    assert store.memory_bytes() < estimate_dict_storage_bytes(documents)
+
+def test_concurrent_readers_consolidate_once(monkeypatch):
+    documents = make_documents() * 50
+    store = ChunkStore.from_documents(documents)
+    concatenations = []
+    concatenate = np.concatenate
+    
+    def slow_concatenate(arrays, *args, **kwargs):
+        # Widen the window in which unsynchronized readers would overlap
+        concatenations.append(len(arrays))
+        time.sleep(0.01)
+        return concatenate(arrays, *args, **kwargs)
+    
+    monkeypatch.setattr(chunk_store.np, "concatenate", slow_concatenate)
+    barrier = threading.Barrier(8)
+    
+    def read(row):
+        barrier.wait()
+        return store[row]
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(read, range(8)))
+    
+    # One concatenation per column
+    assert len(concatenations) == 4
+    assert len(store) == len(documents)
+    assert results == documents[:8]
+    assert list(store) == documents
@@ -0,0 +1,70 @@
+import os
+import random
+from functools import reduce
+from src.utils.context_packer import ContextPacker, estimate_tokens, join_overlapping, truncate_to_tokens
+from src.utils.text_splitter import OffsetTextSplitter
+from src.tests.conftest import DATA_DIR
+
+def chunk(source, chunk_id, content, score=0.5):
+    return {"content": content, "metadata": {"source": source, "chunk_id": chunk_id}, "score": score}
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("RAGent AI, founded in 2020.") == 9
+    assert estimate_tokens("internationalization") == 5
+
+def test_join_overlapping_restores_the_file_text(documents):
+    for source in sorted({doc["metadata"]["source"] for doc in documents}):
+        with open(os.path.join(DATA_DIR, source), encoding="utf-8") as f:
+            text = f.read()
+        chunks = [doc["content"] for doc in documents if doc["metadata"]["source"] == source]
+        for left, right in zip(chunks, chunks[1:]):
+            joined = join_overlapping(left, right)
+            if joined == left + "\n\n" + right:
+                # Only chunks that do not overlap in the file are joined with a break
+                assert text.find(right) >= text.find(left) + len(left)
+            else:
+                assert joined in text
+
+def test_join_overlapping_chunks_of_one_paragraph():
+    rng = random.Random(0)
+    text = " ".join(rng.choice(["retrieval", "augmented", "generation", "RAGent", "index", "query"]) for _ in range(400))
+    chunks = OffsetTextSplitter(chunk_size=100, chunk_overlap=30).split_text(text)
+    assert reduce(join_overlapping, chunks) == text
+
+def test_join_without_overlap():
+    assert join_overlapping("First paragraph.", "Unrelated second paragraph.") == \
+        "First paragraph.\n\nUnrelated second paragraph."
+    assert join_overlapping("one two three", "two") == "one two three"
+
+def test_truncate_to_tokens():
+    text = "one two three four five"
+    assert truncate_to_tokens(text, 10) == text
+    assert truncate_to_tokens(text, 2) == "one two ..."
+
+def test_pack_merges_runs_and_drops_repeats():
+    chunks = [
+        chunk("b.txt", 4, "Chunk four of b.", 0.9),
+        chunk("a.txt", 1, "The first chunk of a ends with this overlap", 0.8),
+        chunk("a.txt", 2, "ends with this overlap and the second continues", 0.3),
+        chunk("b.txt", 4, "Chunk four of b.", 0.9),
+        chunk("c.txt", 0, "Chunk four of b.", 0.2),
+        {"content": "Calculation result: 2 + 2 = 4", "metadata": {"source": "calculator_tool", "chunk_id": 999}},
+    ]
+    packed = ContextPacker(max_tokens=1000).pack(chunks)
+    assert [c["metadata"].get("chunk_ids") for c in packed] == [[4], [1, 2], None]
+    assert packed[1]["content"] == "The first chunk of a ends with this overlap and the second continues"
+    assert packed[1]["score"] == 0.8 and packed[1]["metadata"]["chunk_id"] == 1
+    assert packed[-1]["metadata"]["source"] == "calculator_tool"
+
+def test_pack_respects_the_budget(documents):
+    chunks = [dict(doc, score=1.0 - i / 100) for i, doc in enumerate(documents[:12:2])]
+    for max_tokens in (50, 200, 400):
+        packed = ContextPacker(max_tokens=max_tokens, min_truncated_tokens=20).pack(chunks)
+        assert sum(estimate_tokens(c["content"]) for c in packed) <= max_tokens + 2 * len(packed)
+        assert packed[0]["metadata"]["chunk_id"] == chunks[0]["metadata"]["chunk_id"]
+    
+    # A remainder below min_truncated_tokens is left empty
+    tokens = estimate_tokens(chunks[0]["content"])
+    packed = ContextPacker(max_tokens=tokens, min_truncated_tokens=20).pack(chunks)
+    assert len(packed) == 1 and packed[0]["content"] == chunks[0]["content"]
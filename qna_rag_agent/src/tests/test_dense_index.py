@@ -0,0 +1,90 @@
+import argparse
+import numpy as np
+from sklearn.preprocessing import normalize
+from src.app import build_retriever
+from src.utils.dense_index import IVFIndex
+from src.utils.vector_store import VectorStore
+from src.tests.conftest import ranking, DATA_DIR
+
+QUERIES = ["What is RAGent AI?", "What products does RAGent AI offer?", "vector database embedding"]
+
+def random_vectors(num, dims, seed=0):
+    rng = np.random.default_rng(seed)
+    return normalize(rng.normal(size=(num, dims))).astype(np.float32)
+
+def test_ivf_all_lists_is_exhaustive():
+    vectors = random_vectors(400, 16)
+    index = IVFIndex(n_lists=10)
+    index.build(vectors)
+    queries = random_vectors(5, 16, seed=1)
+    
+    for query, (rows, scores) in zip(queries, index.search(queries, nprobe=10)):
+        assert sorted(rows.tolist()) == list(range(400))
+        np.testing.assert_allclose(scores, vectors[rows] @ query, atol=1e-6)
+
+def test_ivf_probes_fewer_rows():
+    vectors = random_vectors(400, 16)
+    index = IVFIndex(n_lists=10, nprobe=2)
+    index.build(vectors)
+    rows, scores = index.search(vectors[:1])[0]
+    assert len(rows) < 400
+    # A stored vector is found in the lists of its closest centroids
+    assert rows[np.argmax(scores)] == 0
+
+def test_ivf_add_assigns_to_existing_lists():
+    index = IVFIndex(n_lists=8)
+    index.build(random_vectors(200, 16))
+    index.add(random_vectors(20, 16, seed=2))
+    assert len(index.list_rows) == 220
+    assert index.list_offsets[-1] == 220
+    assert len(index.centroids) == 8
+
+def test_dense_retrieval_with_all_lists_matches_exhaustive_scan(documents):
+    store = VectorStore()
+    store.create_index(documents)
+    store.enable_dense_index(n_components=32, n_lists=6, nprobe=6)
+    report = store.evaluate_dense_index(QUERIES, nprobe_values=[6])
+    assert report[-1]["mode"] == "dense-ivf"
+    assert report[-1]["recall_vs_dense_exact"] == 1.0
+    assert all(len(results) == 5 for results in store.retrieve_many(QUERIES))
+
+def test_dense_index_follows_updates_and_persistence(documents, tmp_path):
+    store = VectorStore()
+    store.create_index(documents[:60])
+    store.enable_dense_index(n_components=32, n_lists=4, nprobe=4)
+    store.add_documents(documents[60:])
+    # New rows are projected lazily, before the next query
+    assert len(store.dense_index.ivf.vectors) == 60
+    store.retrieve(QUERIES[0])
+    assert len(store.dense_index.ivf.vectors) == len(documents)
+    
+    store.save(str(tmp_path / "index"))
+    loaded = VectorStore.load(str(tmp_path / "index"))
+    assert loaded.dense_index is not None
+    for query in QUERIES:
+        assert ranking(loaded.retrieve(query)) == ranking(store.retrieve(query))
+    
+    # The sparse path is still available next to the dense one
+    assert ranking(store.retrieve(QUERIES[0], dense=False)) != []
+
+def test_cli_flags_decide_dense_retrieval(tmp_path):
+    def build(**flags):
+        args = argparse.Namespace(retriever="tfidf", chunk_size=500, chunk_overlap=50, ingest_workers=1,
+                                  rebuild_index=False, dense=False, dense_dims=32, nprobe=4)
+        for name, value in flags.items():
+            setattr(args, name, value)
+        return build_retriever(args, DATA_DIR, index_dir, entity_gazetteer=None)
+    
+    index_dir = str(tmp_path / "index")
+    store = build(dense=True)
+    assert store.dense_index.params["n_components"] == 32
+    
+    # Without --dense the saved dense index is kept on disk but not used
+    store = build()
+    assert store.dense_index is None
+    assert VectorStore.load(index_dir).dense_index is not None
+    
+    # Other dimensions or nprobe rebuild it
+    store = build(dense=True, dense_dims=16, nprobe=2)
+    assert store.dense_index.params["n_components"] == 16 and store.dense_index.params["nprobe"] == 2
+    assert VectorStore.load(index_dir).dense_index.params["n_components"] == 16
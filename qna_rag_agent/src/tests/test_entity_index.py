@@ -0,0 +1,69 @@
+import re
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from src.utils.entity_index import EntityIndex
+from src.utils.vector_store import VectorStore
+
+QUERIES = [
+    "What is RAGent AI?",
+    "What makes RAGent Assistant unique?",
+    "Compare RAGent Search and ragent connect",
+    "How does RAGent handle security?",
+    "What is a vector database?"
+]
+
+def reference_scores(documents, query):
+    """
+    Scores of the original per-query regex scan over every chunk.
+    """
+    vectorizer = TfidfVectorizer()
+    embeddings = vectorizer.fit_transform([doc["content"] for doc in documents])
+    products = re.findall(r'\b(RAGent\s+(?:Search|Assistant|Analytics|Connect))\b', query, re.IGNORECASE)
+    companies = re.findall(r'\b(RAGent\s*AI|RAGent)\b', query, re.IGNORECASE)
+    boosted_query = query + "".join(f" {name} {name}" for name in products + companies)
+    similarities = cosine_similarity(vectorizer.transform([boosted_query]), embeddings)[0]
+    for names, boost in ((products, 0.2), (companies, 0.3)):
+        for name in names:
+            for i, doc in enumerate(documents):
+                if name.lower() in doc["content"].lower():
+                    similarities[i] += boost
+    return similarities
+
+def test_boosted_scores_match_original_scan(documents):
+    store = VectorStore()
+    store.create_index(documents)
+    for query in QUERIES:
+        expected = reference_scores(documents, query)
+        results = store.retrieve(query, top_k=len(documents))
+        scores = {r["metadata"]["chunk_id"]: r["score"] for r in results}
+        assert [scores[doc["metadata"]["chunk_id"]] for doc in documents] == pytest.approx(expected)
+
+def test_match_prefers_longest_name():
+    index = EntityIndex()
+    # Product names also contain the company name, as with the original patterns
+    assert [index.entity_names[i] for i, _ in index.match("Is RAGent AI the maker of RAGent Search?")] == [
+        "RAGent Search", "RAGent AI", "RAGent"
+    ]
+    assert index.match("what is retrieval?") == []
+
+def test_postings_follow_add_and_take():
+    index = EntityIndex()
+    index.build(["RAGent Search is fast", "nothing here", "ragent   search and RAGent AI"])
+    search = index.entity_names.index("RAGent Search")
+    company = index.entity_names.index("RAGent AI")
+    assert index.postings[search].tolist() == [0, 2]
+    assert index.postings[company].tolist() == [2]
+    
+    index.add(["RAGent AI news"], first_row=3)
+    assert index.postings[company].tolist() == [2, 3]
+    
+    index.take(np.array([1, 2, 3]), 4)
+    assert index.postings[search].tolist() == [1]
+    assert index.postings[company].tolist() == [1, 2]
+    
+    arrays = index.to_arrays()
+    restored = EntityIndex()
+    restored.load_arrays(arrays["entity_rows"], arrays["entity_offsets"])
+    assert [rows.tolist() for rows in restored.postings] == [rows.tolist() for rows in index.postings]
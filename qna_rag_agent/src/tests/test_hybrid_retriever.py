@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import pytest
+from src.utils import vector_store
+from src.utils.hybrid_retriever import HybridRetriever
+from src.utils.vector_store import VectorStore
+from src.utils.bm25_store import BM25Store
+from src.tests.conftest import ranking
+
+def chunk(chunk_id, source="doc.txt"):
+    return {"content": f"chunk {chunk_id}", "metadata": {"source": source, "chunk_id": chunk_id}, "score": 1.0}
+
+def leg(chunk_ids, delay=0.0):
+    def retrieve(query, top_k=5):
+        time.sleep(delay)
+        return [chunk(chunk_id) for chunk_id in chunk_ids[:top_k]]
+    return retrieve
+
+def test_reciprocal_rank_fusion():
+    retriever = HybridRetriever({"a": leg([1, 2, 3]), "b": leg([3, 1, 4])}, rrf_k=60)
+    results = retriever.retrieve("query", top_k=3)
+    retriever.close()
+    
+    assert [r["metadata"]["chunk_id"] for r in results] == [1, 3, 2]
+    assert results[0]["score"] == pytest.approx(1 / 61 + 1 / 62)
+    assert results[1]["score"] == pytest.approx(1 / 63 + 1 / 61)
+
+def test_legs_run_concurrently_and_quietly(capsys):
+    retriever = HybridRetriever({"a": leg([1], delay=0.2), "b": leg([2], delay=0.2)})
+    start = time.perf_counter()
+    retriever.retrieve("query")
+    elapsed = time.perf_counter() - start
+    retriever.close()
+    
+    assert elapsed < 0.35
+    assert set(retriever.last_latencies) == {"a", "b", "fusion"}
+    assert retriever.latency_stats()["a"] >= 200
+    assert capsys.readouterr().out == ""
+
+def test_index_version_combines_legs(documents):
+    tfidf_store = VectorStore()
+    tfidf_store.create_index(documents)
+    bm25_store = BM25Store()
+    bm25_store.create_index(documents)
+    retriever = HybridRetriever({"tfidf": partial(tfidf_store.retrieve, dense=False), "bm25": bm25_store.retrieve})
+    
+    version = retriever.index_version
+    assert tfidf_store.index_version in version and bm25_store.index_version in version
+    tfidf_store.add_documents(documents[:1])
+    assert retriever.index_version != version
+    retriever.close()
+
+def test_concurrent_readers_refresh_stale_weights_once(documents, monkeypatch):
+    merges = []
+    vstack = vector_store.vstack
+    
+    def slow_vstack(blocks, format=None):
+        # Widen the window in which unsynchronized readers would overlap
+        merges.append(len(blocks))
+        time.sleep(0.05)
+        return vstack(blocks, format=format)
+    
+    queries = ["What is RAGent AI?", "vector database embedding", "What products does RAGent AI offer?"] * 4
+    expected = VectorStore(retrieval_cache_size=0)
+    expected.create_index(documents)
+    
+    store = VectorStore(retrieval_cache_size=0)
+    store.create_index(documents[:20])
+    for start in range(20, len(documents), 10):
+        store.add_documents(documents[start:start + 10])
+    
+    monkeypatch.setattr("src.utils.vector_store.vstack", slow_vstack)
+    barrier = threading.Barrier(len(queries))
+    
+    def retrieve(query):
+        barrier.wait()
+        return store.retrieve(query)
+    
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        results = list(executor.map(retrieve, queries))
+    
+    assert len(merges) == 1
+    assert store.term_counts.shape[0] == len(documents)
+    assert store.document_embeddings.shape[0] == len(documents)
+    for query, result in zip(queries, results):
+        assert ranking(result) == ranking(expected.retrieve(query))
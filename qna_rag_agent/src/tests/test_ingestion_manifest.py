@@ -0,0 +1,98 @@
+import os
+import shutil
+import pytest
+from src.utils.document_loader import DocumentLoader
+from src.utils.ingestion_manifest import sync_index
+from src.utils.vector_store import VectorStore
+from src.tests.conftest import DATA_DIR
+
+QUERIES = ["What is RAGent AI?", "What products does RAGent AI offer?", "vector database embedding", "zebra migration"]
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / "data"
+    shutil.copytree(DATA_DIR, path)
+    return str(path)
+
+def sync(vector_store, data_dir, document_loader=None):
+    document_loader = document_loader or DocumentLoader(chunk_size=500, chunk_overlap=50)
+    return sync_index(vector_store, document_loader, data_dir, max_workers=1)
+
+def chunk_ids(vector_store, source):
+    return [doc["metadata"]["chunk_id"] for doc in vector_store.active_documents() if doc["metadata"]["source"] == source]
+
+def contents(results):
+    # Chunk ids of an incrementally updated index differ, so only texts and scores are compared
+    return [(r["content"], round(r["score"], 6)) for r in results if r["score"] > 0]
+
+def assert_matches_fresh_build(vector_store, data_dir):
+    expected, _ = sync(None, data_dir)
+    for query in QUERIES:
+        assert contents(vector_store.retrieve(query)) == contents(expected.retrieve(query))
+
+def test_builds_then_reports_up_to_date(data_dir):
+    vector_store, changed = sync(None, data_dir)
+    assert changed
+    assert sorted(vector_store.manifest["files"]) == sorted(os.listdir(data_dir))
+    
+    same_store, changed = sync(vector_store, data_dir)
+    assert same_store is vector_store and not changed
+
+def test_added_changed_and_deleted_files(data_dir):
+    vector_store, _ = sync(None, data_dir)
+    kept_ids = chunk_ids(vector_store, "ai_glossary.txt")
+    
+    with open(os.path.join(data_dir, "zoo.txt"), "w", encoding="utf-8") as f:
+        f.write("Zebra migration follows the rains across the savanna.")
+    with open(os.path.join(data_dir, "company_faq.txt"), "a", encoding="utf-8") as f:
+        f.write("\n\nQ: Does RAGent AI have a mascot?\nA: Yes, a zebra.\n")
+    os.remove(os.path.join(data_dir, "product_specs.txt"))
+    
+    vector_store, changed = sync(vector_store, data_dir)
+    assert changed
+    assert sorted(vector_store.manifest["files"]) == ["ai_glossary.txt", "company_faq.txt", "zoo.txt"]
+    assert chunk_ids(vector_store, "product_specs.txt") == []
+    # Chunks of unchanged files keep their ids
+    assert chunk_ids(vector_store, "ai_glossary.txt") == kept_ids
+    assert vector_store.retrieve("zebra migration", top_k=1)[0]["metadata"]["source"] == "zoo.txt"
+    assert_matches_fresh_build(vector_store, data_dir)
+
+def test_touched_file_is_not_reingested(data_dir):
+    vector_store, _ = sync(None, data_dir)
+    path = os.path.join(data_dir, "company_faq.txt")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    
+    version = vector_store.index_version
+    vector_store, changed = sync(vector_store, data_dir)
+    # The file is hashed again but found unchanged, so nothing is re-split
+    assert not changed
+    assert vector_store.index_version == version
+
+def test_new_chunking_parameters_rebuild(data_dir):
+    vector_store, _ = sync(None, data_dir)
+    rebuilt, changed = sync(vector_store, data_dir, DocumentLoader(chunk_size=300, chunk_overlap=30))
+    assert changed and rebuilt is not vector_store
+    assert rebuilt.manifest["chunk_size"] == 300
+    assert len(rebuilt.documents) > len(vector_store.documents)
+
+def test_manifest_survives_save_and_load(data_dir, tmp_path):
+    vector_store, _ = sync(None, data_dir)
+    vector_store.save(str(tmp_path / "index"))
+    loaded = VectorStore.load(str(tmp_path / "index"))
+    assert loaded.manifest == vector_store.manifest
+    assert sync(loaded, data_dir) == (loaded, False)
+
+def test_index_version_is_derived_from_the_content(data_dir, tmp_path):
+    vector_store, _ = sync(None, data_dir)
+    # A fresh build or a reload of the same files keeps the version (and the cached answers)
+    assert sync(None, data_dir)[0].index_version == vector_store.index_version
+    vector_store.save(str(tmp_path / "index"))
+    assert VectorStore.load(str(tmp_path / "index")).index_version == vector_store.index_version
+    
+    version = vector_store.index_version
+    with open(os.path.join(data_dir, "company_faq.txt"), "a", encoding="utf-8") as f:
+        f.write("\n\nQ: Does RAGent AI have a mascot?\nA: Yes, a zebra.\n")
+    vector_store, _ = sync(vector_store, data_dir)
+    assert vector_store.index_version != version
+    assert sync(None, data_dir, DocumentLoader(chunk_size=300, chunk_overlap=30))[0].index_version != version
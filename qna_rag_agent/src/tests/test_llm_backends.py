@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+import pytest
+from langchain.schema import HumanMessage, SystemMessage
+from src.utils.llm_backends import SimulatedBackend, BackendError
+
+MESSAGES = [
+    SystemMessage(content="You are a helpful assistant."),
+    HumanMessage(content="Context:\nRAGent AI was founded in 2020 in San Francisco.\n\nQuestion: What is RAGent AI?\n\nAnswer it.")
+]
+
+def instant(**kwargs):
+    return SimulatedBackend(latency_ms=0, latency_distribution="constant", tokens_per_second=0, **kwargs)
+
+def test_answer_depends_only_on_the_prompt():
+    answer = instant().generate(MESSAGES)
+    assert answer == "What is RAGent AI? Context: RAGent AI was founded in 2020 in San Francisco."
+    assert instant(seed=5).generate(MESSAGES) == answer
+    assert asyncio.run(instant().agenerate(MESSAGES)) == answer
+    pieces = list(instant().stream(MESSAGES))
+    assert len(pieces) == len(answer.split(" ")) and "".join(pieces) == answer
+
+def test_latencies_and_errors_follow_the_seed():
+    def outcomes(seed):
+        backend = SimulatedBackend(latency_ms=1, latency_distribution="exponential", tokens_per_second=0,
+                                   error_rate=0.3, error_status=500, seed=seed)
+        results = []
+        for _ in range(40):
+            try:
+                backend.generate(MESSAGES)
+                results.append(None)
+            except BackendError as e:
+                results.append(e.status_code)
+        return results, backend.stats()
+    
+    results, stats = outcomes(0)
+    assert outcomes(0) == (results, stats)
+    assert outcomes(1)[0] != results
+    assert set(results) == {None, 500} and stats["errors"] == results.count(500) and stats["calls"] == 40
+
+def test_generation_time_and_timeouts():
+    backend = SimulatedBackend(latency_ms=50, latency_distribution="constant", tokens_per_second=500)
+    start = time.perf_counter()
+    answer = backend.generate(MESSAGES)
+    assert time.perf_counter() - start >= 0.05 + (len(answer.split(" ")) - 1) / 500
+    
+    start = time.perf_counter()
+    with pytest.raises(BackendError) as error:
+        backend.generate(MESSAGES, timeout=0.01)
+    assert error.value.status_code is None
+    assert time.perf_counter() - start < 0.04
+    with pytest.raises(BackendError):
+        next(backend.stream(MESSAGES, timeout=0.01))
+
+def test_rate_limit_throttles_with_retry_after():
+    backend = instant(requests_per_minute=60, burst=2)
+    backend.generate(MESSAGES)
+    backend.generate(MESSAGES)
+    with pytest.raises(BackendError) as error:
+        backend.generate(MESSAGES)
+    assert error.value.status_code == 429 and 0 < error.value.retry_after <= 1.0
+    assert backend.stats()["throttled"] == 1
+
+def test_concurrency_limit_throttles():
+    backend = SimulatedBackend(latency_ms=100, latency_distribution="constant", tokens_per_second=0, max_concurrency=2)
+    errors = []
+    
+    def call():
+        try:
+            backend.generate(MESSAGES)
+        except BackendError as e:
+            errors.append(e.status_code)
+    
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == [429, 429]
+    assert backend.stats()["max_in_flight"] == 2
+
+def test_rejects_unknown_distribution():
+    with pytest.raises(ValueError):
+        SimulatedBackend(latency_distribution="uniform")
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+import pytest
+from langchain.schema import HumanMessage, SystemMessage
+from src.utils.context_packer import estimate_tokens
+from src.utils.llm_backends import SimulatedBackend, BackendError
+from src.utils.llm_scheduler import LLMScheduler, AdaptiveConcurrencyLimit, TokenBucket, DeadlineExceeded
+
+MESSAGES = [
+    SystemMessage(content="You are a helpful assistant."),
+    HumanMessage(content="Context:\nRAGent AI was founded in 2020.\n\nQuestion: What is RAGent AI?\n\nAnswer it.")
+]
+PROMPT_TOKENS = sum(estimate_tokens(message.content) for message in MESSAGES)
+
+def simulated(latency_ms=0, **kwargs):
+    return SimulatedBackend(latency_ms=latency_ms, latency_distribution="constant", tokens_per_second=0, **kwargs)
+
+def scheduler(backend, **kwargs):
+    kwargs.setdefault("base_delay", 0.001)
+    kwargs.setdefault("seed", 0)
+    return LLMScheduler(backend, **kwargs)
+
+def test_retries_server_errors():
+    backend = simulated(error_rate=0.3, error_status=503)
+    llm = scheduler(backend, max_retries=10)
+    answers = [llm.generate(MESSAGES) for _ in range(20)]
+    assert set(answers) == {simulated().generate(MESSAGES)}
+    assert llm.stats()["retries"] == backend.stats()["errors"] > 0
+    assert llm.stats()["failed"] == 0
+
+def test_retries_throttling_after_retry_after():
+    backend = simulated(requests_per_minute=600, burst=1)
+    backend.generate(MESSAGES)
+    llm = scheduler(backend)
+    start = time.perf_counter()
+    llm.generate(MESSAGES)
+    assert time.perf_counter() - start >= 0.09
+    assert llm.stats()["throttled"] == 1 and llm.stats()["retries"] == 1
+    assert backend.stats()["throttled"] == 1
+
+def test_gives_up_after_max_retries():
+    backend = simulated(error_rate=1.0, error_status=503)
+    llm = scheduler(backend, max_retries=2)
+    with pytest.raises(BackendError) as error:
+        llm.generate(MESSAGES)
+    assert error.value.status_code == 503
+    assert backend.stats()["calls"] == 3 and llm.stats()["failed"] == 1
+
+def test_client_errors_are_not_retried():
+    backend = simulated(error_rate=1.0, error_status=400)
+    llm = scheduler(backend)
+    with pytest.raises(BackendError) as error:
+        llm.generate(MESSAGES)
+    assert error.value.status_code == 400 and not isinstance(error.value, DeadlineExceeded)
+    with pytest.raises(BackendError):
+        asyncio.run(llm.agenerate(MESSAGES))
+    with pytest.raises(BackendError):
+        list(llm.stream(MESSAGES))
+    assert backend.stats()["calls"] == 3 and llm.stats()["retries"] == 0
+
+def test_deadline_waiting_for_the_request_rate_limit():
+    llm = scheduler(simulated(), requests_per_minute=60, request_burst=1, deadline=0.1)
+    llm.generate(MESSAGES)
+    with pytest.raises(DeadlineExceeded, match="request rate limit"):
+        llm.generate(MESSAGES)
+
+def test_deadline_waiting_for_the_token_rate_limit():
+    llm = scheduler(simulated(), tokens_per_minute=60, max_answer_tokens=100, deadline=1.0)
+    with pytest.raises(DeadlineExceeded, match="token rate limit"):
+        llm.generate(MESSAGES)
+
+def test_deadline_waiting_for_a_concurrency_slot():
+    llm = scheduler(simulated(latency_ms=300), initial_concurrency=1)
+    thread = threading.Thread(target=llm.generate, args=(MESSAGES,))
+    thread.start()
+    time.sleep(0.05)
+    with pytest.raises(DeadlineExceeded, match="concurrency slot"):
+        llm.generate(MESSAGES, timeout=0.05)
+    with pytest.raises(DeadlineExceeded, match="concurrency slot"):
+        asyncio.run(llm.agenerate(MESSAGES, timeout=0.05))
+    thread.join()
+
+def test_deadline_waiting_for_the_model():
+    llm = scheduler(simulated(latency_ms=300))
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded, match="waiting for the model") as error:
+        llm.generate(MESSAGES, timeout=0.05)
+    assert error.value.status_code == 504
+    assert time.perf_counter() - start < 0.2
+    with pytest.raises(DeadlineExceeded, match="waiting for the model"):
+        next(llm.stream(MESSAGES, timeout=0.05))
+
+def test_deadline_backing_off_before_a_retry():
+    backend = simulated(requests_per_minute=60, burst=1)
+    backend.generate(MESSAGES)
+    llm = scheduler(backend, deadline=0.5)
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded, match="backing off"):
+        llm.generate(MESSAGES)
+    # Fails at once instead of sleeping past the deadline
+    assert time.perf_counter() - start < 0.1
+    assert llm.stats()["deadline_exceeded"] == 1
+
+def test_concurrency_limit_shrinks_on_overload_and_recovers():
+    limit = AdaptiveConcurrencyLimit(initial=8, maximum=8)
+    starts = [limit.acquire() for _ in range(3)]
+    limit.release(starts[0], "overload")
+    assert limit.limit == 4
+    # Requests started before the decrease do not decrease it again
+    limit.release(starts[1], "overload")
+    assert limit.limit == 4
+    limit.release(limit.acquire(), "overload")
+    assert limit.limit == 2
+    limit.release(starts[2], "error")
+    assert limit.limit == 2
+    for _ in range(30):
+        limit.release(limit.acquire(), "success")
+    assert limit.limit == 8 and limit.in_flight == 0
+
+def test_scheduler_adapts_to_a_concurrency_limited_backend():
+    backend = simulated(latency_ms=50, max_concurrency=2)
+    llm = scheduler(backend, initial_concurrency=8, max_concurrency=8, max_retries=20)
+    threads = [threading.Thread(target=llm.generate, args=(MESSAGES,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert llm.stats()["throttled"] > 0 and llm.concurrency.limit < 8
+    
+    shrunk = llm.concurrency.limit
+    for _ in range(10):
+        llm.generate(MESSAGES)
+    assert llm.concurrency.limit > shrunk
+    assert llm.stats()["failed"] == 0
+
+def test_failed_attempts_refund_their_reservation():
+    answer_tokens = estimate_tokens(simulated().generate(MESSAGES))
+    
+    # A throttled attempt is refunded in full before the retry reserves again
+    backend = simulated(requests_per_minute=600, burst=1)
+    backend.generate(MESSAGES)
+    llm = scheduler(backend, requests_per_minute=6, request_burst=2, tokens_per_minute=600, max_answer_tokens=200)
+    llm.generate(MESSAGES)
+    assert llm.request_bucket.tokens >= 1
+    assert llm.token_bucket.tokens >= 600 - PROMPT_TOKENS - answer_tokens
+    
+    # A server error used the prompt tokens but generated no answer
+    llm = scheduler(simulated(error_rate=1.0, error_status=503), tokens_per_minute=600, max_answer_tokens=200,
+                    max_retries=0)
+    with pytest.raises(BackendError):
+        llm.generate(MESSAGES)
+    assert 600 - PROMPT_TOKENS <= llm.token_bucket.tokens < 600 - PROMPT_TOKENS + 1
+
+def test_token_bucket_reserves_ahead():
+    bucket = TokenBucket(per_minute=60, capacity=2)
+    assert bucket.reserve(2) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve(1, max_wait=0.5) is None
+    bucket.refund(10)
+    assert bucket.tokens == 2
@@ -0,0 +1,60 @@
+import asyncio
+import time
+from src.tests.conftest import OfflineDictionary
+
+class SlowDictionary(OfflineDictionary):
+    def run(self, word: str):
+        time.sleep(0.1)
+        return super().run(word)
+    
+    async def arun(self, word: str):
+        await asyncio.sleep(0.1)
+        return super().run(word)
+
+def test_decomposes_every_expression_and_definition(make_agent):
+    agent = make_agent()
+    result = agent.process_query("How many employees does RAGent AI have and calculate 25 * 16 and also 2 + 3 * 4")
+    assert result["tool_used"] == "mixed"
+    assert [(s["type"], s["input"]) for s in result["subtasks"]] == [
+        ("calculator", "25 * 16"), ("calculator", "2 + 3 * 4"),
+        ("rag", "How many employees does RAGent AI have and calculate 25 * 16 and also 2 + 3 * 4")
+    ]
+    assert result["tool_output"] == "400; 14"
+    assert all(subtask["ms"] >= 0 for subtask in result["subtasks"])
+    
+    result = agent.process_query("Define serendipity and define RAG and tell me what is 15 + 27?")
+    # RAG is an AI term, answered from the documents
+    assert [(s["type"], s["input"]) for s in result["subtasks"][:-1]] == [
+        ("calculator", "15 + 27"), ("dictionary", "serendipity")
+    ]
+
+def test_tool_results_reach_the_model(make_agent):
+    agent = make_agent()
+    backend = agent.llm_service.backend
+    generate = backend.generate
+    prompts = []
+    
+    def recording(messages, timeout=None):
+        prompts.append(messages[-1].content)
+        return generate(messages, timeout)
+    
+    backend.generate = recording
+    agent.process_query("Define serendipity and tell me what is the square root of 49 for RAGent AI?")
+    assert "Calculation Result: Calculation result: square root of 49 = The square root of 49.0 is 7.000000" in prompts[0]
+    assert "Dictionary Definition: Definition of serendipity: Definition of serendipity" in prompts[0]
+    assert "[Document 1]" in prompts[0]
+
+def test_sub_tasks_run_concurrently(make_agent):
+    agent = make_agent()
+    agent.tools["dictionary"] = SlowDictionary()
+    query = "Define serendipity and define ephemeral and define quixotic, what is 2 + 2?"
+    
+    start = time.perf_counter()
+    result = agent.process_query(query)
+    assert time.perf_counter() - start < 0.25
+    assert [s["type"] for s in result["subtasks"]] == ["calculator", "dictionary", "dictionary", "dictionary", "rag"]
+    
+    start = time.perf_counter()
+    async_result = asyncio.run(agent.aprocess_query(query))
+    assert time.perf_counter() - start < 0.25
+    assert async_result["tool_output"] == result["tool_output"]
@@ -0,0 +1,71 @@
+from src.utils.vector_store import VectorStore
+from src.tests.conftest import ranking
+
+QUERY = "What products does RAGent AI offer?"
+
+def fresh_ranking(documents, query=QUERY):
+    store = VectorStore(retrieval_cache_size=0)
+    store.create_index(documents)
+    return ranking(store.retrieve(query))
+
+def test_repeated_queries_hit_the_cache(documents):
+    store = VectorStore()
+    store.create_index(documents)
+    first = store.retrieve(QUERY)
+    assert store.retrieve("  what products does ragent AI offer? ") == first
+    stats = store.retrieval_cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    # top_k and the dense flag are part of the key
+    store.retrieve(QUERY, top_k=3)
+    assert store.retrieval_cache.stats()["misses"] == 2
+
+def test_callers_cannot_alter_cached_results(documents):
+    store = VectorStore()
+    store.create_index(documents)
+    results = store.retrieve(QUERY)
+    results[0]["score"] = -1.0
+    results[0]["metadata"]["source"] = "changed.txt"
+    cached = store.retrieve(QUERY)[0]
+    assert cached["score"] > 0 and cached["metadata"]["source"] != "changed.txt"
+
+def test_updates_invalidate_the_cache(documents):
+    store = VectorStore()
+    store.create_index(documents[:len(documents) // 2])
+    store.retrieve(QUERY)
+    
+    version = store.index_version
+    store.add_documents(documents[len(documents) // 2:])
+    assert store.index_version != version and len(store.retrieval_cache) == 0
+    assert ranking(store.retrieve(QUERY)) == fresh_ranking(documents)
+    
+    source = store.retrieve(QUERY)[0]["metadata"]["source"]
+    version = store.index_version
+    store.remove_documents(source=source)
+    assert store.index_version != version
+    remaining = [doc for doc in documents if doc["metadata"]["source"] != source]
+    assert ranking(store.retrieve(QUERY)) == fresh_ranking(remaining)
+    
+    version = store.index_version
+    store.compact()
+    assert store.index_version != version and len(store.retrieval_cache) == 0
+    
+    version = store.index_version
+    store.enable_dense_index(n_components=16, n_lists=2, nprobe=2)
+    assert store.index_version != version and len(store.retrieval_cache) == 0
+
+def test_retrieve_many_scores_only_misses(documents):
+    store = VectorStore()
+    store.create_index(documents)
+    store.retrieve(QUERY)
+    results = store.retrieve_many([QUERY, "headquarters location", QUERY])
+    assert store.retrieval_cache.stats()["hits"] == 2
+    assert store.retrieval_cache.stats()["misses"] == 2
+    assert ranking(results[1]) == fresh_ranking(documents, "headquarters location")
+    assert results[0] == results[2]
+
+def test_cache_can_be_disabled(documents):
+    store = VectorStore(retrieval_cache_size=0)
+    store.create_index(documents)
+    store.retrieve(QUERY)
+    store.retrieve(QUERY)
+    assert len(store.retrieval_cache) == 0 and store.retrieval_cache.stats()["hits"] == 0
@@ -0,0 +1,134 @@
+import random
+import re
+import pytest
+from src.agents.router import QueryRouter
+
+# The routing rules of the original AgentOrchestrator, copied as the reference
+ORIGINAL_TOOL_PATTERNS = {
+    "calculator": r"\b(calculate|compute|evaluate|solve|find the value of|math|age|born in|how old|years old|square root|sqrt|\d+\s*\+|\d+\s*\-|\d+\s*\*|\d+\s*\/|\d+\s*\^)\b|\b(what is\s+[\d\+\-\*\/\(\)]+)\b",
+    "dictionary": r"\b(define|definition of|meaning of|what does .* mean)\b(?!.*\bin AI\b|.*\bin artificial intelligence\b)"
+}
+ORIGINAL_AI_RELATED_PATTERNS = [
+    r'\b(ai|artificial intelligence|machine learning|neural network|llm|large language model)\b',
+    r'\bhallucination\b',
+    r'\brag\b',
+    r'\bretrieval augmented generation\b',
+    r'\bwhat\s+is\s+the\s+meaning\s+of\s+\w+\s+in\s+ai\b',
+    r'\bwhat\s+does\s+\w+\s+mean\s+in\s+ai\b',
+    r'\bdefine\s+["\']?\w+\s+in\s+ai["\']?\b'
+]
+ORIGINAL_SYSTEM_TERMS = [
+    r'\b(ragent|rag agent|company|product|headquarter|employee|technology)\b',
+    r'\b(agentic|routing|workflow|pipeline|architecture|vector store|llm service)\b',
+    r'\b(this system|the system|our system)\b',
+    r'\bhow\s+\w+\s+works\s+in\s+this\s+system\b',
+    r'\bdefine\s+["\']?\w+\s+routing["\']?\b',
+]
+ORIGINAL_AI_TERMS = [
+    'artificial intelligence', 'machine learning', 'deep learning', 'neural network',
+    'transformer', 'llm', 'large language model', 'retrieval augmented generation', 'rag',
+    'vector database', 'embedding', 'fine-tuning', 'prompt engineering', 'attention mechanism',
+    'tokenization', 'nlp', 'natural language processing', 'generative ai', 'hallucination',
+    'ai alignment', 'bias', 'explainable ai', 'ai safety', 'responsible ai', 'ai governance',
+    'multimodal ai', 'diffusion model', 'foundation model', 'agent', 'agentic workflow',
+    'agentic routing', 'tool use', 'in-context learning', 'parameter-efficient fine-tuning',
+    'quantization', 'perplexity', 'context window', 'token'
+]
+ORIGINAL_INPUT_PATTERNS = {
+    "calculator": [r"calculate\s+(.*)", r"compute\s+(.*)", r"evaluate\s+(.*)", r"solve\s+(.*)",
+                   r"what is\s+(.*)", r"find the value of\s+(.*)"],
+    "dictionary": [r"define\s+(.*)", r"definition of\s+(.*)", r"meaning of\s+(.*)", r"what does\s+(.*?)\s+mean"]
+}
+ORIGINAL_MATH_PATTERN = r'(square root of \d+(\.\d+)?|sqrt\s*\(?\s*\d+(\.\d+)?\s*\)?|\d+\s*[\+\-\*\/\^]\s*\d+)'
+
+def original_tool(query):
+    query_lower = query.lower()
+    for pattern in ORIGINAL_AI_RELATED_PATTERNS:
+        if re.search(pattern, query_lower):
+            return None
+    for term in ORIGINAL_AI_TERMS:
+        if re.search(r'\bdefine\s+["\']?' + re.escape(term) + r'["\']?\b', query_lower):
+            return None
+    for pattern in ORIGINAL_SYSTEM_TERMS:
+        if re.search(pattern, query_lower):
+            return None
+    for tool_name, pattern in ORIGINAL_TOOL_PATTERNS.items():
+        if re.search(pattern, query_lower):
+            return tool_name
+    return None
+
+def original_decision(query):
+    """
+    Route and tool input the original orchestrator chose for a query.
+    """
+    if re.search(ORIGINAL_MATH_PATTERN, query.lower()) and len(query.split()) > 6:
+        return ("mixed",)
+    tool_name = original_tool(query)
+    if tool_name is None:
+        return (None,)
+    for pattern in ORIGINAL_INPUT_PATTERNS[tool_name]:
+        match = re.search(pattern, query.lower())
+        if match:
+            return tool_name, match.group(1).strip()
+    return tool_name, query
+
+def decision(router, query):
+    route = router.route(query)
+    if route in (None, "mixed"):
+        return (route,)
+    return route, router.tool_input(query, route)
+
+LABELLED_QUERIES = [
+    ("What is RAGent AI?", None),
+    ("What products does RAGent AI offer?", None),
+    ("How many employees does the company have?", None),
+    ("How routing works in this system", None),
+    ("Define agentic routing", None),
+    ("What is the meaning of hallucination in AI?", None),
+    ("define 'embedding'", None),
+    ("Define quantization", None),
+    ("Hello there", None),
+    ("", None),
+    ("Calculate 25 * 16", "calculator"),
+    ("How old am I if I was born in 1990?", "calculator"),
+    ("what is 2+2", "calculator"),
+    ("sqrt(81)", "calculator"),
+    ("Define serendipity", "dictionary"),
+    ("What does ephemeral mean?", "dictionary"),
+    ("meaning of quixotic", "dictionary"),
+    ("What is the square root of 50?", "mixed"),
+    ("What is RAGent AI and what is the square root of 50?", "mixed"),
+    ("Define serendipity and define RAG and tell me what is 15 + 27?", "mixed"),
+]
+
+FRAGMENTS = [
+    "what is", "what does", "mean", "define", "definition of", "meaning of", "calculate", "compute",
+    "square root of", "sqrt", "born in", "how old", "in ai", "in AI", "ragent", "company", "the system",
+    "routing", "rag", "llm", "token", "agent", "bias", "serendipity", "apple", "and", "please", "?",
+    "25", "16", "*", "+", "2+2", "3 ^ 4", "1.5", "1990", "(", ")", "'", '"', "\n", "employees",
+    "machine learning", "fine-tuning", "tool use", "how", "works", "in this system", "of", "the",
+]
+
+@pytest.mark.parametrize("query,route", LABELLED_QUERIES)
+def test_labelled_queries(query, route):
+    assert QueryRouter().route(query) == route
+    assert decision(QueryRouter(), query) == original_decision(query)
+
+def test_random_queries_match_the_original_rules():
+    rng = random.Random(0)
+    router = QueryRouter()
+    for _ in range(5000):
+        query = " ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 14)))
+        assert decision(router, query) == original_decision(query), query
+
+def test_math_expressions_and_definition_words():
+    router = QueryRouter()
+    query = "Define serendipity and define RAG, what is 2 + 3 * 4 and the square root of 16?"
+    assert router.math_expressions(query) == ["2 + 3 * 4", "square root of 16"]
+    assert router.definition_words(query) == ["serendipity"]
+    assert router.definition_words("what does the word 'ephemeral' mean and define ephemeral") == ["ephemeral"]
+
+def test_custom_tool_patterns_keep_priority():
+    router = QueryRouter({"dictionary": ORIGINAL_TOOL_PATTERNS["dictionary"], "calculator": ORIGINAL_TOOL_PATTERNS["calculator"]})
+    assert router.route("define 2+2") == "dictionary"
+    assert QueryRouter().route("define 2+2") == "calculator"
@@ -0,0 +1,45 @@
+import pytest
+from src.utils.sharded_vector_store import ShardedVectorStore
+from src.utils.vector_store import VectorStore
+from src.tests.conftest import ranking
+
+QUERIES = [
+    "What is RAGent AI?",
+    "What products does RAGent AI offer?",
+    "What makes RAGent Assistant unique?",
+    "vector database embedding"
+]
+
+@pytest.mark.parametrize("partition", ["hash", "source"])
+def test_matches_single_store(documents, partition):
+    expected = VectorStore()
+    expected.create_index(documents)
+    with ShardedVectorStore(num_shards=3, partition=partition) as store:
+        store.create_index(documents)
+        for query, results in zip(QUERIES, store.retrieve_many(QUERIES)):
+            assert [r[:2] for r in ranking(results)] == [r[:2] for r in ranking(expected.retrieve(query))]
+            assert [r["score"] for r in results] == pytest.approx([r["score"] for r in expected.retrieve(query)])
+
+def test_hash_partition_is_the_balanced_default(documents):
+    with ShardedVectorStore(num_shards=3) as store:
+        assert store.partition == "hash"
+        sizes = [len(shard) for shard in store._partition(documents)]
+    assert sum(sizes) == len(documents)
+    assert min(sizes) > len(documents) / 3 / 2
+
+def test_source_partition_balances_files_by_chunk_count():
+    documents = [
+        {"content": "text", "metadata": {"source": source, "chunk_id": i}}
+        for i, source in enumerate(["a"] * 6 + ["b"] * 4 + ["c"] * 3 + ["d"] * 2)
+    ]
+    with ShardedVectorStore(num_shards=2, partition="source") as store:
+        shards = store._partition(documents)
+    assert sorted(sorted({doc["metadata"]["source"] for doc in shard}) for shard in shards) == [["a", "d"], ["b", "c"]]
+    assert sorted(len(shard) for shard in shards) == [7, 8]
+
+def test_closed_store_rejects_queries(documents):
+    store = ShardedVectorStore(num_shards=2)
+    store.create_index(documents)
+    store.close()
+    with pytest.raises(ValueError):
+        store.retrieve("What is RAGent AI?")
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+QUERIES = [
+    "What is RAGent AI?",
+    "Calculate 25 * 16",
+    "What is RAGent AI and what is the square root of 49?",
+    "What products does RAGent AI offer?"
+]
+
+class SlowStore:
+    """Vector store whose retrieval takes at least ``delay`` seconds."""
+    
+    def __init__(self, store, delay: float):
+        self.store = store
+        self.delay = delay
+        self.index_version = store.index_version
+    
+    def retrieve(self, query: str, top_k: int = 5):
+        time.sleep(self.delay)
+        return self.store.retrieve(query, top_k)
+
+def summary(result):
+    context = [(c["metadata"]["source"], c["metadata"]["chunk_id"]) for c in result["retrieved_context"] or []]
+    return result["decision"], result["tool_output"], context, result["answer"]
+
+def test_same_results_as_without_speculation(make_agent):
+    plain = make_agent()
+    speculative = make_agent(speculative_retrieval=True)
+    for query in QUERIES:
+        expected = summary(plain.process_query(query))
+        assert summary(speculative.process_query(query)) == expected
+        assert summary(asyncio.run(speculative.aprocess_query(query))) == expected
+    
+    stats = speculative.speculation_stats()
+    assert stats["used"] == 6 and stats["wasted"] == 2
+    assert stats["wasted_rate"] == 0.25
+
+def test_retrieval_overlaps_routing(make_agent, vector_store):
+    agent = make_agent(speculative_retrieval=True)
+    agent.vector_store = SlowStore(vector_store, 0.1)
+    route = agent._route
+    
+    def slow_route(query):
+        time.sleep(0.1)
+        return route(query)
+    
+    agent._route = slow_route
+    start = time.perf_counter()
+    agent.process_query("What is RAGent AI?")
+    assert time.perf_counter() - start < 0.19
@@ -0,0 +1,42 @@
+from src.utils.cache import AnswerCache
+
+def events(agent, query):
+    return list(agent.process_query_stream(query))
+
+def test_rag_query_streams_tokens(make_agent):
+    agent = make_agent()
+    stream = events(agent, "What is RAGent AI?")
+    types = [event["type"] for event in stream]
+    assert types[:2] == ["route", "retrieval"] and types[-1] == "done"
+    tokens = [event["text"] for event in stream if event["type"] == "token"]
+    assert len(tokens) > 1 and types[2:-1] == ["token"] * len(tokens)
+    
+    result = stream[-1]["result"]
+    assert result["answer"] == "".join(tokens)
+    assert result["retrieved_context"] == stream[1]["retrieved_context"]
+    assert 0 <= result["ttft_ms"] <= result["total_ms"]
+    assert agent.process_query("What is RAGent AI?")["answer"] == result["answer"]
+
+def test_tool_and_mixed_queries(make_agent):
+    agent = make_agent()
+    stream = events(agent, "Calculate 25 * 16")
+    assert [event["type"] for event in stream] == ["route", "tool", "token", "done"]
+    assert stream[1]["tool_output"] == "400" and stream[-1]["result"]["answer"] == "400"
+    
+    stream = events(agent, "What is RAGent AI and what is the square root of 49?")
+    assert [event["type"] for event in stream][:3] == ["route", "tool", "retrieval"]
+    assert stream[0]["tool_used"] == "mixed"
+
+def test_cached_answer_is_one_piece(make_agent):
+    agent = make_agent(cache=AnswerCache())
+    first = events(agent, "What is RAGent AI?")
+    again = events(agent, "What is RAGent AI?")
+    tokens = [event["text"] for event in again if event["type"] == "token"]
+    assert tokens == [first[-1]["result"]["answer"]]
+    assert agent.llm_service.backend.stats()["calls"] == 1
+
+def test_service_stream_matches_generate(make_agent, documents):
+    service = make_agent().llm_service
+    context = documents[:3]
+    assert "".join(service.generate_answer_stream("What is RAGent AI?", context)) == \
+        service.generate_answer("What is RAGent AI?", context)
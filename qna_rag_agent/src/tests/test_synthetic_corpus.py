@@ -0,0 +1,45 @@
+import os
+import sys
+from src.agents.router import QueryRouter
+from src.utils.document_loader import DocumentLoader
+
+# The generator lives with the benchmarks at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from benchmarks.synthetic import SyntheticCorpus
+
+def read_all(directory):
+    contents = {}
+    for filename in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            contents[filename] = f.read()
+    return contents
+
+def test_same_seed_same_corpus(tmp_path):
+    stats = SyntheticCorpus(seed=3, vocabulary_size=2000).write(str(tmp_path / "a"), 300, chunks_per_file=100)
+    SyntheticCorpus(seed=3, vocabulary_size=2000).write(str(tmp_path / "b"), 300, chunks_per_file=100)
+    SyntheticCorpus(seed=4, vocabulary_size=2000).write(str(tmp_path / "c"), 300, chunks_per_file=100)
+    
+    corpus = read_all(str(tmp_path / "a"))
+    assert len(corpus) == stats["files"] == 3
+    assert sum(len(text.encode("utf-8")) for text in corpus.values()) == stats["bytes"]
+    assert read_all(str(tmp_path / "b")) == corpus
+    assert read_all(str(tmp_path / "c")) != corpus
+    assert [name.split("_")[0] for name in corpus] == ["faq", "glossary", "specification"]
+
+def test_corpus_splits_into_about_the_requested_chunks(tmp_path):
+    SyntheticCorpus(seed=0, vocabulary_size=2000).write(str(tmp_path), 500)
+    chunks = DocumentLoader(chunk_size=500, chunk_overlap=50).load_and_split_documents(str(tmp_path))
+    assert 400 <= len(chunks) <= 600
+
+def test_queries_are_reproducible_and_route_by_kind():
+    corpus = SyntheticCorpus(seed=0, vocabulary_size=2000)
+    queries = corpus.queries(30)
+    assert corpus.queries(30) == queries
+    assert SyntheticCorpus(seed=0, vocabulary_size=2000).queries(30) == queries
+    assert corpus.queries(30, seed=1) != queries
+    
+    router = QueryRouter()
+    routes = [router.route(query) for query in queries]
+    assert routes[1::3] == ["calculator"] * 10
+    assert routes[2::3] == ["mixed"] * 10
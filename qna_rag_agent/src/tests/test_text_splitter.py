@@ -0,0 +1,56 @@
+import os
+import random
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.utils.text_splitter import OffsetTextSplitter, DEFAULT_SEPARATORS
+from src.tests.conftest import DATA_DIR
+
+def recursive_splitter(chunk_size, chunk_overlap):
+    # The splitter the document loader used before OffsetTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=DEFAULT_SEPARATORS
+    )
+
+def random_text(seed, length):
+    rng = random.Random(seed)
+    pieces = ["\n\n", "\n", ". ", "! ", "? ", ", ", " ", "  ", "\t"]
+    words = ["retrieval", "RAGent", "a", "vector", "supercalifragilisticexpialidocious" * 3, "é", "答案"]
+    out = []
+    while sum(map(len, out)) < length:
+        out.append(rng.choice(words))
+        out.append(rng.choice(pieces))
+    return "".join(out)
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(500, 50), (200, 0), (100, 40), (20, 5)])
+def test_matches_recursive_splitter_on_bundled_files(chunk_size, chunk_overlap):
+    for filename in sorted(os.listdir(DATA_DIR)):
+        with open(os.path.join(DATA_DIR, filename), encoding="utf-8") as f:
+            text = f.read()
+        expected = recursive_splitter(chunk_size, chunk_overlap).split_text(text)
+        assert OffsetTextSplitter(chunk_size, chunk_overlap).split_text(text) == expected
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_recursive_splitter_on_random_text(seed):
+    text = random_text(seed, 3000)
+    chunk_size = random.Random(seed).choice([30, 80, 250])
+    chunk_overlap = chunk_size // 4
+    expected = recursive_splitter(chunk_size, chunk_overlap).split_text(text)
+    assert OffsetTextSplitter(chunk_size, chunk_overlap).split_text(text) == expected
+
+def test_offsets_point_into_the_text():
+    text = random_text(0, 2000)
+    splitter = OffsetTextSplitter(100, 20)
+    offsets = splitter.split_offsets(text)
+    assert [text[start:end] for start, end in offsets] == splitter.split_text(text)
+    assert all(end - start <= 100 for start, end in offsets)
+    assert offsets == sorted(offsets)
+
+def test_edge_cases():
+    splitter = OffsetTextSplitter(10, 2)
+    assert splitter.split_text("") == []
+    assert splitter.split_text("   \n\n  ") == []
+    with pytest.raises(ValueError):
+        OffsetTextSplitter(10, 20)
@@ -0,0 +1,75 @@
+import json
+import pytest
+from src.utils.tracing import Tracer, Histogram, tracer
+
+@pytest.fixture
+def global_tracer():
+    tracer.enabled = True
+    tracer.reset()
+    yield tracer
+    tracer.enabled = False
+    tracer.reset()
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(10, 20, float("inf")))
+    for value in [5] * 50 + [15] * 40 + [100] * 10:
+        histogram.observe(value)
+    assert histogram.count == 100 and histogram.max == 100
+    assert histogram.quantile(0.5) == 10
+    assert histogram.quantile(0.9) == 20
+    assert 20 < histogram.quantile(0.99) <= 100
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_disabled_tracer_records_nothing():
+    disabled = Tracer()
+    with disabled.trace() as spans:
+        with disabled.span("retrieval") as span:
+            span.set(chunks=5)
+        disabled.increment("queries")
+    assert spans == [] and disabled.snapshot() == {"spans": {}, "counters": {}}
+
+def test_spans_nest_and_collect_into_traces():
+    enabled = Tracer(enabled=True)
+    with enabled.trace() as spans:
+        with enabled.span("query", route="rag"):
+            with enabled.span("retrieval") as span:
+                span.set(chunks=5)
+            enabled.record("llm_call", 12.5)
+    with pytest.raises(RuntimeError):
+        with enabled.span("llm_call"):
+            raise RuntimeError("failed")
+    
+    assert [(s["name"], s["parent"]) for s in spans] == [("retrieval", "query"), ("llm_call", "query"), ("query", None)]
+    assert spans[0]["attributes"] == {"chunks": 5} and spans[2]["attributes"] == {"route": "rag"}
+    snapshot = enabled.snapshot()["spans"]
+    assert snapshot["llm_call"]["count"] == 2 and snapshot["query"]["count"] == 1
+
+def test_exports():
+    enabled = Tracer(enabled=True)
+    enabled.record("retrieval", 3.0)
+    enabled.record("retrieval", 7.0)
+    enabled.increment("queries", route="rag")
+    enabled.increment("queries", route="rag")
+    enabled.increment("prompt_tokens", 120)
+    
+    exported = json.loads(enabled.to_json())
+    assert exported["spans"]["retrieval"]["mean_ms"] == 5.0
+    assert exported["counters"] == {"prompt_tokens": 120, 'queries{route="rag"}': 2}
+    
+    lines = enabled.to_prometheus().splitlines()
+    assert 'rag_span_duration_ms_bucket{span="retrieval",le="5"} 1' in lines
+    assert 'rag_span_duration_ms_bucket{span="retrieval",le="+Inf"} 2' in lines
+    assert 'rag_span_duration_ms_count{span="retrieval"} 2' in lines
+    assert "# TYPE rag_queries_total counter" in lines
+    assert 'rag_queries_total{route="rag"} 2' in lines
+
+def test_query_traces_cover_every_stage(make_agent, global_tracer):
+    agent = make_agent()
+    result = agent.process_query("What is RAGent AI and what is the square root of 49?")
+    names = {span["name"] for span in result["trace"]}
+    assert {"routing", "tool", "retrieval", "context_packing", "prompt_construction", "llm_call", "query"} <= names
+    
+    results = agent.process_batch(["What is RAGent AI?", "Calculate 25 * 16"])
+    assert [span["name"] for span in results[1]["trace"]] == ["routing", "tool", "query"]
+    counters = global_tracer.snapshot()["counters"]
+    assert counters['queries{route="mixed"}'] == 1 and counters['queries{route="calculator"}'] == 1
@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from src.utils.vector_store import VectorStore, IndexVersionError, INDEX_HEADER_FILE, _top_k_indices
+from src.tests.conftest import ranking
+
+QUERIES = [
+    "What is RAGent AI?",
+    "What products does RAGent AI offer?",
+    "What makes RAGent Assistant unique?",
+    "vector database embedding",
+    "headquarters location"
+]
+
+def test_save_and_load_round_trip(documents, tmp_path):
+    store = VectorStore()
+    store.create_index(documents)
+    store.save(str(tmp_path / "index"))
+    
+    loaded = VectorStore.load(str(tmp_path / "index"))
+    # Read-only views of the memory-mapped files, not copies
+    assert not loaded.document_embeddings.data.flags.writeable
+    for query in QUERIES:
+        assert ranking(loaded.retrieve(query)) == ranking(store.retrieve(query))
+
+def test_save_swaps_an_existing_index(documents, tmp_path, monkeypatch):
+    path = str(tmp_path / "index")
+    store = VectorStore()
+    store.create_index(documents)
+    store.save(path)
+    old = VectorStore.load(path)
+    
+    removed = []
+    rmtree = shutil.rmtree
+    
+    def recording_rmtree(target, *args, **kwargs):
+        removed.append(target)
+        return rmtree(target, *args, **kwargs)
+    
+    monkeypatch.setattr("src.utils.vector_store.shutil.rmtree", recording_rmtree)
+    smaller = VectorStore()
+    smaller.create_index(documents[:10])
+    smaller.save(path)
+    
+    # The old index was renamed aside, never deleted in place
+    assert path not in removed
+    assert os.listdir(tmp_path) == ["index"]
+    assert len(VectorStore.load(path).documents) == 10
+    # Readers of the old index keep their memory-mapped arrays
+    assert ranking(old.retrieve(QUERIES[0])) == ranking(store.retrieve(QUERIES[0]))
+
+def test_load_rejects_other_format_version(documents, tmp_path):
+    store = VectorStore()
+    store.create_index(documents)
+    path = str(tmp_path / "index")
+    store.save(path)
+    
+    header_path = os.path.join(path, INDEX_HEADER_FILE)
+    with open(header_path, encoding="utf-8") as f:
+        header = json.load(f)
+    header["format_version"] -= 1
+    with open(header_path, "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    
+    with pytest.raises(IndexVersionError):
+        VectorStore.load(path)
+
+def test_load_missing_index(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        VectorStore.load(str(tmp_path / "missing"))
+
+def fresh_store(documents):
+    store = VectorStore()
+    store.create_index(documents)
+    return store
+
+def test_add_documents_matches_fresh_build(documents):
+    store = fresh_store(documents[:50])
+    assert store.add_documents(documents[50:]) == [doc["metadata"]["chunk_id"] for doc in documents[50:]]
+    
+    expected = fresh_store(documents)
+    for query in QUERIES:
+        assert ranking(store.retrieve(query)) == ranking(expected.retrieve(query))
+
+def test_remove_documents_matches_fresh_build(documents):
+    source = documents[0]["metadata"]["source"]
+    remaining = [doc for doc in documents if doc["metadata"]["source"] != source]
+    store = VectorStore(compaction_threshold=1.0)
+    store.create_index(documents)
+    
+    assert store.remove_documents(source=source) == len(documents) - len(remaining)
+    assert store.num_active == len(remaining)
+    expected = fresh_store(remaining)
+    for query in QUERIES:
+        assert ranking(store.retrieve(query)) == ranking(expected.retrieve(query))
+    
+    # Compaction drops the rows and unused terms without changing results
+    store.compact()
+    assert len(store.documents) == len(remaining)
+    assert store.term_counts.shape[1] == expected.term_counts.shape[1]
+    for query in QUERIES:
+        assert ranking(store.retrieve(query)) == ranking(expected.retrieve(query))
+
+def test_remove_by_chunk_id_and_automatic_compaction(documents):
+    store = VectorStore(compaction_threshold=0.25)
+    store.create_index(documents)
+    
+    removed = [doc["metadata"]["chunk_id"] for doc in documents[:10]]
+    assert store.remove_documents(chunk_ids=removed) == 10
+    assert len(store.documents) == len(documents)
+    assert store.remove_documents(chunk_ids=removed) == 0
+    
+    # Crossing the threshold compacts; chunk ids survive, row positions do not
+    store.remove_documents(chunk_ids=[doc["metadata"]["chunk_id"] for doc in documents[10:30]])
+    assert len(store.documents) == len(documents) - 30
+    expected = fresh_store(documents[30:])
+    for query in QUERIES:
+        assert ranking(store.retrieve(query)) == ranking(expected.retrieve(query))
+
+def test_add_then_remove_round_trip(documents):
+    store = fresh_store(documents)
+    extra = [{"content": "Zyxwv quorble is a brand new product.", "metadata": {"source": "new.txt", "chunk_id": 0}}]
+    chunk_ids = store.add_documents(extra)
+    assert chunk_ids == [len(documents)]
+    assert store.retrieve("zyxwv quorble", top_k=1)[0]["metadata"]["source"] == "new.txt"
+    
+    store.remove_documents(source="new.txt")
+    expected = fresh_store(documents)
+    for query in QUERIES:
+        assert ranking(store.retrieve(query)) == ranking(expected.retrieve(query))
+
+def test_top_k_indices_matches_full_sort():
+    rng = np.random.default_rng(0)
+    # Few distinct values, so there are many ties
+    scores = rng.integers(0, 20, size=500).astype(np.float64)
+    scores[rng.choice(500, size=50, replace=False)] = -np.inf
+    
+    expected = sorted(np.flatnonzero(np.isfinite(scores)), key=lambda i: (-scores[i], i))
+    for top_k in (0, 1, 5, 100, 450, 1000):
+        assert _top_k_indices(scores, top_k).tolist() == expected[:top_k]
+
+def test_retrieve_matches_plain_cosine_ranking(documents):
+    # A gazetteer whose names never occur disables entity boosting
+    store = VectorStore(entity_gazetteer={"none": {"boost": 0.0, "names": ["Qqqq Zzzz"]}})
+    store.create_index(documents)
+    vectorizer = TfidfVectorizer()
+    embeddings = vectorizer.fit_transform([doc["content"] for doc in documents])
+    
+    for query in QUERIES:
+        similarities = cosine_similarity(vectorizer.transform([query]), embeddings)[0]
+        expected = sorted(range(len(documents)), key=lambda i: (-similarities[i], i))[:5]
+        results = store.retrieve(query)
+        assert [r["metadata"]["chunk_id"] for r in results] == [documents[i]["metadata"]["chunk_id"] for i in expected]
+        assert [r["score"] for r in results] == pytest.approx([similarities[i] for i in expected])
+
+def test_retrieve_many_matches_retrieve(documents):
+    store = VectorStore(retrieval_cache_size=0)
+    store.create_index(documents)
+    
+    batched = store.retrieve_many(QUERIES * 3, top_k=4, batch_size=4)
+    assert len(batched) == len(QUERIES) * 3
+    for query, results in zip(QUERIES * 3, batched):
+        assert ranking(results) == ranking(store.retrieve(query, top_k=4))
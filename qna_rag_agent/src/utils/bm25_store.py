@@ -0,0 +1,151 @@
+"""
+BM25 retrieval backend built on a compressed-column inverted index.
+"""
+import time
+import numpy as np
+from typing import List, Dict, Any
+from sklearn.feature_extraction.text import CountVectorizer
+from .chunk_store import ChunkStore
+from .entity_index import EntityIndex
+from .vector_store import _top_k_indices, _chunks_digest, _content_version
+from .tracing import tracer
+
+class BM25Store:
+    def __init__(self, k1: float = 1.5, b: float = 0.75, entity_gazetteer: Dict[str, Dict[str, Any]] = None):
+        """
+        Initialize the BM25 store.
+        
+        Args:
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+            entity_gazetteer: Product/company names used for score boosting
+                (default: ``DEFAULT_ENTITY_GAZETTEER``)
+        """
+        self.k1 = k1
+        self.b = b
+        # Same tokenization as the TF-IDF vector store
+        self.vectorizer = CountVectorizer()
+        self.entity_index = EntityIndex(entity_gazetteer)
+        self.documents = ChunkStore()
+        
+        # Postings of term t are postings_docs/postings_weights[offsets[t]:offsets[t + 1]]
+        self.postings_offsets = None
+        self.postings_docs = None
+        self.postings_weights = None
+        self.idf = None
+        self.index_version = None
+    
+    def create_index(self, documents: List[Dict[str, Any]]):
+        """
+        Build the inverted index for document chunks.
+        
+        The term-count matrix is converted to column-major (CSC) layout so that
+        each term's postings are a contiguous slice. The BM25 weight of every
+        posting is precomputed, which reduces query scoring to summing slices.
+        
+        Args:
+            documents: List of document chunks with content and metadata
+        """
+        start = time.perf_counter()
+        self.documents = ChunkStore.from_documents(documents)
+        texts = [doc["content"] for doc in documents]
+        
+        counts = self.vectorizer.fit_transform(texts).tocsc()
+        counts.sort_indices()
+        
+        num_docs = counts.shape[0]
+        doc_len = np.asarray(counts.sum(axis=1)).ravel().astype(np.float64)
+        avg_doc_len = doc_len.mean() if num_docs else 0.0
+        doc_freq = np.diff(counts.indptr)
+        
+        # Non-negative BM25 IDF variant
+        self.idf = np.log(1.0 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        
+        tf = counts.data.astype(np.float64)
+        docs = counts.indices
+        length_norm = self.k1 * (1.0 - self.b + self.b * doc_len / max(avg_doc_len, 1e-9))
+        term_of_posting = np.repeat(np.arange(counts.shape[1]), doc_freq)
+        weights = self.idf[term_of_posting] * tf * (self.k1 + 1.0) / (tf + length_norm[docs])
+        
+        self.postings_offsets = counts.indptr.astype(np.int64)
+        self.postings_docs = docs.astype(np.int32)
+        self.postings_weights = weights.astype(np.float32)
+        self.entity_index.build(texts)
+        self.index_version = _content_version(None, "bm25", self.k1, self.b, self.entity_index.gazetteer,
+                                              _chunks_digest(documents))
+        tracer.record("index_build", (time.perf_counter() - start) * 1000, backend="bm25", chunks=num_docs)
+        
+        print(f"Created BM25 index for {num_docs} document chunks")
+    
+    def retrieve(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Retrieve the most relevant document chunks for a query.
+        
+        Only chunks that appear in the postings of a query term (or of a
+        boosted entity) are scored. Scores are scaled so the best lexical
+        match is 1.0, which keeps the product/company boosts on the same
+        scale as in the TF-IDF vector store.
+        
+        Args:
+            query: The user's question
+            top_k: Number of chunks to retrieve
+            
+        Returns:
+            List of the most relevant document chunks
+        """
+        if self.postings_offsets is None:
+            raise ValueError("Index has not been created yet")
+        
+        # Repeat product/company mentions to boost their weight
+        boosted_query, entity_matches = self.entity_index.expand_query(query)
+        
+        # Query term frequencies over known terms
+        vocabulary = self.vectorizer.vocabulary_
+        query_terms = {}
+        for term in self.vectorizer.build_analyzer()(boosted_query):
+            term_id = vocabulary.get(term)
+            if term_id is not None:
+                query_terms[term_id] = query_terms.get(term_id, 0) + 1
+        
+        doc_slices = []
+        weight_slices = []
+        for term_id, query_tf in query_terms.items():
+            start, end = self.postings_offsets[term_id], self.postings_offsets[term_id + 1]
+            doc_slices.append(self.postings_docs[start:end])
+            weight_slices.append(self.postings_weights[start:end] * query_tf)
+        
+        entity_rows = [self.entity_index.postings[entity_id] for entity_id, _ in entity_matches]
+        if not doc_slices and not any(len(rows) for rows in entity_rows):
+            return []
+        
+        # Accumulate scores over the touched chunks only
+        candidate_docs = np.concatenate(doc_slices + entity_rows).astype(np.int64)
+        candidates, inverse = np.unique(candidate_docs, return_inverse=True)
+        num_postings = sum(len(docs) for docs in doc_slices)
+        
+        scores = np.zeros(len(candidates), dtype=np.float64)
+        if num_postings:
+            scores += np.bincount(
+                inverse[:num_postings],
+                weights=np.concatenate(weight_slices),
+                minlength=len(candidates)
+            )
+            best = scores.max()
+            if best > 0:
+                scores /= best
+        
+        # Boost chunks that mention the products or company in the query
+        if entity_rows:
+            boosts = np.concatenate([
+                np.full(len(rows), self.entity_index.entity_boosts[entity_id])
+                for rows, (entity_id, _) in zip(entity_rows, entity_matches)
+            ])
+            np.add.at(scores, inverse[num_postings:], boosts)
+        
+        results = []
+        for idx in _top_k_indices(scores, top_k):
+            doc = self.documents[candidates[idx]]
+            doc["score"] = float(scores[idx])
+            results.append(doc)
+        
+        return results
@@ -0,0 +1,284 @@
+"""
+In-memory LRU cache and a two-tier cache for generated answers.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Hashable
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for cache lookups: lowercase with collapsed whitespace.
+    
+    Args:
+        query: The user's question
+        
+    Returns:
+        The normalized query
+    """
+    return " ".join(query.lower().split())
+
+class LRUCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = None, ttl: float = None,
+                 sizeof: Callable[[Any], int] = sys.getsizeof):
+        """
+        Initialize a thread-safe LRU cache.
+        
+        Args:
+            max_entries: Maximum number of entries
+            max_bytes: Maximum total size of the values (default: unbounded)
+            ttl: Seconds after which an entry expires (default: never)
+            sizeof: Function estimating the size of a value in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a value and mark it as most recently used.
+        
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+            
+        Returns:
+            The cached value, or ``default``
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting least recently used entries beyond the limits.
+        
+        Values larger than ``max_bytes`` on their own are not stored.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        size = self.sizeof(value)
+        if self.max_entries <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+        
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def clear(self):
+        """
+        Drop all entries (the counters are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the size and hit/miss counters of the cache.
+        
+        Returns:
+            Dictionary of cache statistics
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _remove(self, key: Hashable):
+        """
+        Remove an entry; the caller holds the lock.
+        """
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+
+class AnswerCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = None,
+                 path: str = None, max_disk_entries: int = 100000):
+        """
+        Initialize the answer cache.
+        
+        Answers are keyed on a hash of the normalized query, the identities
+        of the context chunks, the model name and the index version. Lookups
+        try the in-memory LRU tier first and then the optional SQLite tier,
+        whose hits are promoted to memory. Answers of other index versions
+        are never hit, since the version is part of the key; they age out
+        of both tiers through the LRU limits and the TTL.
+        
+        Args:
+            max_entries: Maximum number of answers kept in memory
+            max_bytes: Maximum size of the answers kept in memory
+            ttl: Seconds after which an answer expires (default: never)
+            path: SQLite file for the on-disk tier (default: memory only)
+            max_disk_entries: Maximum number of answers kept on disk
+        """
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._lock = threading.Lock()
+        
+        self._db = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, index_version TEXT, answer TEXT, created REAL, accessed REAL)"
+            )
+            self._db.commit()
+    
+    def make_key(self, query: str, context_chunks: List[Dict[str, Any]], model_name: str, index_version: Any) -> str:
+        """
+        Hash the inputs an answer depends on.
+        
+        Indexed chunks are identified by source and chunk id (packed chunks by
+        all their chunk ids and their length, which tells truncated passages
+        apart); tool results (which are not in the index) by their content.
+        
+        Args:
+            query: The user's question
+            context_chunks: Context passed to the LLM
+            model_name: Name of the LLM model
+            index_version: Version of the index the chunks were retrieved from
+            
+        Returns:
+            Hex digest used as cache key
+        """
+        chunk_keys = []
+        for chunk in context_chunks:
+            metadata = chunk.get("metadata", {})
+            if metadata.get("source") in ("calculator_tool", "dictionary_tool"):
+                chunk_keys.append([metadata["source"], chunk["content"]])
+            elif "chunk_ids" in metadata:
+                chunk_keys.append([metadata.get("source"), metadata["chunk_ids"], len(chunk["content"])])
+            else:
+                chunk_keys.append([metadata.get("source"), metadata.get("chunk_id")])
+        payload = json.dumps(
+            [normalize_query(query), chunk_keys, model_name, str(index_version)],
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up an answer.
+        
+        Args:
+            key: Key from ``make_key``
+            
+        Returns:
+            The cached answer, or None
+        """
+        answer = self.memory.get(key)
+        if answer is not None or self._db is None:
+            return answer
+        
+        with self._lock:
+            row = self._db.execute("SELECT answer, created FROM answers WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and self.ttl is not None and row[1] + self.ttl < now:
+                self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.disk_misses += 1
+                return None
+            self._db.execute("UPDATE answers SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.disk_hits += 1
+        
+        self.memory.put(key, row[0])
+        return row[0]
+    
+    def put(self, key: str, index_version: Any, answer: str):
+        """
+        Store an answer in both tiers.
+        
+        Args:
+            key: Key from ``make_key``
+            index_version: Index version the answer was generated for
+            answer: Generated answer
+        """
+        self.memory.put(key, answer)
+        if self._db is None:
+            return
+        
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)",
+                (key, str(index_version), answer, now, now)
+            )
+            # Evict the least recently used answers beyond the disk limit
+            self._db.execute(
+                "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+            self._db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters of both tiers.
+        
+        Returns:
+            Dictionary of cache statistics
+        """
+        stats = {"memory": self.memory.stats()}
+        if self._db is not None:
+            with self._lock:
+                entries = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            stats["disk"] = {"entries": entries, "hits": self.disk_hits, "misses": self.disk_misses}
+        return stats
+    
+    def close(self):
+        """
+        Close the SQLite connection.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,277 @@
+"""
+Columnar storage for document chunks.
+"""
+import sys
+import threading
+import numpy as np
+from typing import List, Dict, Any, Iterable, Iterator
+
+class ChunkStore:
+    def __init__(self):
+        """
+        Initialize an empty chunk store.
+        
+        Chunk texts live in one contiguous UTF-8 buffer addressed by an
+        offsets array, sources are int codes into an interned table, and chunk
+        ids are an int array. Chunk dicts are only materialized on access,
+        e.g. for the top-k hits of a query. Only the ``source`` and
+        ``chunk_id`` metadata keys are kept.
+        """
+        self.data = np.zeros(0, dtype=np.uint8)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.source_codes = np.zeros(0, dtype=np.int32)
+        self.chunk_ids = np.zeros(0, dtype=np.int64)
+        self.sources = []
+        self._source_lookup = {}
+        
+        # Appends are buffered and consolidated into the arrays on first read;
+        # the lock keeps concurrent readers from consolidating the same rows
+        self._pending_bytes = []
+        self._pending_lengths = []
+        self._pending_codes = []
+        self._pending_ids = []
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_documents(cls, documents: Iterable[Dict[str, Any]]) -> "ChunkStore":
+        """
+        Build a chunk store from chunk dicts.
+        
+        Args:
+            documents: Document chunks with content and metadata
+            
+        Returns:
+            The chunk store
+        """
+        store = cls()
+        store.extend(documents)
+        return store
+    
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], sources: List[str]) -> "ChunkStore":
+        """
+        Restore a chunk store from arrays written by ``to_arrays``.
+        
+        The arrays are used as-is, so memory-mapped arrays stay mapped.
+        
+        Args:
+            arrays: Mapping from array name to array
+            sources: Interned source table
+            
+        Returns:
+            The chunk store
+        """
+        store = cls()
+        store.data = arrays["chunk_data"]
+        store.offsets = arrays["chunk_offsets"]
+        store.source_codes = arrays["chunk_source_codes"]
+        store.chunk_ids = arrays["chunk_ids"]
+        store.sources = list(sources)
+        store._source_lookup = {source: code for code, source in enumerate(store.sources)}
+        return store
+    
+    def extend(self, documents: Iterable[Dict[str, Any]]):
+        """
+        Append chunks.
+        
+        Args:
+            documents: Document chunks with content and metadata
+        """
+        with self._lock:
+            for doc in documents:
+                encoded = doc["content"].encode("utf-8")
+                source = doc["metadata"]["source"]
+                code = self._source_lookup.get(source)
+                if code is None:
+                    code = len(self.sources)
+                    self._source_lookup[source] = code
+                    self.sources.append(source)
+                self._pending_bytes.append(encoded)
+                self._pending_lengths.append(len(encoded))
+                self._pending_codes.append(code)
+                self._pending_ids.append(doc["metadata"]["chunk_id"])
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.source_codes) + len(self._pending_codes)
+    
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        """
+        Materialize one chunk as a fresh dict.
+        
+        Args:
+            row: Row position
+            
+        Returns:
+            Document chunk with content and metadata
+        """
+        self._consolidate()
+        if row < 0:
+            row += len(self)
+        return {
+            "content": self.content(row),
+            "metadata": {
+                "source": self.sources[self.source_codes[row]],
+                "chunk_id": int(self.chunk_ids[row])
+            }
+        }
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self)):
+            yield self[row]
+    
+    def content(self, row: int) -> str:
+        """
+        Decode the text of one chunk.
+        
+        Args:
+            row: Row position
+            
+        Returns:
+            The chunk text
+        """
+        self._consolidate()
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+    
+    def contents(self) -> List[str]:
+        """
+        Decode the texts of all chunks.
+        
+        Returns:
+            One text per row
+        """
+        self._consolidate()
+        return [self.content(row) for row in range(len(self))]
+    
+    def rows_for_source(self, source: str) -> np.ndarray:
+        """
+        Find the rows of all chunks from a source file.
+        
+        Args:
+            source: Source file name
+            
+        Returns:
+            Row positions
+        """
+        self._consolidate()
+        code = self._source_lookup.get(source)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.source_codes == code)
+    
+    def rows_for_chunk_ids(self, chunk_ids: Iterable[int]) -> np.ndarray:
+        """
+        Find the rows of the chunks with the given ids.
+        
+        Args:
+            chunk_ids: Chunk ids
+            
+        Returns:
+            Row positions
+        """
+        self._consolidate()
+        return np.flatnonzero(np.isin(self.chunk_ids, np.fromiter(chunk_ids, dtype=np.int64)))
+    
+    def take(self, rows: np.ndarray) -> "ChunkStore":
+        """
+        Copy a subset of the rows into a new chunk store.
+        
+        Args:
+            rows: Row positions to keep, in order
+            
+        Returns:
+            The new chunk store
+        """
+        self._consolidate()
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        
+        store = ChunkStore()
+        store.offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        store.offsets[1:] = np.cumsum(lengths)
+        # Copy each run of consecutive rows as one contiguous byte slice, so
+        # no per-byte index is built (compaction keeps long runs)
+        run_starts = np.flatnonzero(np.diff(rows, prepend=-2) != 1)
+        run_ends = np.append(run_starts[1:], len(rows))
+        store.data = np.concatenate([self.data[:0]] + [
+            self.data[self.offsets[rows[start]]:self.offsets[rows[end - 1] + 1]]
+            for start, end in zip(run_starts, run_ends)
+        ])
+        store.source_codes = self.source_codes[rows]
+        store.chunk_ids = self.chunk_ids[rows]
+        store.sources = list(self.sources)
+        store._source_lookup = dict(self._source_lookup)
+        return store
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Collect the arrays for persistence (the source table is stored separately).
+        
+        Returns:
+            Mapping from array name to array
+        """
+        self._consolidate()
+        return {
+            "chunk_data": self.data,
+            "chunk_offsets": self.offsets,
+            "chunk_source_codes": self.source_codes,
+            "chunk_ids": self.chunk_ids,
+        }
+    
+    def memory_bytes(self) -> int:
+        """
+        Approximate memory used by the store.
+        
+        Returns:
+            Size in bytes of the arrays and the source table
+        """
+        self._consolidate()
+        arrays = sum(array.nbytes for array in self.to_arrays().values())
+        return arrays + sum(sys.getsizeof(source) for source in self.sources)
+    
+    def _consolidate(self):
+        """
+        Move buffered appends into the arrays with one concatenation per column.
+        """
+        if not self._pending_codes:
+            return
+        
+        with self._lock:
+            # Another reader may have consolidated while this one waited
+            if not self._pending_codes:
+                return
+            
+            lengths = np.array(self._pending_lengths, dtype=np.int64)
+            self.data = np.concatenate([self.data, np.frombuffer(b"".join(self._pending_bytes), dtype=np.uint8)])
+            self.offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(lengths)])
+            self.source_codes = np.concatenate([self.source_codes, np.array(self._pending_codes, dtype=np.int32)])
+            self.chunk_ids = np.concatenate([self.chunk_ids, np.array(self._pending_ids, dtype=np.int64)])
+            
+            self._pending_bytes = []
+            self._pending_lengths = []
+            self._pending_codes = []
+            self._pending_ids = []
+
+
+def estimate_dict_storage_bytes(documents: List[Dict[str, Any]]) -> int:
+    """
+    Approximate memory used by chunks stored as a list of nested dicts.
+    
+    Shared objects (e.g. a source string referenced by many chunks) are
+    counted once.
+    
+    Args:
+        documents: Document chunks with content and metadata
+        
+    Returns:
+        Size in bytes of the list, the dicts and the objects they reference
+    """
+    seen = set()
+    total = sys.getsizeof(documents)
+    for doc in documents:
+        for obj in (doc, doc["content"], doc["metadata"], *doc["metadata"].values()):
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                total += sys.getsizeof(obj)
+    return total
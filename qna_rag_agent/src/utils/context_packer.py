@@ -0,0 +1,164 @@
+"""
+Context packing: merge overlapping chunks and fit them into a token budget.
+"""
+import re
+from typing import List, Dict, Any
+
+# Words and punctuation marks, the units of the token estimate
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Context entries produced by tools rather than retrieved from the index
+TOOL_SOURCES = ("calculator_tool", "dictionary_tool")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in a text without a tokenizer.
+    
+    Every word and punctuation mark counts as one token per started four
+    characters, which tracks BPE tokenizers closely on English prose.
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Estimated token count
+    """
+    return sum((len(piece) + 3) // 4 for piece in TOKEN_PATTERN.findall(text))
+
+def join_overlapping(left: str, right: str, probe_size: int = 16) -> str:
+    """
+    Join the texts of two consecutive chunks, keeping their overlap once.
+    
+    Chunks without a recognizable overlap are joined with a paragraph break.
+    
+    Args:
+        left: Text of the earlier chunk
+        right: Text of the later chunk
+        probe_size: Minimum overlap, in characters, that is recognized
+        
+    Returns:
+        The joined text
+    """
+    if right in left:
+        return left
+    
+    # The overlap is the longest suffix of left that is a prefix of right
+    probe = right[:probe_size]
+    position = left.find(probe)
+    while position != -1:
+        if right.startswith(left[position:]):
+            return left[:position] + right
+        position = left.find(probe, position + 1)
+    return left + "\n\n" + right
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text after the last word that fits into a token budget.
+    
+    Args:
+        text: Text to cut
+        max_tokens: Token budget
+        
+    Returns:
+        The cut text, ending in "..." if anything was removed
+    """
+    tokens = 0
+    end = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        tokens += (match.end() - match.start() + 3) // 4
+        if tokens > max_tokens:
+            return text[:end] + " ..."
+        end = match.end()
+    return text
+
+class ContextPacker:
+    def __init__(self, max_tokens: int = 2048, min_truncated_tokens: int = 64):
+        """
+        Initialize the context packer.
+        
+        Retrieved chunks of the same source with consecutive chunk ids are
+        merged into one passage with their ``chunk_overlap`` kept once,
+        repeated chunks are dropped, and the passages are added best-ranked
+        first until the token budget is reached. Tool results are always
+        kept and do not count against the budget.
+        
+        Args:
+            max_tokens: Token budget for the retrieved context
+            min_truncated_tokens: Smallest remainder of the budget worth
+                filling with a truncated passage
+        """
+        self.max_tokens = max_tokens
+        self.min_truncated_tokens = min_truncated_tokens
+    
+    def pack(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Pack context chunks.
+        
+        Merged passages keep the source, the first ``chunk_id``, every merged
+        id in ``chunk_ids`` and the best ``score`` of their chunks.
+        
+        Args:
+            chunks: Context chunks, best-ranked first
+            
+        Returns:
+            Packed chunks, best-ranked first, followed by the tool results
+        """
+        tool_chunks = [chunk for chunk in chunks if chunk.get("metadata", {}).get("source") in TOOL_SOURCES]
+        
+        # Drop chunks that are retrieved twice or repeat another chunk's text
+        seen_ids = set()
+        seen_contents = set()
+        documents = []
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            key = (metadata.get("source"), metadata.get("chunk_id"))
+            if metadata.get("source") in TOOL_SOURCES or key in seen_ids or chunk["content"] in seen_contents:
+                continue
+            seen_ids.add(key)
+            seen_contents.add(chunk["content"])
+            documents.append(chunk)
+        
+        # Group runs of consecutive chunk ids of the same source, ranked by their best chunk
+        order = sorted(
+            range(len(documents)),
+            key=lambda i: (str(documents[i]["metadata"]["source"]), documents[i]["metadata"]["chunk_id"])
+        )
+        runs = []
+        for i in order:
+            metadata = documents[i]["metadata"]
+            previous = runs[-1][-1] if runs else None
+            if (previous is not None
+                    and documents[previous]["metadata"]["source"] == metadata["source"]
+                    and documents[previous]["metadata"]["chunk_id"] + 1 == metadata["chunk_id"]):
+                runs[-1].append(i)
+            else:
+                runs.append([i])
+        runs.sort(key=min)
+        
+        packed = []
+        budget = self.max_tokens
+        for run in runs:
+            content = documents[run[0]]["content"]
+            for i in run[1:]:
+                content = join_overlapping(content, documents[i]["content"])
+            
+            tokens = estimate_tokens(content)
+            if tokens > budget:
+                if budget < self.min_truncated_tokens:
+                    continue
+                content = truncate_to_tokens(content, budget)
+                tokens = budget
+            budget -= tokens
+            
+            first = documents[run[0]]
+            packed.append({
+                "content": content,
+                "metadata": {
+                    "source": first["metadata"]["source"],
+                    "chunk_id": first["metadata"]["chunk_id"],
+                    "chunk_ids": [documents[i]["metadata"]["chunk_id"] for i in run]
+                },
+                "score": max(documents[i].get("score", 0.0) for i in run)
+            })
+        
+        return packed + tool_chunks
@@ -0,0 +1,208 @@
+"""
+Dense LSA embeddings with an inverted-file (IVF) approximate nearest-neighbour index.
+"""
+import numpy as np
+from typing import List, Dict, Any, Tuple
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+class IVFIndex:
+    def __init__(self, n_lists: int = None, nprobe: int = 8, random_state: int = 42):
+        """
+        Initialize an inverted-file index over L2-normalized vectors.
+        
+        Vectors are clustered with k-means; a query only scans the vectors
+        assigned to its ``nprobe`` closest centroids.
+        
+        Args:
+            n_lists: Number of k-means lists (default: about sqrt of the corpus size)
+            nprobe: Number of lists scanned per query
+            random_state: Seed for the k-means clustering
+        """
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.random_state = random_state
+        self.vectors = None
+        self.centroids = None
+        self.assignments = None
+        self.list_offsets = None
+        self.list_rows = None
+        self.list_vectors = None
+    
+    def build(self, vectors: np.ndarray):
+        """
+        Cluster the vectors and build the inverted lists.
+        
+        Args:
+            vectors: Float32 matrix with one L2-normalized row per document
+        """
+        num_vectors = len(vectors)
+        n_lists = self.n_lists or int(np.sqrt(num_vectors))
+        n_lists = max(1, min(n_lists, num_vectors))
+        
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_lists,
+            n_init=3,
+            batch_size=4096,
+            random_state=self.random_state
+        )
+        assignments = kmeans.fit_predict(vectors)
+        
+        self.vectors = vectors
+        self.centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+        self.assignments = assignments.astype(np.int32)
+        self._build_lists()
+    
+    def add(self, vectors: np.ndarray):
+        """
+        Append vectors, assigning each one to its closest existing centroid.
+        
+        Args:
+            vectors: Float32 matrix with one L2-normalized row per new document
+        """
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+        self.vectors = np.vstack([self.vectors, vectors])
+        self.assignments = np.concatenate([self.assignments, assignments])
+        self._build_lists()
+    
+    def search(self, queries: np.ndarray, nprobe: int = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find candidate rows and their inner-product scores for each query.
+        
+        Args:
+            queries: Float32 matrix with one L2-normalized row per query
+            nprobe: Number of lists scanned per query (default: ``self.nprobe``)
+            
+        Returns:
+            One (rows, scores) pair per query
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        
+        results = []
+        for query, lists in zip(queries, probes):
+            slices = [slice(self.list_offsets[l], self.list_offsets[l + 1]) for l in lists]
+            rows = np.concatenate([self.list_rows[s] for s in slices])
+            scores = np.concatenate([self.list_vectors[s] @ query for s in slices])
+            results.append((rows, scores))
+        return results
+    
+    def _build_lists(self):
+        """
+        Lay out the vectors contiguously by list for cache-friendly scans.
+        """
+        n_lists = len(self.centroids)
+        self.list_rows = np.argsort(self.assignments, kind="stable").astype(np.int64)
+        self.list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        self.list_offsets[1:] = np.cumsum(np.bincount(self.assignments, minlength=n_lists))
+        self.list_vectors = np.ascontiguousarray(self.vectors[self.list_rows])
+
+
+class LSAIndex:
+    def __init__(self, n_components: int = 256, n_lists: int = None, nprobe: int = 8, random_state: int = 42):
+        """
+        Initialize a dense LSA index over a TF-IDF matrix.
+        
+        Args:
+            n_components: Number of LSA dimensions
+            n_lists: Number of IVF lists (default: about sqrt of the corpus size)
+            nprobe: Number of IVF lists scanned per query
+            random_state: Seed for the SVD and k-means
+        """
+        self.n_components = n_components
+        self.random_state = random_state
+        self.components = None
+        self.ivf = IVFIndex(n_lists=n_lists, nprobe=nprobe, random_state=random_state)
+    
+    @property
+    def params(self) -> Dict[str, Any]:
+        """Constructor parameters, used to persist and rebuild the index."""
+        return {
+            "n_components": self.n_components,
+            "n_lists": self.ivf.n_lists,
+            "nprobe": self.ivf.nprobe,
+            "random_state": self.random_state,
+        }
+    
+    def fit(self, embeddings):
+        """
+        Project the TF-IDF matrix with truncated SVD and build the IVF index.
+        
+        Args:
+            embeddings: Sparse TF-IDF matrix with one row per document
+        """
+        num_docs, num_terms = embeddings.shape
+        n_components = max(1, min(self.n_components, num_terms - 1, num_docs - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=self.random_state)
+        svd.fit(embeddings)
+        
+        self.components = svd.components_.astype(np.float32)
+        self.ivf.build(self.project(embeddings))
+    
+    def project(self, embeddings) -> np.ndarray:
+        """
+        Map TF-IDF rows to L2-normalized float32 LSA vectors.
+        
+        Terms added to the vocabulary after ``fit`` have no LSA direction and
+        are ignored.
+        
+        Args:
+            embeddings: Sparse TF-IDF matrix
+            
+        Returns:
+            Dense matrix with one LSA vector per row
+        """
+        embeddings = embeddings[:, :self.components.shape[1]]
+        vectors = np.asarray(embeddings @ self.components.T, dtype=np.float32)
+        return normalize(vectors).astype(np.float32)
+    
+    def add(self, embeddings):
+        """
+        Project and append new TF-IDF rows.
+        
+        Args:
+            embeddings: Sparse TF-IDF matrix with one row per new document
+        """
+        self.ivf.add(self.project(embeddings))
+    
+    def search(self, query_embeddings, nprobe: int = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find approximate nearest neighbours for TF-IDF query rows.
+        
+        Args:
+            query_embeddings: Sparse TF-IDF matrix with one row per query
+            nprobe: Number of IVF lists scanned per query
+            
+        Returns:
+            One (rows, cosine scores) pair per query
+        """
+        return self.ivf.search(self.project(query_embeddings), nprobe=nprobe)
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Collect the arrays needed to restore the index without refitting.
+        
+        Returns:
+            Mapping from array name to array
+        """
+        return {
+            "dense_components": self.components,
+            "dense_vectors": self.ivf.vectors,
+            "dense_centroids": self.ivf.centroids,
+            "dense_assignments": self.ivf.assignments,
+        }
+    
+    def load_arrays(self, arrays: Dict[str, np.ndarray]):
+        """
+        Restore an index from arrays written by ``to_arrays``.
+        
+        Args:
+            arrays: Mapping from array name to array
+        """
+        self.components = arrays["dense_components"]
+        self.ivf.vectors = arrays["dense_vectors"]
+        self.ivf.centroids = arrays["dense_centroids"]
+        self.ivf.assignments = arrays["dense_assignments"]
+        self.ivf._build_lists()
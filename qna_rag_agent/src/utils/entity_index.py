@@ -0,0 +1,198 @@
+"""
+Entity index for boosting chunks that mention products or the company.
+"""
+import json
+import re
+import numpy as np
+from typing import List, Dict, Any, Tuple
+
+# Entity types in query-expansion order. Each type has a fixed score boost and
+# the names that belong to it; longer names of a type win over shorter ones
+# ("RAGent AI" over "RAGent").
+DEFAULT_ENTITY_GAZETTEER = {
+    "product": {
+        "boost": 0.2,
+        "names": ["RAGent Search", "RAGent Assistant", "RAGent Analytics", "RAGent Connect"]
+    },
+    "company": {
+        "boost": 0.3,
+        "names": ["RAGent AI", "RAGent"]
+    }
+}
+
+
+def load_entity_gazetteer(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load an entity gazetteer from a JSON file.
+    
+    The file uses the same shape as ``DEFAULT_ENTITY_GAZETTEER``: a mapping
+    from entity type to ``{"boost": float, "names": [str, ...]}``.
+    
+    Args:
+        path: Path to the JSON file
+        
+    Returns:
+        The gazetteer
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        gazetteer = json.load(f)
+    
+    for entity_type, spec in gazetteer.items():
+        if not isinstance(spec.get("names"), list) or "boost" not in spec:
+            raise ValueError(f"Entity type '{entity_type}' needs a 'boost' and a list of 'names'")
+    
+    return gazetteer
+
+
+def _name_pattern(name: str) -> str:
+    """Regex for an entity name that tolerates any whitespace between words."""
+    return r"\s*".join(re.escape(token) for token in name.split())
+
+
+def _name_key(text: str) -> str:
+    """Canonical lookup key for an entity mention."""
+    return re.sub(r"\s+", "", text).lower()
+
+
+class EntityIndex:
+    def __init__(self, gazetteer: Dict[str, Dict[str, Any]] = None):
+        """
+        Initialize the entity index and compile its patterns.
+        
+        Args:
+            gazetteer: Entity types with their boosts and names
+                (default: ``DEFAULT_ENTITY_GAZETTEER``)
+        """
+        self.gazetteer = gazetteer or DEFAULT_ENTITY_GAZETTEER
+        self.entity_names = []
+        boosts = []
+        self._entity_by_key = {}
+        self._query_patterns = []
+        self._doc_patterns = []
+        
+        for spec in self.gazetteer.values():
+            names = sorted(spec["names"], key=len, reverse=True)
+            for name in names:
+                self._entity_by_key[_name_key(name)] = len(self.entity_names)
+                self.entity_names.append(name)
+                boosts.append(float(spec["boost"]))
+                # Document-side matching is a case-insensitive substring test
+                self._doc_patterns.append(re.compile(_name_pattern(name), re.IGNORECASE))
+            alternation = "|".join(_name_pattern(name) for name in names)
+            self._query_patterns.append(re.compile(rf"\b({alternation})\b", re.IGNORECASE))
+        
+        self.entity_boosts = np.array(boosts, dtype=np.float64)
+        self.postings = [np.zeros(0, dtype=np.int64) for _ in self.entity_names]
+    
+    def build(self, texts: List[str]):
+        """
+        Build the posting lists (entity -> chunk rows) for a list of texts.
+        
+        Args:
+            texts: Chunk contents, one per row
+        """
+        self.postings = [np.zeros(0, dtype=np.int64) for _ in self.entity_names]
+        self.add(texts, first_row=0)
+    
+    def add(self, texts: List[str], first_row: int):
+        """
+        Append rows to the posting lists.
+        
+        Args:
+            texts: Contents of the new chunks
+            first_row: Row position of the first new chunk
+        """
+        for entity_id, pattern in enumerate(self._doc_patterns):
+            rows = [first_row + i for i, text in enumerate(texts) if pattern.search(text)]
+            if rows:
+                self.postings[entity_id] = np.concatenate([
+                    self.postings[entity_id], np.array(rows, dtype=np.int64)
+                ])
+    
+    def take(self, keep_rows: np.ndarray, num_rows: int):
+        """
+        Renumber the posting lists after rows have been dropped.
+        
+        Args:
+            keep_rows: Old row positions that survive, in order
+            num_rows: Number of rows before the drop
+        """
+        row_map = np.full(num_rows, -1, dtype=np.int64)
+        row_map[keep_rows] = np.arange(len(keep_rows))
+        for entity_id, rows in enumerate(self.postings):
+            rows = row_map[rows]
+            self.postings[entity_id] = rows[rows >= 0]
+    
+    def match(self, query: str) -> List[Tuple[int, str]]:
+        """
+        Find entity mentions in a query.
+        
+        Args:
+            query: The user's question
+            
+        Returns:
+            List of (entity id, matched text), grouped by entity type
+        """
+        matches = []
+        for pattern in self._query_patterns:
+            for mention in pattern.findall(query):
+                matches.append((self._entity_by_key[_name_key(mention)], mention))
+        return matches
+    
+    def expand_query(self, query: str) -> Tuple[str, List[Tuple[int, str]]]:
+        """
+        Repeat entity mentions in the query to boost their TF-IDF weight.
+        
+        Args:
+            query: The user's question
+            
+        Returns:
+            Tuple of (boosted query, entity matches)
+        """
+        matches = self.match(query)
+        
+        # Add each mention twice to boost its weight
+        boosted_query = query + "".join(f" {mention} {mention}" for _, mention in matches)
+        return boosted_query, matches
+    
+    def apply_boosts(self, scores: np.ndarray, matches: List[Tuple[int, str]]):
+        """
+        Add the entity boosts to the scores of chunks mentioning them.
+        
+        All boosts are applied with a single ``np.add.at`` so repeated
+        mentions accumulate exactly like repeated additions.
+        
+        Args:
+            scores: Score per chunk row (updated in place)
+            matches: Entity matches returned by ``match``
+        """
+        if not matches:
+            return
+        
+        rows = [self.postings[entity_id] for entity_id, _ in matches]
+        boosts = [np.full(len(r), self.entity_boosts[entity_id]) for r, (entity_id, _) in zip(rows, matches)]
+        np.add.at(scores, np.concatenate(rows), np.concatenate(boosts))
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Flatten the posting lists into two arrays for persistence.
+        
+        Returns:
+            ``entity_rows`` (all postings back to back) and ``entity_offsets``
+        """
+        offsets = np.zeros(len(self.postings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(rows) for rows in self.postings])
+        rows = np.concatenate(self.postings) if self.postings else np.zeros(0, dtype=np.int64)
+        return {"entity_rows": rows.astype(np.int64), "entity_offsets": offsets}
+    
+    def load_arrays(self, rows: np.ndarray, offsets: np.ndarray):
+        """
+        Restore posting lists flattened by ``to_arrays``.
+        
+        Args:
+            rows: All postings back to back
+            offsets: Start of each entity's postings, plus the total length
+        """
+        if len(offsets) != len(self.entity_names) + 1:
+            raise ValueError("Entity postings do not match the gazetteer")
+        self.postings = [rows[offsets[i]:offsets[i + 1]] for i in range(len(self.entity_names))]
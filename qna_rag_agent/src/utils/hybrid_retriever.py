@@ -0,0 +1,124 @@
+"""
+Hybrid retriever that fuses several scorers with reciprocal rank fusion.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable
+
+class HybridRetriever:
+    def __init__(self, legs: Dict[str, Callable[..., List[Dict[str, Any]]]],
+                 rrf_k: int = 60, candidate_k: int = 20):
+        """
+        Initialize the hybrid retriever.
+        
+        Each leg is a retrieve function taking ``(query, top_k)`` and returning
+        chunks ranked best first, e.g. ``VectorStore.retrieve`` for the lexical
+        TF-IDF path and ``BM25Store.retrieve`` or
+        ``functools.partial(vector_store.retrieve, dense=True)`` as a second
+        scorer. The product/company boosts are applied by every leg before
+        fusion, so boosted chunks rise in each ranking.
+        
+        Args:
+            legs: Mapping from leg name to retrieve function
+            rrf_k: Reciprocal rank fusion constant
+            candidate_k: Number of chunks requested from each leg
+        """
+        if not legs:
+            raise ValueError("At least one retrieval leg is required")
+        
+        self.legs = legs
+        self.rrf_k = rrf_k
+        self.candidate_k = candidate_k
+        self.executor = ThreadPoolExecutor(max_workers=len(legs), thread_name_prefix="hybrid-leg")
+        
+        # Latest and cumulative per-leg latencies in milliseconds
+        self.last_latencies = {}
+        self.latency_totals = {name: 0.0 for name in legs}
+        self.num_queries = 0
+    
+    def retrieve(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Retrieve the most relevant document chunks for a query.
+        
+        All legs run concurrently in the thread pool; their rankings are
+        merged with reciprocal rank fusion, so the ``score`` of each result
+        is its fused RRF score.
+        
+        Args:
+            query: The user's question
+            top_k: Number of chunks to retrieve
+            
+        Returns:
+            List of the most relevant document chunks
+        """
+        futures = {
+            name: self.executor.submit(self._run_leg, retrieve, query)
+            for name, retrieve in self.legs.items()
+        }
+        rankings = {}
+        latencies = {}
+        for name, future in futures.items():
+            rankings[name], latencies[name] = future.result()
+        
+        start = time.perf_counter()
+        fused = {}
+        for ranking in rankings.values():
+            for rank, chunk in enumerate(ranking, start=1):
+                key = (chunk["metadata"]["source"], chunk["metadata"]["chunk_id"])
+                if key not in fused:
+                    fused[key] = {"content": chunk["content"], "metadata": chunk["metadata"], "score": 0.0}
+                fused[key]["score"] += 1.0 / (self.rrf_k + rank)
+        
+        results = sorted(fused.values(), key=lambda chunk: chunk["score"], reverse=True)[:top_k]
+        latencies["fusion"] = (time.perf_counter() - start) * 1000
+        
+        self._record_latencies(latencies)
+        return results
+    
+    @property
+    def index_version(self) -> str:
+        """Combined index version of the stores behind the legs."""
+        versions = []
+        for name, retrieve in self.legs.items():
+            # Unwrap functools.partial and bound methods to reach the store
+            store = getattr(getattr(retrieve, "func", retrieve), "__self__", None)
+            versions.append(f"{name}:{getattr(store, 'index_version', None)}")
+        return "|".join(versions)
+    
+    def latency_stats(self) -> Dict[str, float]:
+        """
+        Get the mean latency of each leg (and of fusion) so far.
+        
+        Returns:
+            Mapping from leg name to mean milliseconds per query
+        """
+        return {
+            name: total / self.num_queries if self.num_queries else 0.0
+            for name, total in self.latency_totals.items()
+        }
+    
+    def close(self):
+        """
+        Shut down the thread pool.
+        """
+        self.executor.shutdown(wait=True)
+    
+    def _run_leg(self, retrieve: Callable[..., List[Dict[str, Any]]], query: str):
+        """
+        Run one leg and time it.
+        
+        Returns:
+            Tuple of (ranked chunks, milliseconds)
+        """
+        start = time.perf_counter()
+        ranking = retrieve(query, top_k=self.candidate_k)
+        return ranking, (time.perf_counter() - start) * 1000
+    
+    def _record_latencies(self, latencies: Dict[str, float]):
+        """
+        Store the latest latencies and add them to the running totals.
+        """
+        self.last_latencies = latencies
+        self.num_queries += 1
+        for name, ms in latencies.items():
+            self.latency_totals[name] = self.latency_totals.get(name, 0.0) + ms
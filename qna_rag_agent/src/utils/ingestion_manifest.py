@@ -0,0 +1,148 @@
+"""
+Ingestion manifest for incremental re-indexing of changed files.
+"""
+import hashlib
+import os
+from typing import List, Dict, Any, Optional, Tuple
+from .document_loader import DocumentLoader
+from .vector_store import VectorStore
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Hash a file's contents in bounded blocks.
+    
+    Args:
+        path: File to hash
+        block_size: Number of bytes read at once
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class IngestionManifest:
+    def __init__(self, chunk_size: int, chunk_overlap: int, files: Dict[str, Dict[str, Any]] = None):
+        """
+        Initialize an ingestion manifest.
+        
+        Args:
+            chunk_size: Chunk size the files were split with
+            chunk_overlap: Chunk overlap the files were split with
+            files: Mapping from path relative to the data directory to its
+                ``size``, ``mtime_ns`` and ``sha256``
+        """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.files = files or {}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IngestionManifest":
+        """
+        Restore a manifest written by ``to_dict``.
+        """
+        return cls(data["chunk_size"], data["chunk_overlap"], data["files"])
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the manifest to a JSON-serializable dict.
+        """
+        return {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "files": self.files,
+        }
+    
+    def scan(self, data_dir: str, sources: List[str]) -> Tuple["IngestionManifest", List[str], List[str]]:
+        """
+        Compare the files on disk with the manifest.
+        
+        Files whose size and modification time are unchanged are trusted
+        without reading them; the others are hashed, so a touched but
+        unmodified file is not re-ingested.
+        
+        Args:
+            data_dir: Directory containing the files
+            sources: Paths relative to ``data_dir`` currently on disk
+            
+        Returns:
+            Tuple of (manifest of the files on disk, new or changed paths,
+            deleted paths)
+        """
+        files = {}
+        changed = []
+        for source in sources:
+            stat = os.stat(os.path.join(data_dir, source))
+            entry = self.files.get(source)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                files[source] = entry
+                continue
+            
+            sha256 = file_sha256(os.path.join(data_dir, source))
+            files[source] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+            if not entry or entry["sha256"] != sha256:
+                changed.append(source)
+        
+        deleted = [source for source in self.files if source not in files]
+        return IngestionManifest(self.chunk_size, self.chunk_overlap, files), changed, deleted
+
+
+def sync_index(vector_store: Optional[VectorStore], document_loader: DocumentLoader, data_dir: str,
+               entity_gazetteer: Dict[str, Dict[str, Any]] = None,
+               max_workers: int = None) -> Tuple[VectorStore, bool]:
+    """
+    Bring a TF-IDF index up to date with the files in a directory.
+    
+    Only new and changed files are re-split; chunks of changed and deleted
+    files are removed, and chunks of unchanged files keep their ``chunk_id``.
+    The index is built from scratch when there is none, when it has no
+    manifest, or when the chunking parameters changed (file hashes are
+    reused in that case, so files are not hashed again).
+    
+    Args:
+        vector_store: Loaded index, or None to build one
+        document_loader: Loader with the desired chunking parameters
+        data_dir: Directory containing text files
+        entity_gazetteer: Product/company names used for score boosting
+        max_workers: Chunking processes (default: number of CPUs)
+        
+    Returns:
+        Tuple of (up-to-date vector store, whether it changed and should be saved)
+    """
+    sources = document_loader.list_files(data_dir)
+    
+    previous = IngestionManifest(document_loader.chunk_size, document_loader.chunk_overlap)
+    if vector_store is not None and vector_store.manifest:
+        previous = IngestionManifest.from_dict(vector_store.manifest)
+    rebuild = (
+        vector_store is None
+        or not vector_store.manifest
+        or previous.chunk_size != document_loader.chunk_size
+        or previous.chunk_overlap != document_loader.chunk_overlap
+    )
+    manifest, changed, deleted = previous.scan(data_dir, sources)
+    manifest.chunk_size = document_loader.chunk_size
+    manifest.chunk_overlap = document_loader.chunk_overlap
+    
+    if rebuild:
+        print(f"Indexing {len(sources)} files from {data_dir}...")
+        vector_store = VectorStore(entity_gazetteer=entity_gazetteer)
+        changed = sources
+    elif not changed and not deleted:
+        print("Index is up to date with the data directory")
+        return vector_store, False
+    else:
+        print(f"Re-ingesting {len(changed)} new or changed files, removing {len(deleted)} deleted files...")
+        for source in changed + deleted:
+            vector_store.remove_documents(source=source)
+    
+    # Feed the batches straight into the index without keeping them all
+    if changed:
+        for batch in document_loader.stream_documents(data_dir, max_workers=max_workers, sources=changed):
+            vector_store.add_documents(batch)
+    
+    vector_store.manifest = manifest.to_dict()
+    return vector_store, True
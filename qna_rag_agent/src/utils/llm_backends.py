@@ -0,0 +1,296 @@
+"""
+Chat model backends behind the LLM service: Groq and a local simulation for load tests.
+"""
+import asyncio
+import contextlib
+import math
+import random
+import threading
+import time
+from typing import List, Dict, Any, Iterator
+import groq
+from langchain_groq import ChatGroq
+
+class BackendError(RuntimeError):
+    """Error returned by an LLM backend, with the HTTP status code if known (None for network errors and timeouts)."""
+    
+    def __init__(self, message: str, status_code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class LLMBackend:
+    """Interface of the chat models used by LLMService."""
+    
+    model_name = None
+    
+    def generate(self, messages: List[Any], timeout: float = None) -> str:
+        """
+        Generate the answer to a conversation.
+        
+        Failures to reach the model and errors it returns are raised as
+        ``BackendError``.
+        
+        Args:
+            messages: System and user messages
+            timeout: Seconds after which the call fails (default: no limit)
+            
+        Returns:
+            Generated answer
+        """
+        raise NotImplementedError
+    
+    async def agenerate(self, messages: List[Any], timeout: float = None) -> str:
+        """
+        Generate the answer without blocking the event loop.
+        
+        By default ``generate`` runs in the loop's default executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.generate, messages, timeout)
+    
+    def stream(self, messages: List[Any], timeout: float = None) -> Iterator[str]:
+        """
+        Generate the answer and yield it piece by piece.
+        
+        By default the whole answer is yielded at once.
+        """
+        yield self.generate(messages, timeout)
+
+class GroqBackend(LLMBackend):
+    def __init__(self, api_key: str, model_name: str = "llama3-8b-8192", temperature: float = 0.2,
+                 max_retries: int = 2):
+        """
+        Initialize the Groq backend.
+        
+        Args:
+            api_key: Groq API key
+            model_name: Name of the LLM model to use
+            temperature: Sampling temperature
+            max_retries: Retries of the Groq client itself (0 when an
+                ``LLMScheduler`` retries instead)
+        """
+        self.model_name = model_name
+        self.llm = ChatGroq(
+            groq_api_key=api_key,
+            model_name=model_name,
+            temperature=temperature,
+            max_retries=max_retries
+        )
+    
+    def generate(self, messages: List[Any], timeout: float = None) -> str:
+        with _groq_errors():
+            return self.llm.invoke(messages, **_timeout(timeout)).content
+    
+    async def agenerate(self, messages: List[Any], timeout: float = None) -> str:
+        with _groq_errors():
+            return (await self.llm.ainvoke(messages, **_timeout(timeout))).content
+    
+    def stream(self, messages: List[Any], timeout: float = None) -> Iterator[str]:
+        with _groq_errors():
+            for chunk in self.llm.stream(messages, **_timeout(timeout)):
+                if chunk.content:
+                    yield chunk.content
+
+def _timeout(timeout: float) -> Dict[str, float]:
+    """
+    Keyword arguments passing a per-request timeout to the Groq client, if any.
+    """
+    return {} if timeout is None else {"timeout": timeout}
+
+@contextlib.contextmanager
+def _groq_errors():
+    """
+    Translate Groq client errors into ``BackendError``.
+    """
+    try:
+        yield
+    except groq.APIStatusError as e:
+        try:
+            retry_after = float(e.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+        raise BackendError(str(e), status_code=e.status_code, retry_after=retry_after) from e
+    except groq.APIConnectionError as e:
+        raise BackendError(str(e)) from e
+
+class SimulatedBackend(LLMBackend):
+    def __init__(self, latency_ms: float = 300.0, latency_distribution: str = "lognormal",
+                 latency_sigma: float = 0.5, tokens_per_second: float = 100.0, answer_words: int = 40,
+                 error_rate: float = 0.0, error_status: int = 503, requests_per_minute: float = None,
+                 burst: float = None, max_concurrency: int = None, seed: int = 0,
+                 model_name: str = "simulated"):
+        """
+        Initialize a local stand-in for a hosted model.
+        
+        The answer repeats the question and the first words of the context,
+        so it only depends on the prompt. Each call waits for a time to first
+        token drawn from the latency distribution, then generates one word
+        per token at ``tokens_per_second``; a fraction of the calls fails
+        with a ``BackendError`` after the first-token wait, and calls running
+        past their ``timeout`` fail when it expires. Latencies and errors are
+        drawn from a generator seeded with ``seed``.
+        
+        Like a hosted API, the backend can throttle: calls beyond
+        ``requests_per_minute`` (with bursts of up to ``burst`` calls) or
+        beyond ``max_concurrency`` running calls fail at once with a 429
+        ``BackendError`` whose ``retry_after`` says when capacity frees up.
+        
+        Args:
+            latency_ms: Time to first token: the median for ``lognormal``, the
+                mean for ``exponential`` and the exact value for ``constant``
+            latency_distribution: ``constant``, ``lognormal`` or ``exponential``
+            latency_sigma: Standard deviation of the log latency for ``lognormal``
+            tokens_per_second: Generation speed (0 generates instantly)
+            answer_words: Number of context words in the answer
+            error_rate: Fraction of calls that fail
+            error_status: HTTP status code of the injected errors
+            requests_per_minute: Rate limit (default: none)
+            burst: Calls allowed at once under the rate limit (default: one
+                second's worth, at least 1)
+            max_concurrency: Limit on running calls (default: none)
+            seed: Random seed of the latencies and errors
+            model_name: Name reported as the model (part of answer cache keys)
+        """
+        if latency_distribution not in ("constant", "lognormal", "exponential"):
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+        
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.answer_words = answer_words
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.model_name = model_name
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst if burst is not None else max(1.0, (requests_per_minute or 0) / 60)
+        self.max_concurrency = max_concurrency
+        self._allowance = self.burst
+        self._allowance_updated = time.monotonic()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts = {"calls": 0, "errors": 0, "throttled": 0, "in_flight": 0, "max_in_flight": 0}
+    
+    def generate(self, messages: List[Any], timeout: float = None) -> str:
+        answer, first_token_s, failed = self._begin(messages)
+        try:
+            seconds = first_token_s if failed else first_token_s + self._generation_s(answer)
+            seconds, error = self._outcome(seconds, failed, timeout)
+            time.sleep(seconds)
+            if error is not None:
+                raise error
+            return answer
+        finally:
+            self._end()
+    
+    async def agenerate(self, messages: List[Any], timeout: float = None) -> str:
+        answer, first_token_s, failed = self._begin(messages)
+        try:
+            seconds = first_token_s if failed else first_token_s + self._generation_s(answer)
+            seconds, error = self._outcome(seconds, failed, timeout)
+            await asyncio.sleep(seconds)
+            if error is not None:
+                raise error
+            return answer
+        finally:
+            self._end()
+    
+    def stream(self, messages: List[Any], timeout: float = None) -> Iterator[str]:
+        answer, first_token_s, failed = self._begin(messages)
+        try:
+            # The timeout applies to the first token
+            seconds, error = self._outcome(first_token_s, failed, timeout)
+            time.sleep(seconds)
+            if error is not None:
+                raise error
+            for i, word in enumerate(answer.split(" ")):
+                if i > 0 and self.tokens_per_second > 0:
+                    time.sleep(1 / self.tokens_per_second)
+                yield word if i == 0 else " " + word
+        finally:
+            self._end()
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Report the number of calls, injected errors, throttled calls and the peak number of concurrent calls.
+        """
+        with self._lock:
+            return {key: value for key, value in self._counts.items() if key != "in_flight"}
+    
+    def _begin(self, messages: List[Any]) -> tuple:
+        """
+        Count a call and draw its time to first token and whether it fails.
+        
+        A throttled call raises a ``BackendError`` with status 429 instead.
+        """
+        with self._lock:
+            self._counts["calls"] += 1
+            retry_after = self._throttle()
+            if retry_after is not None:
+                self._counts["throttled"] += 1
+                raise BackendError("Simulated rate limit exceeded", status_code=429, retry_after=retry_after)
+            self._counts["in_flight"] += 1
+            self._counts["max_in_flight"] = max(self._counts["max_in_flight"], self._counts["in_flight"])
+            if self.latency_distribution == "lognormal":
+                first_token_ms = self.latency_ms * math.exp(self._random.gauss(0.0, self.latency_sigma))
+            elif self.latency_distribution == "exponential":
+                first_token_ms = self._random.expovariate(1 / self.latency_ms) if self.latency_ms > 0 else 0.0
+            else:
+                first_token_ms = self.latency_ms
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self._counts["errors"] += 1
+        return self._answer(messages), first_token_ms / 1000, failed
+    
+    def _end(self):
+        with self._lock:
+            self._counts["in_flight"] -= 1
+    
+    def _throttle(self) -> float:
+        """
+        Admit a call under the limits (called with the lock held).
+        
+        Returns:
+            None if the call is admitted, else seconds until it could be
+        """
+        if self.max_concurrency is not None and self._counts["in_flight"] >= self.max_concurrency:
+            return 0.0
+        if self.requests_per_minute is None:
+            return None
+        
+        rate = self.requests_per_minute / 60
+        now = time.monotonic()
+        self._allowance = min(self.burst, self._allowance + (now - self._allowance_updated) * rate)
+        self._allowance_updated = now
+        if self._allowance < 1:
+            return (1 - self._allowance) / rate
+        self._allowance -= 1
+        return None
+    
+    def _outcome(self, seconds: float, failed: bool, timeout: float) -> tuple:
+        """
+        Decide how long a call takes and the error it ends with, if any.
+        """
+        if timeout is not None and seconds > timeout:
+            return max(timeout, 0.0), BackendError(f"Simulated timeout after {timeout:.3f}s")
+        if failed:
+            return seconds, BackendError(f"Simulated error {self.error_status}", status_code=self.error_status)
+        return seconds, None
+    
+    def _generation_s(self, answer: str) -> float:
+        """
+        Seconds needed to generate the tokens after the first one.
+        """
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return (len(answer.split(" ")) - 1) / self.tokens_per_second
+    
+    def _answer(self, messages: List[Any]) -> str:
+        """
+        Build the answer from the question and the context of the user message.
+        """
+        content = messages[-1].content
+        question = content.rsplit("Question:", 1)[-1].split("\n", 1)[0].strip()
+        context = content.split("Question:", 1)[0].split()[:self.answer_words]
+        return f"{question} {' '.join(context)}".strip()
@@ -0,0 +1,406 @@
+"""
+Request scheduling for LLM calls: rate limits, retries with backoff, deadlines and adaptive concurrency.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import List, Dict, Any, Iterator, Optional
+from .context_packer import estimate_tokens
+from .llm_backends import LLMBackend, BackendError
+from .tracing import tracer
+
+class DeadlineExceeded(BackendError):
+    """Raised when a request cannot be answered before its deadline."""
+
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: float = None):
+        """
+        Initialize a token bucket refilled continuously at ``per_minute``.
+        
+        Tokens are reserved on request even when the bucket runs into debt;
+        the caller then waits until the debt is paid off, so waiting callers
+        are served in arrival order.
+        
+        Args:
+            per_minute: Tokens added per minute
+            capacity: Maximum number of tokens (default: one minute's worth)
+        """
+        self.rate = per_minute / 60
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, amount: float, max_wait: float = None) -> Optional[float]:
+        """
+        Take tokens, possibly ahead of time.
+        
+        Args:
+            amount: Number of tokens
+            max_wait: Longest acceptable wait in seconds (default: no limit)
+            
+        Returns:
+            Seconds to wait before the tokens may be used, or None (and
+            nothing taken) if that is longer than ``max_wait``
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (amount - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens -= amount
+            return wait
+    
+    def refund(self, amount: float):
+        """
+        Return tokens that were reserved but not used.
+        """
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class AdaptiveConcurrencyLimit:
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32, backoff: float = 0.5):
+        """
+        Initialize an AIMD (additive increase, multiplicative decrease) limit on concurrent requests.
+        
+        Every successful request raises the limit by ``1 / limit``, i.e. by
+        about one per round of requests at the limit; an overloaded request
+        (throttled, failed with 5xx or timed out) multiplies it by
+        ``backoff``. Only requests started after the last decrease can
+        decrease it again, so a burst of failures caused by the same
+        overload counts once.
+        
+        Args:
+            initial: Starting limit
+            minimum: Lowest limit
+            maximum: Highest limit
+            backoff: Factor applied to the limit on overload
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        # Futures of waiting asyncio tasks, with their event loops
+        self._async_waiters = []
+    
+    def acquire(self, timeout: float = None) -> Optional[float]:
+        """
+        Wait for a free slot.
+        
+        Args:
+            timeout: Longest wait in seconds (default: no limit)
+            
+        Returns:
+            Start time of the request (pass it to ``release``), or None if
+            no slot became free in time
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return None
+            self.in_flight += 1
+            return time.monotonic()
+    
+    async def aacquire(self, timeout: float = None) -> Optional[float]:
+        """
+        Wait for a free slot without blocking the event loop (see ``acquire``).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return time.monotonic()
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                with self._condition:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+                return None
+    
+    def release(self, start: float, outcome: str):
+        """
+        Free a slot and adapt the limit.
+        
+        Args:
+            start: Start time returned by ``acquire``
+            outcome: ``success``, ``overload`` or ``error`` (other failures,
+                which leave the limit unchanged)
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == "success":
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == "overload" and start >= self._last_decrease:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self._last_decrease = time.monotonic()
+            
+            free = int(self.limit) - self.in_flight
+            self._condition.notify(max(free, 0))
+            while free > 0 and self._async_waiters:
+                loop, waiter = self._async_waiters.pop(0)
+                loop.call_soon_threadsafe(_wake, waiter)
+                free -= 1
+
+def _wake(waiter: asyncio.Future):
+    """
+    Wake a waiting task unless it already gave up.
+    """
+    if not waiter.done():
+        waiter.set_result(None)
+
+class LLMScheduler(LLMBackend):
+    def __init__(self, backend: LLMBackend, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 request_burst: float = None, max_answer_tokens: int = 512, deadline: float = 60.0, max_retries: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 8.0, initial_concurrency: int = 4,
+                 max_concurrency: int = 32, seed: int = None):
+        """
+        Initialize a scheduler in front of an LLM backend.
+        
+        The scheduler is itself a backend, so it can be passed to
+        ``LLMService`` in place of the one it wraps. Each request first
+        reserves capacity from the request and token buckets (prompt tokens
+        are estimated locally, plus ``max_answer_tokens``, refunded down to
+        the actual answer afterwards), then waits for a slot under the
+        adaptive concurrency limit. Throttled (429), 5xx and network errors
+        are retried with full-jitter exponential backoff, honouring
+        ``retry_after``; other errors are raised at once. Nothing waits or
+        retries past the request's deadline: the remaining time is passed to
+        the backend as its timeout and ``DeadlineExceeded`` is raised when it
+        runs out. Streamed requests are only retried before their first piece.
+        
+        Args:
+            backend: Backend to send the requests to
+            requests_per_minute: Request rate limit (default: none)
+            tokens_per_minute: Token rate limit (default: none)
+            request_burst: Requests that may start at once under the request
+                rate limit (default: one minute's worth)
+            max_answer_tokens: Tokens reserved for each answer
+            deadline: Seconds a request may take in total, including waits
+                and retries (None for no deadline)
+            max_retries: Retries per request
+            base_delay: Backoff ceiling in seconds before the first retry,
+                doubled for each further retry
+            max_delay: Highest backoff ceiling in seconds
+            initial_concurrency: Starting concurrency limit
+            max_concurrency: Highest concurrency limit
+            seed: Random seed of the backoff jitter
+        """
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.request_bucket = TokenBucket(requests_per_minute, request_burst) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_answer_tokens = max_answer_tokens
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.concurrency = AdaptiveConcurrencyLimit(
+            initial=min(initial_concurrency, max_concurrency),
+            maximum=max_concurrency
+        )
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "retries": 0, "throttled": 0, "failed": 0, "deadline_exceeded": 0}
+    
+    def generate(self, messages: List[Any], timeout: float = None) -> str:
+        deadline = self._start(timeout)
+        attempt = 0
+        while True:
+            tokens = self._admit(messages, deadline, time.sleep)
+            start = self.concurrency.acquire(self._remaining(deadline))
+            if start is None:
+                raise self._deadline_exceeded("waiting for a concurrency slot")
+            try:
+                answer = self.backend.generate(messages, timeout=self._remaining(deadline))
+            except Exception as e:
+                time.sleep(self._retry_delay(e, start, tokens, attempt, deadline))
+                attempt += 1
+                continue
+            self._succeeded(start, tokens, answer)
+            return answer
+    
+    async def agenerate(self, messages: List[Any], timeout: float = None) -> str:
+        deadline = self._start(timeout)
+        attempt = 0
+        while True:
+            tokens = self._admit(messages, deadline, None)
+            await asyncio.sleep(tokens["wait"])
+            start = await self.concurrency.aacquire(self._remaining(deadline))
+            if start is None:
+                raise self._deadline_exceeded("waiting for a concurrency slot")
+            try:
+                answer = await self.backend.agenerate(messages, timeout=self._remaining(deadline))
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, start, tokens, attempt, deadline))
+                attempt += 1
+                continue
+            self._succeeded(start, tokens, answer)
+            return answer
+    
+    def stream(self, messages: List[Any], timeout: float = None) -> Iterator[str]:
+        deadline = self._start(timeout)
+        attempt = 0
+        while True:
+            tokens = self._admit(messages, deadline, time.sleep)
+            start = self.concurrency.acquire(self._remaining(deadline))
+            if start is None:
+                raise self._deadline_exceeded("waiting for a concurrency slot")
+            try:
+                pieces = self.backend.stream(messages, timeout=self._remaining(deadline))
+                first = next(pieces, None)
+            except Exception as e:
+                time.sleep(self._retry_delay(e, start, tokens, attempt, deadline))
+                attempt += 1
+                continue
+            break
+        
+        answer = []
+        outcome = "error"
+        try:
+            if first is not None:
+                answer.append(first)
+                yield first
+            for piece in pieces:
+                answer.append(piece)
+                yield piece
+            outcome = "success"
+        finally:
+            if outcome == "success":
+                self._succeeded(start, tokens, "".join(answer))
+            else:
+                self.concurrency.release(start, outcome)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report request, retry and failure counts and the current concurrency limit.
+        """
+        with self._lock:
+            stats = dict(self._counts)
+        stats["concurrency_limit"] = round(self.concurrency.limit, 2)
+        return stats
+    
+    def _start(self, timeout: float = None) -> Optional[float]:
+        """
+        Count a request and compute its deadline (the earlier of ``timeout`` and the default).
+        """
+        with self._lock:
+            self._counts["requests"] += 1
+        limits = [limit for limit in (timeout, self.deadline) if limit is not None]
+        return time.monotonic() + min(limits) if limits else None
+    
+    def _remaining(self, deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+    
+    def _admit(self, messages: List[Any], deadline: Optional[float], sleep: Any) -> Dict[str, float]:
+        """
+        Reserve the request and its tokens from the rate limits.
+        
+        Args:
+            messages: Messages of the request
+            deadline: Deadline of the request
+            sleep: Function waiting out the reservation, or None to leave the
+                wait to the caller
+                
+        Returns:
+            Reserved ``tokens`` and the ``wait`` before the request may start
+        """
+        tokens = sum(estimate_tokens(message.content) for message in messages) + self.max_answer_tokens
+        max_wait = self._remaining(deadline)
+        waits = [0.0]
+        if self.request_bucket is not None:
+            wait = self.request_bucket.reserve(1, max_wait)
+            if wait is None:
+                raise self._deadline_exceeded("waiting for the request rate limit")
+            waits.append(wait)
+        if self.token_bucket is not None:
+            wait = self.token_bucket.reserve(tokens, max_wait)
+            if wait is None:
+                if self.request_bucket is not None:
+                    self.request_bucket.refund(1)
+                raise self._deadline_exceeded("waiting for the token rate limit")
+            waits.append(wait)
+        
+        wait = max(waits)
+        if wait > 0:
+            tracer.record("llm_queue", wait * 1000, limit="rate")
+            if sleep is not None:
+                sleep(wait)
+        return {"tokens": tokens, "wait": wait}
+    
+    def _retry_delay(self, error: Exception, start: float, tokens: Dict[str, float], attempt: int,
+                     deadline: Optional[float]) -> float:
+        """
+        Handle a failed attempt: release its slot, refund its reservation and decide whether to retry.
+        
+        The reserved answer tokens were not generated, and a throttled (429)
+        attempt was rejected before the provider counted it, so its request
+        and prompt tokens are refunded too; the next attempt reserves again.
+        
+        Returns:
+            Seconds to back off before the next attempt; the error is raised
+            instead if it is not retryable, the retries are used up or the
+            deadline would pass
+        """
+        status = getattr(error, "status_code", None)
+        retryable = (isinstance(error, BackendError) and not isinstance(error, DeadlineExceeded)
+                     and (status is None or status == 429 or status >= 500))
+        self.concurrency.release(start, "overload" if retryable else "error")
+        if self.token_bucket is not None:
+            self.token_bucket.refund(tokens["tokens"] if status == 429 else self.max_answer_tokens)
+        if status == 429 and self.request_bucket is not None:
+            self.request_bucket.refund(1)
+        if status == 429:
+            with self._lock:
+                self._counts["throttled"] += 1
+            tracer.increment("llm_throttled")
+        
+        if retryable and deadline is not None and self._remaining(deadline) <= 0:
+            raise self._deadline_exceeded("waiting for the model") from error
+        if not retryable or attempt >= self.max_retries:
+            with self._lock:
+                self._counts["failed"] += 1
+            raise error
+        
+        # Full jitter: a uniform delay below the exponential ceiling
+        with self._lock:
+            delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if getattr(error, "retry_after", None) is not None:
+            delay = max(delay, error.retry_after)
+        if deadline is not None and delay >= self._remaining(deadline):
+            raise self._deadline_exceeded("backing off before a retry") from error
+        
+        with self._lock:
+            self._counts["retries"] += 1
+        tracer.increment("llm_retries", status=status or "network")
+        return delay
+    
+    def _succeeded(self, start: float, tokens: Dict[str, float], answer: str):
+        """
+        Release the slot of a successful request and refund unused answer tokens.
+        """
+        self.concurrency.release(start, "success")
+        if self.token_bucket is not None:
+            unused = self.max_answer_tokens - estimate_tokens(answer)
+            if unused > 0:
+                self.token_bucket.refund(unused)
+    
+    def _deadline_exceeded(self, stage: str) -> DeadlineExceeded:
+        """
+        Count a request that ran out of time and build its error.
+        """
+        with self._lock:
+            self._counts["deadline_exceeded"] += 1
+        tracer.increment("llm_deadline_exceeded")
+        return DeadlineExceeded(f"LLM request deadline exceeded while {stage}", status_code=504)
@@ -1,44 +1,199 @@
 """
 LLM service for generating answers based on retrieved context.
 """
-from typing import List, Dict, Any
-from langchain_groq import ChatGroq
+import time
+from typing import List, Dict, Any, Iterator, Tuple
 from langchain.schema import HumanMessage, SystemMessage
+from .cache import AnswerCache
+from .llm_backends import LLMBackend, GroqBackend
+from .context_packer import ContextPacker, estimate_tokens
+from .tracing import tracer
 
 class LLMService:
-    def __init__(self, groq_api_key: str, model_name: str = "llama3-8b-8192"):
+    def __init__(self, groq_api_key: str = None, model_name: str = "llama3-8b-8192", cache: AnswerCache = None,
+                 context_packer: ContextPacker = None, backend: LLMBackend = None):
         """
         Initialize the LLM service.
         
         Args:
-            groq_api_key: Groq API key
-            model_name: Name of the LLM model to use
-        """
-        self.llm = ChatGroq(
-            groq_api_key=groq_api_key,
-            model_name=model_name,
-            temperature=0.2
-        )
+            groq_api_key: Groq API key (not needed when ``backend`` is given)
+            model_name: Name of the Groq model to use
+            cache: Cache of generated answers (default: no caching)
+            context_packer: Packer merging and budgeting the context passed to
+                ``pack_context`` (default: no packing)
+            backend: Chat model backend, e.g. a ``SimulatedBackend`` for load
+                tests (default: ``GroqBackend`` with ``model_name``)
+        """
+        self.backend = backend if backend is not None else GroqBackend(groq_api_key, model_name)
+        self.model_name = self.backend.model_name
+        self.cache = cache
+        self.context_packer = context_packer
     
-    def generate_answer(self, query: str, context_chunks: List[Dict[str, Any]]) -> str:
+    def pack_context(self, query: str, context_chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Merge overlapping chunks and fit the context into the token budget.
+        
+        Args:
+            query: The user's question
+            context_chunks: Retrieved document chunks (and tool results)
+            
+        Returns:
+            The packed chunks, and the number of chunks and estimated prompt
+            tokens before and after packing
+        """
+        with tracer.span("context_packing") as span:
+            packed = context_chunks if self.context_packer is None else self.context_packer.pack(context_chunks)
+            stats = {
+                "chunks_before": len(context_chunks),
+                "chunks_after": len(packed),
+                "tokens_before": self._prompt_tokens(query, context_chunks),
+                "tokens_after": self._prompt_tokens(query, packed)
+            }
+            span.set(**stats)
+        tracer.increment("prompt_tokens", stats["tokens_after"])
+        tracer.increment("prompt_tokens_saved", stats["tokens_before"] - stats["tokens_after"])
+        return packed, stats
+    
+    def generate_answer(self, query: str, context_chunks: List[Dict[str, Any]], index_version: Any = None) -> str:
         """
         Generate an answer to the user's query based on retrieved context.
         
+        With a cache configured, a question that repeats (up to casing and
+        whitespace) with the same context chunks and index version is
+        answered from the cache without calling the model.
+        
         Args:
             query: The user's question
             context_chunks: Retrieved document chunks
+            index_version: Version of the index the chunks come from
             
         Returns:
             Generated answer
         """
+        if self.cache is not None:
+            cache_key = self.cache.make_key(query, context_chunks, self.model_name, index_version)
+            answer = self.cache.get(cache_key)
+            tracer.increment("answer_cache_lookups", result="miss" if answer is None else "hit")
+            if answer is not None:
+                return answer
+        
+        # Generate response
+        messages = self._prompt(query, context_chunks)
+        with tracer.span("llm_call", prompt_chars=_chars(messages)) as span:
+            answer = self.backend.generate(messages)
+            span.set(response_chars=len(answer))
+        
+        if self.cache is not None:
+            self.cache.put(cache_key, index_version, answer)
+        
+        return answer
+    
+    async def agenerate_answer(self, query: str, context_chunks: List[Dict[str, Any]], index_version: Any = None) -> str:
+        """
+        Generate an answer without blocking the event loop.
+        
+        Same as ``generate_answer``, but awaits the backend's ``agenerate``.
+        
+        Args:
+            query: The user's question
+            context_chunks: Retrieved document chunks
+            index_version: Version of the index the chunks come from
+            
+        Returns:
+            Generated answer
+        """
+        if self.cache is not None:
+            cache_key = self.cache.make_key(query, context_chunks, self.model_name, index_version)
+            answer = self.cache.get(cache_key)
+            tracer.increment("answer_cache_lookups", result="miss" if answer is None else "hit")
+            if answer is not None:
+                return answer
+        
+        messages = self._prompt(query, context_chunks)
+        with tracer.span("llm_call", prompt_chars=_chars(messages)) as span:
+            answer = await self.backend.agenerate(messages)
+            span.set(response_chars=len(answer))
+        
+        if self.cache is not None:
+            self.cache.put(cache_key, index_version, answer)
+        
+        return answer
+    
+    def generate_answer_stream(self, query: str, context_chunks: List[Dict[str, Any]],
+                               index_version: Any = None) -> Iterator[str]:
+        """
+        Generate an answer and yield it token by token as the model produces it.
+        
+        A cached answer is yielded as a single piece. The complete answer is
+        cached once the stream has been fully consumed.
+        
+        Args:
+            query: The user's question
+            context_chunks: Retrieved document chunks
+            index_version: Version of the index the chunks come from
+            
+        Yields:
+            Pieces of the answer text
+        """
+        if self.cache is not None:
+            cache_key = self.cache.make_key(query, context_chunks, self.model_name, index_version)
+            answer = self.cache.get(cache_key)
+            tracer.increment("answer_cache_lookups", result="miss" if answer is None else "hit")
+            if answer is not None:
+                yield answer
+                return
+        
+        messages = self._prompt(query, context_chunks)
+        start = time.perf_counter()
+        pieces = []
+        for piece in self.backend.stream(messages):
+            pieces.append(piece)
+            yield piece
+        
+        # Timed by hand: a span would stay open across the yields
+        tracer.record("llm_call", (time.perf_counter() - start) * 1000, prompt_chars=_chars(messages),
+                      response_chars=sum(len(piece) for piece in pieces), streamed=True)
+        
+        if self.cache is not None:
+            self.cache.put(cache_key, index_version, "".join(pieces))
+    
+    def _prompt(self, query: str, context_chunks: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Build the messages for a question, timed as the prompt construction stage.
+        """
+        with tracer.span("prompt_construction", chunks=len(context_chunks)) as span:
+            messages = self._build_messages(query, context_chunks)
+            span.set(prompt_chars=_chars(messages))
+        return messages
+    
+    def _prompt_tokens(self, query: str, context_chunks: List[Dict[str, Any]]) -> int:
+        """
+        Estimate the number of tokens of the prompt for a question and its context.
+        """
+        return sum(estimate_tokens(message.content) for message in self._build_messages(query, context_chunks))
+    
+    def _build_messages(self, query: str, context_chunks: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Build the system and user messages for a question and its context.
+        
+        Args:
+            query: The user's question
+            context_chunks: Retrieved document chunks
+            
+        Returns:
+            Messages to send to the model
+        """
         # Prepare context from retrieved chunks
         context_sections = []
-        calculation_result = None
+        calculation_results = []
+        definitions = []
         
         for i, chunk in enumerate(context_chunks):
-            # Check if this is a calculation result
+            # Check if this is a calculation result or a dictionary definition
             if chunk.get("metadata", {}).get("source") == "calculator_tool":
-                calculation_result = chunk["content"]
+                calculation_results.append(chunk["content"])
+            elif chunk.get("metadata", {}).get("source") == "dictionary_tool":
+                definitions.append(chunk["content"])
             else:
                 # Format regular context chunks with their source
                 source = chunk["metadata"]["source"]
@@ -70,16 +225,21 @@ class LLMService:
         # Prepare the user message content
         user_content = f"Context:\n{context_text}\n\n"
         
-        # Add calculation result if present
-        if calculation_result:
+        # Add calculation results and definitions if present
+        for calculation_result in calculation_results:
             user_content += f"Calculation Result: {calculation_result}\n\n"
+        for definition in definitions:
+            user_content += f"Dictionary Definition: {definition}\n\n"
         
         user_content += f"Question: {query}\n\n"
         user_content += f"Answer the question based on the provided context and calculation result (if any). Make sure to address all parts of the question."
         
         user_message = HumanMessage(content=user_content)
         
-        # Generate response
-        response = self.llm.invoke([system_message, user_message])
-        
-        return response.content
+        return [system_message, user_message]
+
+def _chars(messages: List[Any]) -> int:
+    """
+    Count the characters of a list of messages.
+    """
+    return sum(len(message.content) for message in messages)
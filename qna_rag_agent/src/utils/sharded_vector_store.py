@@ -0,0 +1,290 @@
+"""
+Sharded TF-IDF vector store that scatters queries across worker processes.
+"""
+import heapq
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+import numpy as np
+from typing import List, Dict, Any
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+from .chunk_store import ChunkStore
+from .entity_index import EntityIndex
+from .vector_store import _top_k_indices, _chunks_digest, _content_version, _serializable_params
+from .tracing import tracer
+
+
+def _shard_worker(conn, entity_gazetteer: Dict[str, Dict[str, Any]]):
+    """
+    Serve one shard: count terms, weight them with the global IDF, and search.
+    
+    Commands arrive as ``(command, payload)`` tuples and every command gets
+    exactly one ``("ok", result)`` or ``("error", message)`` reply.
+    
+    Args:
+        conn: Worker end of the pipe to the parent process
+        entity_gazetteer: Product/company names used for score boosting
+    """
+    documents = ChunkStore()
+    counts = None
+    embeddings = None
+    entity_index = EntityIndex(entity_gazetteer)
+    
+    while True:
+        command, payload = conn.recv()
+        try:
+            if command == "count":
+                # Local vocabulary and document frequencies for the global IDF
+                documents = ChunkStore.from_documents(payload)
+                texts = [doc["content"] for doc in payload]
+                vectorizer = CountVectorizer()
+                counts = vectorizer.fit_transform(texts) if texts else csr_matrix((0, 0))
+                terms = vectorizer.get_feature_names_out().tolist() if texts else []
+                doc_freq = np.bincount(counts.indices, minlength=len(terms))
+                entity_index.build(texts)
+                result = (terms, doc_freq)
+            elif command == "weight":
+                # Map local term ids to global ones and apply the global IDF
+                column_map, idf = payload
+                weights = csr_matrix(
+                    (counts.data.astype(np.float64), column_map[counts.indices], counts.indptr),
+                    shape=(counts.shape[0], len(idf))
+                )
+                weights.data *= idf[weights.indices]
+                embeddings = normalize(weights) if weights.shape[0] else weights
+                counts = None
+                result = len(documents)
+            elif command == "search":
+                query_embeddings, entity_matches, top_k = payload
+                similarities = csr_matrix(query_embeddings @ embeddings.T)
+                result = []
+                for row, matches in enumerate(entity_matches):
+                    scores = similarities[row].toarray().ravel()
+                    entity_index.apply_boosts(scores, matches)
+                    result.append([
+                        (float(scores[idx]), documents[idx])
+                        for idx in _top_k_indices(scores, top_k)
+                    ])
+            elif command == "close":
+                conn.send(("ok", None))
+                break
+            else:
+                raise ValueError(f"Unknown command: {command}")
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    
+    conn.close()
+
+
+class ShardedVectorStore:
+    def __init__(self, num_shards: int = None, partition: str = "hash",
+                 entity_gazetteer: Dict[str, Dict[str, Any]] = None):
+        """
+        Initialize the sharded vector store and start its worker processes.
+        
+        Chunks are partitioned across the workers; every query is broadcast to
+        all shards and their top-k lists are merged with a heap. The IDF is
+        computed from the document frequencies of all shards, so scores are
+        identical to a single ``VectorStore`` over the same chunks.
+        
+        Args:
+            num_shards: Number of worker processes (default: number of CPUs)
+            partition: "hash" spreads chunks by a hash of source and chunk
+                id, so shards are the same size and every query is split
+                evenly; "source" keeps each source file on one shard,
+                placing the largest files first on the least-loaded shard,
+                which keeps a file's chunks together but leaves shards only
+                as balanced as the file sizes allow (a single large file
+                lands on one shard)
+            entity_gazetteer: Product/company names used for score boosting
+                (default: ``DEFAULT_ENTITY_GAZETTEER``)
+        """
+        if partition not in ("source", "hash"):
+            raise ValueError(f"Unknown partition scheme: {partition}")
+        
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.partition = partition
+        self.entity_index = EntityIndex(entity_gazetteer)
+        self.vectorizer = TfidfVectorizer()
+        self.num_documents = 0
+        self.index_version = None
+        self._lock = threading.Lock()
+        self._connections = []
+        self._processes = []
+        
+        for _ in range(self.num_shards):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard_worker,
+                args=(child_conn, self.entity_index.gazetteer),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+    
+    def create_index(self, documents: List[Dict[str, Any]]):
+        """
+        Partition document chunks across the shards and index them.
+        
+        Args:
+            documents: List of document chunks with content and metadata
+        """
+        start = time.perf_counter()
+        shards = self._partition(documents)
+        
+        # Phase 1: every shard tokenizes its chunks and reports document frequencies
+        shard_stats = self._broadcast([("count", shard) for shard in shards])
+        
+        vocabulary = {}
+        column_maps = []
+        for terms, _ in shard_stats:
+            column_maps.append(np.array([vocabulary.setdefault(term, len(vocabulary)) for term in terms], dtype=np.int32))
+        
+        doc_freq = np.zeros(len(vocabulary), dtype=np.int64)
+        for column_map, (_, shard_doc_freq) in zip(column_maps, shard_stats):
+            doc_freq[column_map] += shard_doc_freq
+        
+        # Same smoothed IDF as TfidfVectorizer
+        self.num_documents = len(documents)
+        idf = np.log((1 + self.num_documents) / (1 + doc_freq)) + 1
+        self.vectorizer.vocabulary_ = vocabulary
+        self.vectorizer.idf_ = idf
+        
+        # Phase 2: every shard weights its counts with the global IDF
+        sizes = self._broadcast([("weight", (column_map, idf)) for column_map in column_maps])
+        self.index_version = _content_version(None, "sharded", _serializable_params(self.vectorizer),
+                                              self.entity_index.gazetteer, _chunks_digest(documents))
+        tracer.record("index_build", (time.perf_counter() - start) * 1000, backend="sharded", chunks=self.num_documents)
+        
+        print(f"Created TF-IDF embeddings for {self.num_documents} document chunks "
+              f"across {self.num_shards} shards (sizes: {sizes})")
+    
+    def retrieve(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Retrieve the most relevant document chunks for a query.
+        
+        Args:
+            query: The user's question
+            top_k: Number of chunks to retrieve
+            
+        Returns:
+            List of the most relevant document chunks
+        """
+        return self.retrieve_many([query], top_k=top_k)[0]
+    
+    def retrieve_many(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve the most relevant document chunks for several queries.
+        
+        The queries are transformed once in this process with the global
+        vocabulary and IDF, scored by all shards in parallel, and the per-shard
+        top-k lists are merged with a heap.
+        
+        Args:
+            queries: The user questions
+            top_k: Number of chunks to retrieve per query
+            
+        Returns:
+            One list of relevant document chunks per query, in input order
+        """
+        if self.num_documents == 0:
+            raise ValueError("Embeddings have not been created yet")
+        
+        # Repeat product/company mentions to boost their weight
+        expanded = [self.entity_index.expand_query(query) for query in queries]
+        query_embeddings = self.vectorizer.transform([boosted for boosted, _ in expanded])
+        entity_matches = [matches for _, matches in expanded]
+        
+        shard_results = self._broadcast([("search", (query_embeddings, entity_matches, top_k))] * self.num_shards)
+        
+        results = []
+        for row in range(len(queries)):
+            candidates = (hit for shard in shard_results for hit in shard[row])
+            results.append([
+                {"content": doc["content"], "metadata": doc["metadata"], "score": score}
+                for score, doc in heapq.nlargest(top_k, candidates, key=lambda hit: hit[0])
+            ])
+        
+        return results
+    
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.send(("close", None))
+                    conn.recv()
+                except (EOFError, OSError):
+                    pass
+                conn.close()
+            for process in self._processes:
+                process.join(timeout=5)
+            self._connections = []
+            self._processes = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _partition(self, documents: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Split chunks into one list per shard according to ``partition``.
+        
+        Hashing is stable across processes; source placement balances the
+        shards by chunk count.
+        """
+        shards = [[] for _ in range(self.num_shards)]
+        if self.partition == "hash":
+            for doc in documents:
+                key = f"{doc['metadata']['source']}:{doc['metadata']['chunk_id']}"
+                shards[zlib.crc32(key.encode("utf-8")) % self.num_shards].append(doc)
+            return shards
+        
+        by_source = {}
+        for doc in documents:
+            by_source.setdefault(doc["metadata"]["source"], []).append(doc)
+        
+        # Largest files first, each onto the shard with the fewest chunks so far
+        loads = [(0, shard) for shard in range(self.num_shards)]
+        for _, docs in sorted(by_source.items(), key=lambda item: (-len(item[1]), item[0])):
+            load, shard = heapq.heappop(loads)
+            shards[shard].extend(docs)
+            heapq.heappush(loads, (load + len(docs), shard))
+        return shards
+    
+    def _broadcast(self, messages: List[tuple]) -> List[Any]:
+        """
+        Send one message to every shard, then collect all replies.
+        
+        All shards work concurrently; the lock keeps requests from different
+        threads from interleaving on the pipes.
+        
+        Args:
+            messages: One (command, payload) tuple per shard
+            
+        Returns:
+            One reply per shard
+        """
+        if not self._connections:
+            raise ValueError("Sharded vector store has been closed")
+        
+        with self._lock:
+            for conn, message in zip(self._connections, messages):
+                conn.send(message)
+            replies = [conn.recv() for conn in self._connections]
+        
+        errors = [message for status, message in replies if status == "error"]
+        if errors:
+            raise RuntimeError(f"Shard worker failed: {errors[0]}")
+        return [result for _, result in replies]
@@ -0,0 +1,147 @@
+"""
+Recursive character text splitter that works on offsets into the source text.
+"""
+import re
+from typing import List, Tuple
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+
+class OffsetTextSplitter:
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 separators: List[str] = None, strip_whitespace: bool = True):
+        """
+        Initialize the splitter.
+        
+        Chunks are identical to LangChain's ``RecursiveCharacterTextSplitter``
+        with ``keep_separator=True`` and ``length_function=len``: the text is
+        split on the first separator it contains, pieces shorter than
+        ``chunk_size`` are merged with up to ``chunk_overlap`` characters of
+        overlap, and longer pieces are split again with the next separator.
+        Because kept separators make every piece a contiguous span of the
+        source text, the whole hierarchy is walked as ``(start, end)``
+        offsets and no intermediate strings are created.
+        
+        Args:
+            chunk_size: Maximum number of characters per chunk
+            chunk_overlap: Maximum overlap between consecutive chunks
+            separators: Separators in order of preference (default:
+                paragraphs, lines, sentence punctuation, commas, spaces, characters)
+            strip_whitespace: Whether to strip whitespace around merged chunks
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller."
+            )
+        
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or DEFAULT_SEPARATORS
+        self.strip_whitespace = strip_whitespace
+        self._patterns = [re.compile(re.escape(separator)) for separator in self.separators]
+    
+    def split_text(self, text: str) -> List[str]:
+        """
+        Split text into chunks.
+        
+        Args:
+            text: Text to split
+            
+        Returns:
+            Chunk texts in order
+        """
+        return [text[start:end] for start, end in self.split_offsets(text)]
+    
+    def split_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Split text into chunk spans.
+        
+        Args:
+            text: Text to split
+            
+        Returns:
+            ``(start, end)`` offsets of the chunks in ``text``, in order
+        """
+        chunks = []
+        self._split_span(text, 0, len(text), 0, chunks)
+        return chunks
+    
+    def _split_span(self, text: str, start: int, end: int, level: int, chunks: List[Tuple[int, int]]):
+        """
+        Split ``text[start:end]`` with the first separator from ``level`` on that occurs in it.
+        
+        Args:
+            text: Source text
+            start: Start offset of the span
+            end: End offset of the span
+            level: Index of the first separator to try
+            chunks: Output list the chunk spans are appended to
+        """
+        # Pick the first separator present in the span; "" splits into characters
+        level = next(
+            (i for i in range(level, len(self.separators))
+             if self.separators[i] == "" or text.find(self.separators[i], start, end) != -1),
+            len(self.separators) - 1
+        )
+        separator = self.separators[level]
+        has_next = level + 1 < len(self.separators) and separator != ""
+        
+        # With the separator kept at the start of each piece, the pieces are
+        # delimited by the separator positions
+        if separator:
+            bounds = [start]
+            bounds.extend(match.start() for match in self._patterns[level].finditer(text, start, end))
+            bounds.append(end)
+        else:
+            bounds = range(start, end + 1)
+        
+        good = []
+        for piece_start, piece_end in zip(bounds, bounds[1:]):
+            if piece_start == piece_end:
+                continue
+            if piece_end - piece_start < self.chunk_size:
+                good.append((piece_start, piece_end))
+                continue
+            if good:
+                self._merge_spans(text, good, chunks)
+                good = []
+            if has_next:
+                self._split_span(text, piece_start, piece_end, level + 1, chunks)
+            else:
+                chunks.append((piece_start, piece_end))
+        if good:
+            self._merge_spans(text, good, chunks)
+    
+    def _merge_spans(self, text: str, spans: List[Tuple[int, int]], chunks: List[Tuple[int, int]]):
+        """
+        Merge consecutive short spans into chunks of at most ``chunk_size`` characters.
+        
+        Args:
+            text: Source text
+            spans: Contiguous spans shorter than ``chunk_size``
+            chunks: Output list the chunk spans are appended to
+        """
+        first = 0
+        total = 0
+        for i, (span_start, span_end) in enumerate(spans):
+            length = span_end - span_start
+            if total + length > self.chunk_size and i > first:
+                self._emit(text, spans[first][0], spans[i - 1][1], chunks)
+                # Keep trailing spans as overlap for the next chunk
+                while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                    total -= spans[first][1] - spans[first][0]
+                    first += 1
+            total += length
+        if first < len(spans):
+            self._emit(text, spans[first][0], spans[-1][1], chunks)
+    
+    def _emit(self, text: str, start: int, end: int, chunks: List[Tuple[int, int]]):
+        """
+        Append a merged chunk span, stripped of surrounding whitespace and dropped if empty.
+        """
+        if self.strip_whitespace:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+        if start < end:
+            chunks.append((start, end))
@@ -0,0 +1,325 @@
+"""
+Lightweight tracing: per-stage spans, latency histograms, counters and metrics export.
+"""
+import bisect
+import contextvars
+import json
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+# Upper bounds of the latency histogram buckets in milliseconds
+DEFAULT_BUCKETS_MS = (
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+    1000, 2500, 5000, 10000, 30000, 60000, float("inf")
+)
+
+# Spans of the trace being recorded and the innermost open span, per context
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS_MS):
+        """
+        Initialize a cumulative latency histogram.
+        
+        Args:
+            buckets: Upper bounds of the buckets, ending with infinity
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float):
+        """
+        Add one observation.
+        
+        Args:
+            value: Observed value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by interpolating within its bucket, as Prometheus does.
+        
+        Args:
+            q: Quantile between 0 and 1
+            
+        Returns:
+            Estimated value (0.0 without observations)
+        """
+        if self.count == 0:
+            return 0.0
+        
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = min(self.buckets[i], self.max)
+                return lower + (upper - lower) * max(rank - cumulative, 0) / count
+            cumulative += count
+        return self.max
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        """
+        Initialize a span; it is timed between ``__enter__`` and ``__exit__``.
+        
+        Args:
+            tracer: Tracer recording the span
+            name: Stage name
+            attributes: Extra fields stored with the span (e.g. sizes)
+        """
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+    
+    def set(self, **attributes):
+        """
+        Add attributes, e.g. sizes only known at the end of the stage.
+        """
+        self.attributes.update(attributes)
+    
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self.name)
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        ms = (time.perf_counter() - self.start) * 1000
+        _reset(_current_span, self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer.record(self.name, ms, parent=self.parent, **self.attributes)
+
+class _NoopSpan:
+    """Span returned while tracing is disabled."""
+    
+    def set(self, **attributes):
+        pass
+    
+    def __enter__(self) -> "_NoopSpan":
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class _Trace:
+    """Collects the spans recorded in the current context into a list."""
+    
+    def __init__(self, enabled: bool, spans: Optional[List[Dict[str, Any]]]):
+        self.enabled = enabled
+        self.spans = spans if spans is not None else []
+    
+    def __enter__(self) -> List[Dict[str, Any]]:
+        if self.enabled:
+            self._token = _current_trace.set(self.spans)
+        return self.spans
+    
+    def __exit__(self, exc_type, exc, traceback):
+        if self.enabled:
+            _reset(_current_trace, self._token)
+
+def _reset(variable: contextvars.ContextVar, token: contextvars.Token):
+    """
+    Reset a context variable, tolerating generators closed from another context.
+    """
+    try:
+        variable.reset(token)
+    except ValueError:
+        pass
+
+class Tracer:
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS_MS):
+        """
+        Initialize the tracer.
+        
+        Spans are timed sections of work (``with tracer.span("retrieval"):``).
+        Each finished span is added to the latency histogram of its name and,
+        inside ``with tracer.trace() as spans:``, appended to ``spans``
+        together with its parent span and attributes. Trace lists follow
+        ``contextvars``, so they cover asyncio tasks and functions submitted
+        with ``contextvars.copy_context().run``. While disabled, ``span``
+        returns a shared no-op object and nothing is recorded.
+        
+        Args:
+            enabled: Record spans and counters
+            buckets: Upper bounds of the latency histogram buckets in milliseconds
+        """
+        self.enabled = enabled
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+    
+    def span(self, name: str, **attributes) -> Any:
+        """
+        Time a stage.
+        
+        Args:
+            name: Stage name, e.g. ``retrieval`` or ``llm_call``
+            **attributes: Extra fields stored with the span
+            
+        Returns:
+            Context manager yielding the span (use ``set`` to add attributes)
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attributes)
+    
+    def trace(self, spans: Optional[List[Dict[str, Any]]] = None) -> _Trace:
+        """
+        Collect the spans recorded in this context, e.g. for one query.
+        
+        Args:
+            spans: List to append to, e.g. to continue a trace in another
+                thread (default: a new list)
+            
+        Returns:
+            Context manager yielding the list the spans are appended to
+            (empty while tracing is disabled)
+        """
+        return _Trace(self.enabled, spans)
+    
+    def record(self, name: str, ms: float, parent: Optional[str] = None, **attributes):
+        """
+        Record a stage timed by the caller.
+        
+        Args:
+            name: Stage name
+            ms: Duration in milliseconds
+            parent: Name of the enclosing stage (default: the innermost open span)
+            **attributes: Extra fields stored with the span
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.buckets)
+            histogram.observe(ms)
+        
+        spans = _current_trace.get()
+        if spans is not None:
+            spans.append({
+                "name": name,
+                "parent": parent if parent is not None else _current_span.get(),
+                "ms": ms,
+                "attributes": attributes
+            })
+    
+    def increment(self, name: str, value: float = 1, **labels):
+        """
+        Add to a counter.
+        
+        Args:
+            name: Counter name
+            value: Amount to add
+            **labels: Label values distinguishing series of the counter
+        """
+        if not self.enabled:
+            return
+        
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def reset(self):
+        """
+        Drop all recorded histograms and counters.
+        """
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Summarize the recorded metrics.
+        
+        Returns:
+            Per-stage count, total, mean, p50/p95/p99 and max latency in
+            milliseconds, and the counters keyed as ``name{label="value"}``
+        """
+        with self._lock:
+            spans = {
+                name: {
+                    "count": histogram.count,
+                    "sum_ms": histogram.sum,
+                    "mean_ms": histogram.sum / histogram.count,
+                    "p50_ms": histogram.quantile(0.5),
+                    "p95_ms": histogram.quantile(0.95),
+                    "p99_ms": histogram.quantile(0.99),
+                    "max_ms": histogram.max
+                }
+                for name, histogram in sorted(self.histograms.items())
+            }
+            counters = {_series(name, labels): value for (name, labels), value in sorted(self.counters.items())}
+        return {"spans": spans, "counters": counters}
+    
+    def to_json(self) -> str:
+        """
+        Export the snapshot as JSON.
+        """
+        return json.dumps(self.snapshot(), indent=2)
+    
+    def to_prometheus(self, prefix: str = "rag") -> str:
+        """
+        Export the metrics in the Prometheus text exposition format.
+        
+        Args:
+            prefix: Prefix of every metric name
+            
+        Returns:
+            One histogram of span durations, a gauge of their p50/p95/p99,
+            and one counter per counter name
+        """
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            
+            lines.append(f"# TYPE {prefix}_span_duration_ms histogram")
+            for name, histogram in histograms:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'{prefix}_span_duration_ms_bucket{{span="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_span_duration_ms_sum{{span="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'{prefix}_span_duration_ms_count{{span="{name}"}} {histogram.count}')
+            
+            lines.append(f"# TYPE {prefix}_span_latency_ms gauge")
+            for name, histogram in histograms:
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'{prefix}_span_latency_ms{{span="{name}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+        
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{prefix}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{_series(metric, labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+def _series(name: str, labels: Tuple[Tuple[str, Any], ...]) -> str:
+    """
+    Format a metric name with its labels, e.g. ``queries{route="rag"}``.
+    """
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+# Tracer shared by the whole application; disabled until a front end enables it
+tracer = Tracer()
@@ -1,22 +1,82 @@
 """
 Vector store utility for creating and querying embeddings.
 """
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from .entity_index import EntityIndex
+from .dense_index import LSAIndex
+from .chunk_store import ChunkStore
+from .cache import LRUCache, normalize_query
+from .tracing import tracer
+
+# On-disk index layout. Bump INDEX_FORMAT_VERSION whenever the set of files or
+# their meaning changes so that stale indexes are rejected instead of misread.
+INDEX_FORMAT = "ragent-tfidf-index"
+INDEX_FORMAT_VERSION = 5
+INDEX_HEADER_FILE = "index.json"
+
+class IndexVersionError(ValueError):
+    """A saved index was written with another ``INDEX_FORMAT_VERSION`` and must be rebuilt."""
 
 class VectorStore:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, compaction_threshold: float = 0.25,
+                 entity_gazetteer: Dict[str, Dict[str, Any]] = None,
+                 retrieval_cache_size: int = 1024, retrieval_cache_bytes: int = 32 * 1024 * 1024):
         """
         Initialize the vector store with a TF-IDF vectorizer.
         
         Args:
             api_key: API key (not used for TF-IDF)
+            compaction_threshold: Fraction of removed chunks that triggers an
+                automatic ``compact`` after ``remove_documents``
+            entity_gazetteer: Product/company names used for score boosting
+                (default: ``DEFAULT_ENTITY_GAZETTEER``)
+            retrieval_cache_size: Maximum number of cached retrieval results
+                (0 disables the cache)
+            retrieval_cache_bytes: Maximum approximate size of the cached results
         """
         self.vectorizer = TfidfVectorizer()
         self.document_embeddings = None
-        self.documents = []
+        self.documents = ChunkStore()
+        self.entity_index = EntityIndex(entity_gazetteer)
+        self.dense_index = None
+        self.compaction_threshold = compaction_threshold
+        # Ingestion manifest of the indexed files, persisted with the index
+        self.manifest = None
+        # Changes whenever retrieval results may change; used to key caches.
+        # Derived from the indexed content, so it survives restarts and rebuilds
+        self.index_version = None
+        self.retrieval_cache = LRUCache(
+            max_entries=retrieval_cache_size,
+            max_bytes=retrieval_cache_bytes,
+            sizeof=_results_size
+        )
+        
+        # Raw term counts and document frequencies are kept alongside the
+        # weighted matrix so that documents can be added or removed without
+        # refitting. IDF weights are recomputed lazily on the next query.
+        self.term_counts = None
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.tombstones = np.zeros(0, dtype=bool)
+        self.next_chunk_id = 0
+        self._pending_counts = []
+        self._weights_stale = False
+        self._dense_pending_from = None
+        # Serializes the lazy merge/reweighting when readers (hybrid legs,
+        # batch and async queries) hit a stale index at the same time;
+        # reentrant because _ensure_weights merges under it
+        self._weights_lock = threading.RLock()
         
     def create_index(self, documents: List[Dict[str, Any]]):
         """
@@ -25,88 +85,785 @@ class VectorStore:
         Args:
             documents: List of document chunks with content and metadata
         """
-        self.documents = documents
+        start = time.perf_counter()
+        documents = list(documents)
+        self.documents = ChunkStore.from_documents(documents)
         
         # Get embeddings for all documents
         texts = [doc["content"] for doc in documents]
-        self.document_embeddings = self.vectorizer.fit_transform(texts)
+        self.vectorizer.vocabulary_ = {}
+        self.term_counts = self._count_terms(texts)
+        self.doc_freq = np.bincount(self.term_counts.indices, minlength=self.term_counts.shape[1]).astype(np.int64)
+        self.tombstones = np.zeros(len(self.documents), dtype=bool)
+        self.next_chunk_id = max((doc["metadata"]["chunk_id"] for doc in documents), default=-1) + 1
+        self._pending_counts = []
+        self.entity_index.build(texts)
+        self._weights_stale = True
+        self._ensure_weights()
+        self.index_version = None
+        self._bump_version("create", _serializable_params(self.vectorizer), self.entity_index.gazetteer,
+                           _chunks_digest(documents))
+        tracer.record("index_build", (time.perf_counter() - start) * 1000, backend="tfidf", chunks=len(documents))
         
         print(f"Created TF-IDF embeddings for {len(documents)} document chunks")
+    
+    @property
+    def num_active(self) -> int:
+        """Number of chunks that have not been removed."""
+        return int(len(self.tombstones) - self.tombstones.sum())
+    
+    def active_documents(self) -> List[Dict[str, Any]]:
+        """
+        Get the document chunks that have not been removed.
+        
+        Returns:
+            List of document chunks with content and metadata
+        """
+        return [self.documents[row] for row in np.flatnonzero(~self.tombstones)]
+    
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[int]:
+        """
+        Add document chunks to an existing index without refitting it.
+        
+        Only the new chunks are tokenized; their rows are queued and appended
+        to the count matrix, and the IDF weights of the whole index are
+        refreshed lazily before the next query. New chunks receive fresh
+        ``chunk_id`` values continuing after the largest one in the index.
+        
+        Args:
+            documents: List of document chunks with content and metadata
+            
+        Returns:
+            The chunk ids assigned to the added chunks
+        """
+        if self.term_counts is None:
+            self.create_index(documents)
+            return self.documents.chunk_ids.tolist()
+        
+        if not documents:
+            return []
+        
+        added = []
+        chunk_ids = []
+        for doc in documents:
+            metadata = dict(doc["metadata"])
+            metadata["chunk_id"] = self.next_chunk_id
+            self.next_chunk_id += 1
+            chunk_ids.append(metadata["chunk_id"])
+            added.append({"content": doc["content"], "metadata": metadata})
+        
+        texts = [doc["content"] for doc in added]
+        counts = self._count_terms(texts)
+        
+        # New terms extend the vocabulary, so document frequencies grow too
+        doc_freq = np.zeros(counts.shape[1], dtype=np.int64)
+        doc_freq[:len(self.doc_freq)] = self.doc_freq
+        doc_freq += np.bincount(counts.indices, minlength=counts.shape[1])
+        self.doc_freq = doc_freq
+        
+        first_row = len(self.documents)
+        self.entity_index.add(texts, first_row)
+        self.documents.extend(added)
+        self.tombstones = np.concatenate([self.tombstones, np.zeros(len(added), dtype=bool)])
+        self._pending_counts.append(counts)
+        self._weights_stale = True
+        if self.dense_index is not None and self._dense_pending_from is None:
+            # Projected once the new rows have been weighted
+            self._dense_pending_from = first_row
+        self._bump_version("add", _chunks_digest(added))
+        
+        print(f"Added {len(added)} document chunks to the index")
+        return chunk_ids
+    
+    def remove_documents(self, source: Optional[str] = None, chunk_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Remove document chunks by source file and/or chunk id.
+        
+        Removed chunks are tombstoned: they stop matching immediately and
+        their document frequencies are subtracted, but their rows stay in the
+        matrices until ``compact`` runs (automatically once the removed
+        fraction exceeds ``compaction_threshold``).
+        
+        Args:
+            source: Remove every chunk from this source file
+            chunk_ids: Remove the chunks with these ids
+            
+        Returns:
+            Number of chunks removed
+        """
+        if source is None and chunk_ids is None:
+            raise ValueError("Specify a source and/or chunk_ids to remove")
+        if self.term_counts is None:
+            return 0
+        
+        rows = np.zeros(0, dtype=np.int64)
+        if source is not None:
+            rows = np.union1d(rows, self.documents.rows_for_source(source))
+        if chunk_ids is not None:
+            rows = np.union1d(rows, self.documents.rows_for_chunk_ids(chunk_ids))
+        rows = rows[~self.tombstones[rows]] if len(rows) else rows
+        if len(rows) == 0:
+            return 0
+        
+        self._merge_pending()
+        removed_counts = self.term_counts[rows]
+        self.doc_freq = self.doc_freq - np.bincount(removed_counts.indices, minlength=len(self.doc_freq))
+        self.tombstones = self.tombstones.copy()
+        self.tombstones[rows] = True
+        self._weights_stale = True
+        self._bump_version("remove", self.documents.chunk_ids[rows].tolist())
+        
+        print(f"Removed {len(rows)} document chunks from the index")
+        
+        if self.tombstones.mean() > self.compaction_threshold:
+            self.compact()
+        
+        return len(rows)
+    
+    def compact(self):
+        """
+        Drop tombstoned rows and vocabulary terms no longer used by any chunk.
+        
+        Chunk ids are preserved; only row positions change.
+        """
+        if self.term_counts is None:
+            return
+        
+        self._merge_pending()
+        keep_rows = np.flatnonzero(~self.tombstones)
+        keep_terms = np.flatnonzero(self.doc_freq > 0)
+        
+        # Remap surviving term ids to a dense range
+        term_map = np.full(len(self.doc_freq), -1, dtype=np.int64)
+        term_map[keep_terms] = np.arange(len(keep_terms))
+        counts = self.term_counts[keep_rows]
+        counts = csr_matrix(
+            (counts.data, term_map[counts.indices], counts.indptr),
+            shape=(len(keep_rows), len(keep_terms))
+        )
+        counts.sort_indices()
+        
+        self.vectorizer.vocabulary_ = {
+            term: int(term_map[idx])
+            for term, idx in self.vectorizer.vocabulary_.items()
+            if term_map[idx] >= 0
+        }
+        self.term_counts = counts
+        self.doc_freq = self.doc_freq[keep_terms]
+        self.entity_index.take(keep_rows, len(self.documents))
+        self.documents = self.documents.take(keep_rows)
+        self.tombstones = np.zeros(len(keep_rows), dtype=bool)
+        self._weights_stale = True
+        self._ensure_weights()
+        
+        # Row positions and term ids changed, so the LSA projection is refit
+        if self.dense_index is not None:
+            self.dense_index.fit(self.document_embeddings)
+            self._dense_pending_from = None
+        self._bump_version("compact")
+        
+        print(f"Compacted index to {len(self.documents)} document chunks")
+    
+    def _bump_version(self, *change: Any):
+        """
+        Derive a new index version after a change that can alter retrieval results.
+        
+        Args:
+            change: Description of the change (operation and its content)
+        """
+        self.index_version = _content_version(self.index_version, *change)
+        self.retrieval_cache.clear()
+    
+    def _count_terms(self, texts: List[str]) -> csr_matrix:
+        """
+        Tokenize texts into a raw term-count matrix, growing the vocabulary.
+        
+        Args:
+            texts: Texts to tokenize with the vectorizer's analyzer
+            
+        Returns:
+            Count matrix with one column per vocabulary term
+        """
+        analyzer = self.vectorizer.build_analyzer()
+        vocabulary = self.vectorizer.vocabulary_
+        indices = []
+        values = []
+        indptr = [0]
+        for text in texts:
+            term_counts = {}
+            for term in analyzer(text):
+                idx = vocabulary.get(term)
+                if idx is None:
+                    idx = len(vocabulary)
+                    vocabulary[term] = idx
+                term_counts[idx] = term_counts.get(idx, 0) + 1
+            indices.extend(term_counts.keys())
+            values.extend(term_counts.values())
+            indptr.append(len(indices))
+        
+        counts = csr_matrix(
+            (np.array(values, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(texts), len(vocabulary))
+        )
+        counts.sort_indices()
+        return counts
+    
+    def _merge_pending(self):
+        """
+        Append queued count rows to the count matrix.
+        """
+        with self._weights_lock:
+            if not self._pending_counts:
+                return
+            
+            num_terms = len(self.doc_freq)
+            blocks = [self.term_counts] + self._pending_counts
+            # Earlier blocks were built against a smaller vocabulary
+            blocks = [
+                csr_matrix((block.data, block.indices, block.indptr), shape=(block.shape[0], num_terms))
+                for block in blocks
+            ]
+            self.term_counts = vstack(blocks, format="csr")
+            self._pending_counts = []
+    
+    def _ensure_weights(self):
+        """
+        Recompute IDF and the weighted document matrix if the index changed.
+        
+        This mirrors ``TfidfVectorizer`` weighting (optional sublinear TF,
+        smoothed IDF, row normalization) on the stored raw counts, so no text
+        is re-tokenized.
+        """
+        if not self._weights_stale:
+            return
+        
+        with self._weights_lock:
+            # Another reader may have refreshed the weights while this one waited
+            if not self._weights_stale:
+                return
+            
+            self._merge_pending()
+            
+            num_docs = self.num_active
+            if self.vectorizer.smooth_idf:
+                idf = np.log((1 + num_docs) / (1 + self.doc_freq)) + 1
+            else:
+                idf = np.log(max(num_docs, 1) / np.maximum(self.doc_freq, 1)) + 1
+            # Terms only used by removed chunks must not affect query norms,
+            # exactly as if they had never been added to the vocabulary
+            idf[self.doc_freq == 0] = 0.0
+            
+            weights = self.term_counts.copy()
+            if self.vectorizer.sublinear_tf:
+                np.log(weights.data, weights.data)
+                weights.data += 1.0
+            if self.vectorizer.use_idf:
+                weights.data *= idf[weights.indices]
+                self.vectorizer.idf_ = idf
+            if self.vectorizer.norm is not None:
+                weights = normalize(weights, norm=self.vectorizer.norm, copy=False)
+            
+            self.document_embeddings = weights
+            
+            if self._dense_pending_from is not None:
+                self.dense_index.add(self.document_embeddings[self._dense_pending_from:])
+                self._dense_pending_from = None
+            # Cleared last: readers that skip the lock must see the finished index
+            self._weights_stale = False
+    
+    def enable_dense_index(self, n_components: int = 256, n_lists: int = None, nprobe: int = 8):
+        """
+        Switch retrieval to dense LSA vectors searched through an IVF index.
+        
+        The TF-IDF matrix is projected to ``n_components`` float32 dimensions
+        with truncated SVD and clustered into ``n_lists`` inverted lists;
+        each query scans only its ``nprobe`` closest lists. Everything runs
+        offline on the CPU.
+        
+        Args:
+            n_components: Number of LSA dimensions
+            n_lists: Number of IVF lists (default: about sqrt of the number of chunks)
+            nprobe: Number of IVF lists scanned per query
+        """
+        if self.document_embeddings is None:
+            raise ValueError("Embeddings have not been created yet")
+        
+        self._ensure_weights()
+        self.dense_index = LSAIndex(n_components=n_components, n_lists=n_lists, nprobe=nprobe)
+        self.dense_index.fit(self.document_embeddings)
+        self._bump_version("dense", self.dense_index.params)
+        
+        print(f"Created {self.dense_index.components.shape[0]}-dimensional LSA index "
+              f"with {len(self.dense_index.ivf.centroids)} IVF lists")
+    
+    def disable_dense_index(self):
+        """
+        Switch retrieval back to the sparse TF-IDF scores.
+        
+        The dense index is dropped, so a later ``save`` writes the index
+        without it.
+        """
+        self.dense_index = None
+        self._dense_pending_from = None
+    
+    def evaluate_dense_index(self, queries: List[str], top_k: int = 5, nprobe_values: List[int] = None) -> List[Dict[str, Any]]:
+        """
+        Report recall and latency of the IVF search against the exact paths.
+        
+        Recall is measured against the exact sparse TF-IDF ranking (what
+        retrieval returns without the dense index) and against an exhaustive
+        scan of the LSA vectors (which isolates the IVF approximation error).
+        
+        Args:
+            queries: Evaluation questions
+            top_k: Number of chunks retrieved per query
+            nprobe_values: IVF probe counts to evaluate (default: powers of two)
+            
+        Returns:
+            One row per configuration with recall and milliseconds per query
+        """
+        if self.dense_index is None:
+            raise ValueError("Dense index has not been enabled")
+        
+        self._ensure_weights()
+        n_lists = len(self.dense_index.ivf.centroids)
+        if nprobe_values is None:
+            nprobe_values = sorted({min(2 ** i, n_lists) for i in range(n_lists.bit_length() + 1)})
+        
+        def timed(dense, nprobe=None):
+            start = time.perf_counter()
+            ranked = self._rank_batch(queries, top_k, dense=dense, nprobe=nprobe)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+            return [set(rows.tolist()) for rows, _ in ranked], elapsed_ms
+        
+        def recall(found, expected):
+            hits = sum(len(f & e) for f, e in zip(found, expected))
+            return hits / max(sum(len(e) for e in expected), 1)
+        
+        sparse, sparse_ms = timed(dense=False)
+        dense_exact, dense_exact_ms = timed(dense=True, nprobe=n_lists)
+        
+        report = [
+            {"mode": "sparse-exact", "nprobe": None, "recall_vs_sparse": 1.0,
+             "recall_vs_dense_exact": recall(sparse, dense_exact), "ms_per_query": sparse_ms},
+            {"mode": "dense-exact", "nprobe": n_lists, "recall_vs_sparse": recall(dense_exact, sparse),
+             "recall_vs_dense_exact": 1.0, "ms_per_query": dense_exact_ms},
+        ]
+        for nprobe in nprobe_values:
+            found, elapsed_ms = timed(dense=True, nprobe=nprobe)
+            report.append({
+                "mode": "dense-ivf",
+                "nprobe": nprobe,
+                "recall_vs_sparse": recall(found, sparse),
+                "recall_vs_dense_exact": recall(found, dense_exact),
+                "ms_per_query": elapsed_ms
+            })
+        
+        return report
+    
+    def save(self, path: str):
+        """
+        Persist the fitted index to a directory.
+        
+        The sparse matrix arrays, the IDF vector and the columnar chunk store
+        are written as ``.npy`` files so that ``load`` can memory-map them;
+        the vocabulary, the source table and a versioned header are written
+        as JSON. The directory is written next to the destination and swapped
+        in at the end: an existing index is renamed aside, the new one renamed
+        into place and only then is the old one removed, so readers never
+        observe a half-written or half-deleted index.
+        
+        Args:
+            path: Directory to write the index to (replaced if it exists)
+        """
+        if self.document_embeddings is None:
+            raise ValueError("Embeddings have not been created yet")
+        
+        self._ensure_weights()
+        embeddings = csr_matrix(self.document_embeddings)
+        arrays = {
+            "idf": np.asarray(self.vectorizer.idf_),
+            "data": embeddings.data,
+            "indices": embeddings.indices,
+            "indptr": embeddings.indptr,
+            "counts_data": self.term_counts.data,
+            "counts_indices": self.term_counts.indices,
+            "counts_indptr": self.term_counts.indptr,
+            "doc_freq": self.doc_freq,
+            "tombstones": self.tombstones,
+        }
+        arrays.update(self.documents.to_arrays())
+        arrays.update(self.entity_index.to_arrays())
+        if self.dense_index is not None:
+            arrays.update(self.dense_index.to_arrays())
+        
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        
+        header = {
+            "format": INDEX_FORMAT,
+            "format_version": INDEX_FORMAT_VERSION,
+            "shape": list(embeddings.shape),
+            "vectorizer_params": _serializable_params(self.vectorizer),
+            "entity_gazetteer": self.entity_index.gazetteer,
+            "dense_index": self.dense_index.params if self.dense_index is not None else None,
+            "sources": self.documents.sources,
+            "manifest": self.manifest,
+            "index_version": self.index_version,
+            "arrays": {},
+        }
+        for name, array in arrays.items():
+            file_name = f"{name}.npy"
+            np.save(os.path.join(tmp_path, file_name), np.ascontiguousarray(array))
+            header["arrays"][name] = {
+                "file": file_name,
+                "dtype": str(array.dtype),
+                "shape": list(array.shape),
+            }
+        
+        with open(os.path.join(tmp_path, "vocabulary.json"), "w", encoding="utf-8") as f:
+            json.dump({term: int(idx) for term, idx in self.vectorizer.vocabulary_.items()}, f)
+        # The header is written last: its presence marks a complete index
+        with open(os.path.join(tmp_path, INDEX_HEADER_FILE), "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2)
+        
+        # Move the old index aside with one rename instead of deleting it in
+        # place, so the destination is only missing between two renames
+        old_path = f"{path}.old-{os.getpid()}"
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
         
-    def retrieve(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        print(f"Saved index with {len(self.documents)} document chunks to {path}")
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True,
+             entity_gazetteer: Dict[str, Dict[str, Any]] = None) -> "VectorStore":
+        """
+        Load an index previously written by ``save``.
+        
+        With ``mmap`` enabled the numeric arrays are opened with
+        ``numpy.memmap`` in read-only mode, so startup cost does not depend on
+        the corpus size and several processes can share the same pages.
+        Incremental updates on a loaded index copy the arrays they modify.
+        An index written with another format version raises
+        ``IndexVersionError``; callers rebuild it instead.
+        
+        Args:
+            path: Directory containing a saved index
+            mmap: Whether to memory-map the arrays instead of reading them
+            entity_gazetteer: Product/company names used for score boosting;
+                entity postings are rebuilt if they differ from the saved ones
+            
+        Returns:
+            A ready-to-query vector store
+        """
+        header_path = os.path.join(path, INDEX_HEADER_FILE)
+        if not os.path.exists(header_path):
+            raise FileNotFoundError(f"No index found at {path}")
+        
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        
+        if header.get("format") != INDEX_FORMAT:
+            raise ValueError(f"{path} does not contain a TF-IDF index")
+        if header.get("format_version") != INDEX_FORMAT_VERSION:
+            raise IndexVersionError(
+                f"Index at {path} has format version {header.get('format_version')}, "
+                f"expected {INDEX_FORMAT_VERSION}; rebuild the index"
+            )
+        
+        mmap_mode = "r" if mmap else None
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            array = np.load(os.path.join(path, spec["file"]), mmap_mode=mmap_mode)
+            if str(array.dtype) != spec["dtype"] or list(array.shape) != spec["shape"]:
+                raise ValueError(f"Array '{name}' in {path} does not match the index header")
+            arrays[name] = array
+        
+        with open(os.path.join(path, "vocabulary.json"), "r", encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        
+        store = cls(entity_gazetteer=entity_gazetteer)
+        store.vectorizer = TfidfVectorizer(**_restore_params(header["vectorizer_params"]))
+        store.vectorizer.vocabulary_ = vocabulary
+        store.vectorizer.idf_ = arrays["idf"]
+        # copy=False keeps the memory-mapped buffers instead of materializing them
+        store.document_embeddings = csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=tuple(header["shape"]),
+            copy=False
+        )
+        store.term_counts = csr_matrix(
+            (arrays["counts_data"], arrays["counts_indices"], arrays["counts_indptr"]),
+            shape=tuple(header["shape"]),
+            copy=False
+        )
+        store.doc_freq = arrays["doc_freq"]
+        store.manifest = header.get("manifest")
+        store.index_version = header.get("index_version") or _content_version(None, header)
+        store.tombstones = arrays["tombstones"]
+        store.documents = ChunkStore.from_arrays(arrays, header["sources"])
+        store.next_chunk_id = int(store.documents.chunk_ids.max(initial=-1)) + 1
+        if header.get("entity_gazetteer") == store.entity_index.gazetteer:
+            store.entity_index.load_arrays(arrays["entity_rows"], arrays["entity_offsets"])
+        else:
+            store.entity_index.build(store.documents.contents())
+            store.index_version = _content_version(store.index_version, "entities", store.entity_index.gazetteer)
+        if header.get("dense_index"):
+            store.dense_index = LSAIndex(**header["dense_index"])
+            store.dense_index.load_arrays(arrays)
+        
+        print(f"Loaded index with {len(store.documents)} document chunks from {path}")
+        return store
+        
+    def retrieve(self, query: str, top_k: int = 5, dense: bool = None) -> List[Dict[str, Any]]:
         """
         Retrieve the most relevant document chunks for a query.
         
         Args:
             query: The user's question
             top_k: Number of chunks to retrieve
+            dense: Search the dense index (default: whenever it is enabled)
             
         Returns:
             List of the most relevant document chunks
         """
+        return self.retrieve_many([query], top_k=top_k, dense=dense)[0]
+    
+    def retrieve_many(self, queries: List[str], top_k: int = 5, batch_size: int = 256,
+                      dense: bool = None) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve the most relevant document chunks for several queries at once.
+        
+        Each batch of queries is transformed with a single vectorizer call and
+        scored with a single sparse matrix product against the document
+        embeddings, instead of one similarity pass per query. Chunk dicts are
+        only materialized for the selected rows. Results are cached per
+        (normalized query, top_k, index version); only cache misses are scored.
+        
+        Args:
+            queries: The user questions
+            top_k: Number of chunks to retrieve per query
+            batch_size: Number of queries scored per matrix product
+            dense: Search the dense index (default: whenever it is enabled)
+            
+        Returns:
+            One list of relevant document chunks per query, in input order
+        """
         if self.document_embeddings is None:
             raise ValueError("Embeddings have not been created yet")
         
-        # Preprocess the query to enhance retrieval quality
-        import re
-        
-        # Extract product names if present in the query
-        product_pattern = r'\b(RAGent\s+(?:Search|Assistant|Analytics|Connect))\b'
-        product_matches = re.findall(product_pattern, query, re.IGNORECASE)
-        
-        # Check for company name mentions
-        company_pattern = r'\b(RAGent\s*AI|RAGent)\b'
-        company_matches = re.findall(company_pattern, query, re.IGNORECASE)
-        
-        # Create a boosted query
-        boosted_query = query
-        
-        # If specific products are mentioned, boost their importance
-        if product_matches:
-            for product in product_matches:
-                # Add the product name multiple times to boost its weight
-                boosted_query += f" {product} {product}"
-        
-        # If company name is mentioned, boost its importance
-        if company_matches:
-            for company in company_matches:
-                # Add the company name multiple times to boost its weight
-                boosted_query += f" {company} {company}"
-                
-        query = boosted_query
-        
-        # Get embedding for the query
-        query_embedding = self.vectorizer.transform([query])
-        
-        # Calculate cosine similarity between query and all documents
-        similarities = cosine_similarity(query_embedding, self.document_embeddings)[0]
-        
-        # Apply additional heuristics for product-specific and company-related queries
-        # Boost for product mentions
-        for product in product_matches:
-            for i, doc in enumerate(self.documents):
-                if product.lower() in doc["content"].lower():
-                    # Increase similarity score for documents containing the product name
-                    similarities[i] += 0.2  # Boost by a fixed amount
-        
-        # Boost for company mentions
-        for company in company_matches:
-            for i, doc in enumerate(self.documents):
-                if company.lower() in doc["content"].lower():
-                    # Increase similarity score for documents containing the company name
-                    similarities[i] += 0.3  # Higher boost for company information
-        
-        # Get indices of top_k most similar documents
-        top_indices = np.argsort(similarities)[::-1][:top_k]
-        
-        # Get the corresponding documents
-        results = []
-        for idx in top_indices:
-            doc = self.documents[idx]
-            results.append({
-                "content": doc["content"],
-                "metadata": doc["metadata"],
-                "score": float(similarities[idx])
-            })
+        self._ensure_weights()
+        if dense is None:
+            dense = self.dense_index is not None
+        
+        keys = [self._cache_key(query, top_k, dense) for query in queries]
+        results = [self.retrieval_cache.get(key) for key in keys]
+        misses = [i for i, ranking in enumerate(results) if ranking is None]
+        
+        for start in range(0, len(misses), batch_size):
+            batch = misses[start:start + batch_size]
+            ranked = self._rank_batch([queries[i] for i in batch], top_k, dense=dense)
+            for i, (top_indices, scores) in zip(batch, ranked):
+                ranking = []
+                for idx, score in zip(top_indices, scores):
+                    doc = self.documents[idx]
+                    doc["score"] = float(score)
+                    ranking.append(doc)
+                results[i] = ranking
+                self.retrieval_cache.put(keys[i], ranking)
+        
+        # Callers get their own dicts (metadata included) so they cannot alter the cached results
+        return [[{**doc, "metadata": dict(doc["metadata"])} for doc in ranking] for ranking in results]
+    
+    def _cache_key(self, query: str, top_k: int, dense: bool) -> tuple:
+        """
+        Build the retrieval cache key of a query.
+        
+        Case is only folded when the vectorizer lowercases, so queries that
+        share a key always produce the same ranking.
+        """
+        if self.vectorizer.lowercase:
+            query = normalize_query(query)
+        else:
+            query = " ".join(query.split())
+        return (query, top_k, dense, self.index_version)
+    
+    def _rank_batch(self, queries: List[str], top_k: int, dense: bool = None, nprobe: int = None):
+        """
+        Score one batch of queries and select the best rows for each.
+        
+        Args:
+            queries: The user questions
+            top_k: Number of rows to select per query
+            dense: Search the dense index (default: whenever it is enabled)
+            nprobe: IVF lists scanned per query in dense mode
+            
+        Returns:
+            One (row indices, scores) pair per query, best first
+        """
+        if dense is None:
+            dense = self.dense_index is not None
+        elif dense and self.dense_index is None:
+            raise ValueError("Dense index has not been enabled")
+        
+        # Repeat product/company mentions to boost their weight
+        expanded = [self.entity_index.expand_query(query) for query in queries]
+        
+        # Get embeddings for the whole batch of queries
+        query_embeddings = self.vectorizer.transform([boosted for boosted, _ in expanded])
+        if dense:
+            candidates = self.dense_index.search(query_embeddings, nprobe=nprobe)
+        else:
+            similarities = self._similarities(query_embeddings)
+        
+        ranked = []
+        for row, (_, entity_matches) in enumerate(expanded):
+            if dense:
+                # Only the rows found by the IVF search are candidates
+                scores = np.full(len(self.documents), -np.inf)
+                candidate_rows, candidate_scores = candidates[row]
+                scores[candidate_rows] = candidate_scores
+            else:
+                scores = similarities[row].toarray().ravel()
+            
+            # Boost chunks that mention the products or company in the query
+            self.entity_index.apply_boosts(scores, entity_matches)
+            
+            # Removed chunks never match
+            scores[self.tombstones] = -np.inf
+            
+            top_indices = _top_k_indices(scores, top_k)
+            ranked.append((top_indices, scores[top_indices]))
         
-        return results
+        return ranked
+    
+    def _similarities(self, query_embeddings) -> csr_matrix:
+        """
+        Compute cosine similarities between query rows and all documents.
+        
+        With the vectorizer's default L2 row normalization, cosine similarity
+        is a plain sparse dot product, which keeps the result sparse.
+        
+        Args:
+            query_embeddings: TF-IDF matrix with one row per query
+            
+        Returns:
+            Sparse matrix of shape (num_queries, num_documents)
+        """
+        if self.vectorizer.norm == "l2":
+            return csr_matrix(query_embeddings @ self.document_embeddings.T)
+        return csr_matrix(cosine_similarity(query_embeddings, self.document_embeddings))
+
+
+def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Select the indices of the ``top_k`` highest finite scores, best first.
+    
+    Uses ``np.argpartition`` so only the winners are sorted, instead of
+    sorting every score. Ties are broken by position for stable output,
+    including ties with the ``top_k``-th score, where ``argpartition``
+    picks arbitrary rows.
+    
+    Args:
+        scores: Score per document
+        top_k: Number of indices to return
+        
+    Returns:
+        Indices of the best scores in descending score order
+    """
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    
+    if top_k < len(scores):
+        partition = np.argpartition(-scores, top_k - 1)[:top_k]
+        threshold = scores[partition[-1]]
+        above = partition[scores[partition] > threshold]
+        tied = np.flatnonzero(scores == threshold)[:top_k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+    
+    order = np.lexsort((candidates, -scores[candidates]))
+    winners = candidates[order]
+    return winners[np.isfinite(scores[winners])]
+
+
+def _results_size(results: List[Dict[str, Any]]) -> int:
+    """
+    Approximate the memory held by a cached list of chunk dicts.
+    """
+    return sys.getsizeof(results) + sum(
+        sys.getsizeof(doc) + sys.getsizeof(doc["content"]) + sys.getsizeof(doc["metadata"])
+        for doc in results
+    )
+
+
+def _chunks_digest(documents: Iterable[Dict[str, Any]]) -> str:
+    """
+    Hash the sources, chunk ids and contents of document chunks, in order.
+    
+    Args:
+        documents: Document chunks with content and metadata
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for doc in documents:
+        metadata = doc["metadata"]
+        digest.update(f"{metadata['source']}\0{metadata['chunk_id']}\0".encode("utf-8"))
+        digest.update(doc["content"].encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _content_version(previous: Optional[str], *parts: Any) -> str:
+    """
+    Derive an index version from the previous version and a change.
+    
+    Versions depend only on the indexed content and the scoring parameters,
+    so an index rebuilt from the same files, or reloaded by another process,
+    gets the same version and keeps its cached answers.
+    
+    Args:
+        previous: Version before the change (None for a new index)
+        parts: JSON-serializable description of the change
+        
+    Returns:
+        Hex digest used as index version
+    """
+    payload = json.dumps([previous, *parts], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def _serializable_params(vectorizer: TfidfVectorizer) -> Dict[str, Any]:
+    """
+    Extract the JSON-serializable constructor parameters of a vectorizer.
+    
+    Callables and dtypes cannot be persisted; they fall back to their defaults
+    when the vectorizer is rebuilt in ``VectorStore.load``. Tuples are stored
+    as lists and restored by ``_restore_params``.
+    """
+    params = {}
+    for name, value in vectorizer.get_params().items():
+        if isinstance(value, tuple):
+            value = list(value)
+        if value is None or isinstance(value, (str, int, float, bool, list)):
+            params[name] = value
+    return params
+
+
+def _restore_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Undo the JSON round-trip of ``_serializable_params``.
+    """
+    params = dict(params)
+    if isinstance(params.get("ngram_range"), list):
+        params["ngram_range"] = tuple(params["ngram_range"])
+    return params